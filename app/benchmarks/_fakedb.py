@@ -0,0 +1,89 @@
+"""
+In-memory stand-in for a psycopg2 connection used by the benchmarks.
+
+Every execute() sleeps for a fixed latency to model one network round trip
+and is counted, so a benchmark can report both round trips and wall time
+without a live PostgreSQL server.
+"""
+import time
+
+
+class FakeCursor:
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.itersize = 2000
+        self._rows = []
+        self._pos = 0
+
+    def execute(self, sql, params=None):
+        self.conn.round_trips += 1
+        if self.conn.latency:
+            time.sleep(self.conn.latency)
+        self._rows = list(self.conn.responder(sql, params))
+        self._pos = 0
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = size or self.itersize
+        if self.name and self._pos < len(self._rows):
+            # Named cursors pay a round trip per batch
+            self.conn.round_trips += 1
+            if self.conn.latency:
+                time.sleep(self.conn.latency)
+        batch = self._rows[self._pos:self._pos + size]
+        self._pos += len(batch)
+        return batch
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            batch = self.fetchmany(self.itersize)
+            if not batch:
+                return
+            yield from batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, responder, latency=0.0):
+        self.responder = responder
+        self.latency = latency
+        self.round_trips = 0
+        self.closed = 0
+        self.autocommit = False
+
+    def cursor(self, name=None, cursor_factory=None, **kwargs):
+        return FakeCursor(self, name=name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def timed(fn, repeat=3):
+    """Runs fn `repeat` times and returns the best wall time in seconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
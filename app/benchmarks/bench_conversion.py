@@ -0,0 +1,63 @@
+"""
+Mixed-currency conversion: the per-row convert_to_pln loop against
+convert_batch, with rates already in the store (no network).
+
+    cd app && python -m benchmarks.bench_conversion [--rows 200000]
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from reporting_module.conversion import convert_batch
+from reporting_module.rates import RateStore
+from benchmarks._fakedb import timed
+
+CURRENCIES = ["PLN", "EUR", "USD", "GBP", "CHF", "CZK", "SEK", "NOK"]
+ROW_COUNTS = (1000, 10000, 100000)
+
+
+def warm_store():
+    """A store holding a PLN table, as after the first fetch of the day."""
+    store = RateStore(url="http://127.0.0.1:9", path="", ttl=10**9)
+    store._loaded = True
+    store._tables["PLN"] = {
+        "fetched_at": store.timer(), "date": "2025-06-02",
+        "rates": {"EUR": 0.2347, "USD": 0.2671, "GBP": 0.1973, "CHF": 0.2201,
+                  "CZK": 5.871, "SEK": 2.553, "NOK": 2.701},
+    }
+    return store
+
+
+def make_rows(count):
+    rng = random.Random(42)
+    amounts = [Decimal(rng.randrange(100, 10**7)) / 100 for _ in range(count)]
+    currencies = [rng.choice(CURRENCIES) for _ in range(count)]
+    return amounts, currencies
+
+
+def scalar_loop(store, amounts, currencies):
+    """convert_to_pln per row plus a dict of subtotals, as a caller does today."""
+    subtotals = {}
+    converted = []
+    for amount, currency in zip(amounts, currencies):
+        value = float(amount) * store.get_rate(currency, "PLN")
+        converted.append(value)
+        subtotals[currency] = subtotals.get(currency, 0.0) + value
+    return converted, subtotals
+
+
+def run(row_counts):
+    store = warm_store()
+    print(f"{'rows':>8} | {'scalar ms':>10} | {'batch ms':>10} | {'speed-up':>8}")
+    for count in row_counts:
+        amounts, currencies = make_rows(count)
+        floats = [float(a) for a in amounts]
+        scalar = timed(lambda: scalar_loop(store, amounts, currencies), repeat=3)
+        batch = timed(lambda: convert_batch(floats, currencies, store=store), repeat=3)
+        print(f"{count:>8} | {scalar * 1000:>10.1f} | {batch * 1000:>10.1f} | {scalar / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, action="append", help="row count (repeatable)")
+    run(parser.parse_args().rows or ROW_COUNTS)
@@ -0,0 +1,57 @@
+"""
+Startup cost: `import app` in a fresh interpreter with lazy initialization
+(the default) and with REPORT_LAZY_INIT=0, measured with `-X importtime`.
+Prints the median cumulative import time and the slowest top-level imports.
+
+    cd app && python -m benchmarks.bench_import [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = (("lazy", "1"), ("eager", "0"))
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from `-X importtime` output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def measure(lazy_init):
+    """Entries of one cold `import app`."""
+    env = dict(os.environ, REPORT_LAZY_INIT=lazy_init, PYTHONWARNINGS="ignore")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            cwd=APP_DIR, env=env, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def run(runs, top):
+    totals = {}
+    for mode, lazy_init in MODES:
+        samples = [measure(lazy_init) for _ in range(runs)]
+        cumulative = [next(c for name, _, c, _ in entries if name == "app") for entries in samples]
+        totals[mode] = statistics.median(cumulative) / 1000
+        print(f"{mode}: import app {totals[mode]:.0f} ms (median of {runs})")
+        # `app` itself is the outermost entry; its direct imports are one level in
+        direct = sorted((e for e in samples[-1] if e[3] == 1), key=lambda e: -e[2])
+        for name, _, cumulative_us, _ in direct[:top]:
+            print(f"    {cumulative_us / 1000:>8.1f} ms  {name}")
+    print(f"lazy start-up is {totals['eager'] / totals['lazy']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="imports per mode")
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports listed")
+    args = parser.parse_args()
+    run(args.runs, args.top)
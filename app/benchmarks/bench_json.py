@@ -0,0 +1,65 @@
+"""
+Tender-status JSON encoding against row count: the former path (str() on
+every date, then Flask's jsonify) against json_response with the orjson
+and standard library encoders, which take the date and Decimal values as
+they come from the cursor.
+
+    cd app && python -m benchmarks.bench_json [--rows 200000]
+"""
+import argparse
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flask import Flask, jsonify
+
+from reporting_module.serialization import ENCODERS
+from benchmarks._fakedb import timed
+
+ROW_COUNTS = (1000, 10000, 100000)
+
+
+def make_rows(count):
+    """Tender-status rows as the route builds them, before any value conversion."""
+    start = date(2024, 1, 1)
+    return [
+        {"tender_id": i, "status": ("Open", "Closed", "Awarded")[i % 3],
+         "start_date": start + timedelta(days=i % 365), "end_date": start + timedelta(days=i % 365 + 90),
+         "project_id": i % 40, "project_name": f"Project {i % 40}", "project_description": "Road works",
+         "general_expenses_incurred": {"amount": Decimal("1250.50")},
+         "payroll_expenses_incurred": {"amount": Decimal("830.00")},
+         "total_income": {"amount": Decimal("4100.25")}}
+        for i in range(count)
+    ]
+
+
+def legacy(rows):
+    """str() per date and float() per amount in Python, then jsonify."""
+    converted = [
+        dict(row, start_date=str(row["start_date"]), end_date=str(row["end_date"]),
+             general_expenses_incurred={"amount": float(row["general_expenses_incurred"]["amount"])},
+             payroll_expenses_incurred={"amount": float(row["payroll_expenses_incurred"]["amount"])},
+             total_income={"amount": float(row["total_income"]["amount"])})
+        for row in rows
+    ]
+    return jsonify(converted).get_data()
+
+
+def run(row_counts):
+    app = Flask(__name__)
+    print(f"{'rows':>8} | {'jsonify ms':>10} | {'json ms':>8} | {'orjson ms':>9} | {'speed-up':>8}")
+    with app.app_context():
+        for count in row_counts:
+            rows = make_rows(count)
+            assert json.loads(ENCODERS["orjson"](rows)) == json.loads(legacy(rows))
+            before = timed(lambda: legacy(rows), repeat=3)
+            stdlib = timed(lambda: ENCODERS["json"](rows), repeat=3)
+            fast = timed(lambda: ENCODERS["orjson"](rows), repeat=3)
+            print(f"{count:>8} | {before * 1000:>10.1f} | {stdlib * 1000:>8.1f} | {fast * 1000:>9.1f} | "
+                  f"{before / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, action="append", help="row count (repeatable)")
+    run(parser.parse_args().rows or ROW_COUNTS)
@@ -0,0 +1,79 @@
+"""
+Latency of the overall summary: one consolidated statement versus the
+former five sequential queries (three ledger sums, tender counts, project
+count), on a fake connection that charges a fixed latency per round trip.
+
+    cd app && python -m benchmarks.bench_overall_summary [--latency 0.0005]
+"""
+import argparse
+from unittest.mock import patch
+
+from reporting_module import api
+from benchmarks._fakedb import FakeConnection, timed
+
+LATENCIES = (0.0, 0.0005, 0.002, 0.01)
+TENDER_COUNTS = [{"status": "Closed", "count": 3}, {"status": "Open", "count": 5}]
+
+
+def responder(sql, params):
+    if "AS tender_counts" in sql:
+        return [{
+            "total_income": 1000, "total_general_expenses": 200, "total_payroll_expenses": 300,
+            "tender_counts": TENDER_COUNTS, "project_count": 8,
+        }]
+    if "FROM tenders" in sql:
+        return TENDER_COUNTS
+    if "AS project_count" in sql:
+        return [{"project_count": 8}]
+    return [{"total_income": 1000, "total_general_expenses": 200, "total_payroll_expenses": 300}]
+
+
+def legacy_overall_summary(conn, company_id):
+    """The five-query sequence the report ran before consolidation."""
+    cur = conn.cursor()
+    params = [company_id]
+    cur.execute("SELECT COALESCE(SUM(amount),0) AS total_income FROM income_entries WHERE company_id = %s", params)
+    total_income = float(cur.fetchone()["total_income"])
+    cur.execute("SELECT COALESCE(SUM(amount),0) AS total_general_expenses FROM general_expenses WHERE company_id = %s", params)
+    total_gen_exp = float(cur.fetchone()["total_general_expenses"])
+    cur.execute("SELECT COALESCE(SUM(amount),0) AS total_payroll_expenses FROM payroll_entries WHERE company_id = %s", params)
+    total_pay_exp = float(cur.fetchone()["total_payroll_expenses"])
+    cur.execute("SELECT t.status, COUNT(*) AS count FROM tenders t WHERE t.company_id = %s GROUP BY t.status ORDER BY t.status", params)
+    tender_counts = [{"status": row["status"], "count": row["count"]} for row in cur.fetchall()]
+    cur.execute("SELECT COUNT(*) AS project_count FROM projects WHERE company_id = %s", params)
+    project_count = cur.fetchone()["project_count"]
+    return {
+        "total_income": total_income,
+        "total_general_expenses": total_gen_exp,
+        "total_payroll_expenses": total_pay_exp,
+        "tender_counts": tender_counts,
+        "project_count": project_count
+    }
+
+
+def run(latencies, repeat):
+    with patch("reporting_module.api.get_db_postgres_connection", return_value=FakeConnection(responder)):
+        single = api._overall_summary("1", None, None, None, None)
+    assert single == legacy_overall_summary(FakeConnection(responder), "1"), "results differ"
+
+    print(f"{'latency ms':>10} | {'legacy trips':>12} {'legacy ms':>10} | {'single trips':>12} {'single ms':>10}")
+
+    for latency in latencies:
+        legacy_conn = FakeConnection(responder, latency)
+        legacy_s = timed(lambda: legacy_overall_summary(legacy_conn, "1"), repeat)
+
+        single_conn = FakeConnection(responder, latency)
+        with patch("reporting_module.api.get_db_postgres_connection", return_value=single_conn):
+            single_s = timed(lambda: api._overall_summary("1", None, None, None, None), repeat)
+
+        print(f"{latency * 1000:>10.2f} | {legacy_conn.round_trips // repeat:>12} {legacy_s * 1000:>10.2f} | "
+              f"{single_conn.round_trips // repeat:>12} {single_s * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, action="append",
+                        help="simulated seconds per round trip; repeatable (default: a sweep)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.latency or LATENCIES, args.repeat)
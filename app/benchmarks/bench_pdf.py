@@ -0,0 +1,70 @@
+"""
+PDF render time against row count: the former single-table layout, the
+chunked table layout and the compact layout.
+
+    cd app && python -m benchmarks.bench_pdf [--legacy-max 5000]
+"""
+import argparse
+import io
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Spacer, Paragraph
+
+from reporting_module.pdf import PdfReport
+from benchmarks._fakedb import timed
+
+ROW_COUNTS = (100, 1000, 5000, 20000)
+HEADERS = ["tender_id", "status", "start_date", "end_date", "project_id", "project_name", "total_income"]
+
+
+def make_rows(count):
+    return [
+        {"tender_id": i, "status": ("Open", "Closed", "Awarded")[i % 3], "start_date": "2024-01-01",
+         "end_date": "2024-03-31", "project_id": i % 40, "project_name": f"Project {i % 40}",
+         "total_income": "{'amount': 1250.0}"}
+        for i in range(count)
+    ]
+
+
+def legacy_pdf(rows, headers):
+    """The single Table the export built before chunking (without the print)."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    story = [Paragraph("Tender Status", getSampleStyleSheet()['h1']), Spacer(1, 0.25 * inch)]
+    pdf_data = [headers] + [[str(row.get(h, '')) for h in headers] for row in rows]
+    table = Table(pdf_data, colWidths=[(letter[0] - 2 * inch) / len(headers)] * len(headers))
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ]))
+    story.append(table)
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def run(legacy_max):
+    print(f"{'rows':>6} | {'legacy s':>9} | {'chunked s':>9} {'pages':>6} | {'compact s':>9} {'pages':>6}")
+    for count in ROW_COUNTS:
+        rows = make_rows(count)
+
+        legacy = f"{timed(lambda: legacy_pdf(rows, HEADERS), repeat=1):>9.2f}" if count <= legacy_max else f"{'skipped':>9}"
+
+        chunked = PdfReport(HEADERS, "Tender Status", compact_rows=10**9, time_budget=10**9)
+        chunked_s = timed(lambda: chunked.render(iter(rows)), repeat=1)
+
+        compact = PdfReport(HEADERS, "Tender Status", compact_rows=0)
+        compact_s = timed(lambda: compact.render(rows, len(rows)), repeat=1)
+
+        print(f"{count:>6} | {legacy} | {chunked_s:>9.2f} {chunked.pages['table']:>6} | "
+              f"{compact_s:>9.2f} {compact.pages['compact']:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--legacy-max", type=int, default=5000,
+                        help="skip the single-table layout above this many rows")
+    run(parser.parse_args().legacy_max)
@@ -0,0 +1,91 @@
+"""
+Round trips and latency of /reports/project-finance against project count.
+
+Compares the grouped totals query with the former per-project loop (three
+SUM queries per project) on a fake connection that charges a fixed latency
+per round trip.
+
+    cd app && python -m benchmarks.bench_project_finance [--latency 0.0005]
+"""
+import argparse
+import os
+from unittest.mock import patch
+
+# The fake connection has no rates table to re-sync and no rates API to call
+os.environ.setdefault("REPORT_START_SERVICES", "0")
+
+from app import app  # noqa: E402
+from reporting_module.utils import PROJECT_TOTAL_SOURCES
+from benchmarks._fakedb import FakeConnection, timed
+
+PROJECT_COUNTS = (10, 100, 500, 2000)
+
+
+def make_responder(project_count):
+    projects = [{"id": i, "name": f"Project {i}"} for i in range(project_count)]
+
+    def responder(sql, params):
+        if sql.startswith("SELECT id, name FROM projects"):
+            return projects
+        if "UNION ALL" in sql:
+            return [
+                {"source": label, "project_id": p["id"], "total": 100}
+                for label, _ in PROJECT_TOTAL_SOURCES for p in projects
+            ]
+        # Legacy single-project SUM
+        return [(100,)]
+
+    return responder
+
+
+def legacy_project_finance(conn, company_id):
+    """The per-project loop the route used before the grouped query."""
+    cur = conn.cursor()
+    cur.execute("SELECT id, name FROM projects WHERE company_id = %s", (company_id,))
+    result = []
+    for project in cur.fetchall():
+        totals = []
+        for _, table in PROJECT_TOTAL_SOURCES:
+            cur.execute(
+                f"SELECT COALESCE(SUM(amount), 0) FROM {table} "
+                f"WHERE company_id = %s AND project_id = %s",
+                [company_id, project["id"]]
+            )
+            totals.append(float(cur.fetchone()[0]))
+        income, general, payroll = totals
+        result.append({
+            "project_id": project["id"],
+            "project_name": project["name"],
+            "income": income,
+            "expenses": general + payroll,
+            "net": income - general - payroll,
+        })
+    return result
+
+
+def run(latency):
+    client = app.test_client()
+    headers = {"X-Company-ID": "1", "X-User-Role": "Admin"}
+    print(f"latency per round trip: {latency * 1000:.2f} ms")
+    print(f"{'projects':>8} | {'legacy trips':>12} {'legacy ms':>10} | {'grouped trips':>13} {'grouped ms':>10}")
+
+    for count in PROJECT_COUNTS:
+        responder = make_responder(count)
+
+        legacy_conn = FakeConnection(responder, latency)
+        legacy_s = timed(lambda: legacy_project_finance(legacy_conn, "1"), repeat=1)
+        legacy_trips = legacy_conn.round_trips
+
+        grouped_conn = FakeConnection(responder, latency)
+        with patch("reporting_module.api.get_db_postgres_connection", return_value=grouped_conn):
+            grouped_s = timed(lambda: client.get("/api/reports/project-finance", headers=headers))
+        grouped_trips = grouped_conn.round_trips // 3
+
+        print(f"{count:>8} | {legacy_trips:>12} {legacy_s * 1000:>10.1f} | {grouped_trips:>13} {grouped_s * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.0005,
+                        help="simulated seconds per round trip (default 0.5 ms)")
+    run(parser.parse_args().latency)
@@ -0,0 +1,100 @@
+"""
+Persistent cache of generated AI responses.
+
+Responses are content-addressed: the key is a SHA-256 of the model name and
+the normalized prompt, so asking the same model the same question again
+(e.g. re-summarizing an unchanged monthly report) is answered from disk.
+Storage, TTL, eviction, hit counters and cross-worker stampede protection
+come from ReportCache over a SqliteBackend.
+"""
+import hashlib
+import os
+import threading
+import unicodedata
+
+from .cache import ReportCache
+from .cache_backends import SqliteBackend
+
+
+def ai_cache_settings_from_env():
+    """Reads the AI response cache settings from REPORT_AI_CACHE* environment variables."""
+    return {
+        "enabled": os.getenv("REPORT_AI_CACHE", "1") != "0",
+        "path": os.getenv("REPORT_AI_CACHE_PATH", "ai_cache.sqlite3"),
+        "ttl": float(os.getenv("REPORT_AI_CACHE_TTL", 7 * 86400)),
+        "maxsize": int(os.getenv("REPORT_AI_CACHE_MAXSIZE", 5000)),
+    }
+
+
+def normalize_prompt(prompt):
+    """
+    Canonical form of a prompt for hashing: NFC, LF line endings, no
+    trailing spaces on lines, no surrounding blank space.
+    """
+    text = unicodedata.normalize("NFC", prompt).replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def prompt_key(model_name, prompt):
+    """Cache key of a prompt sent to `model_name`."""
+    digest = hashlib.sha256(f"{model_name}\0{normalize_prompt(prompt)}".encode()).hexdigest()
+    return ("ai", model_name, digest)
+
+
+class ResponseCache:
+    """
+    Caches `generate(prompt)` results per model and normalized prompt.
+
+    Args:
+        path (str): SQLite file holding the responses.
+        ttl (float): Seconds a response is reused.
+        maxsize (int): Responses kept; the soonest to expire are evicted first.
+        enabled (bool): When False every call goes to the model.
+        timer (callable): Wall clock.
+    """
+
+    def __init__(self, path=None, ttl=None, maxsize=None, enabled=None, timer=None):
+        settings = ai_cache_settings_from_env()
+        self.path = path or settings["path"]
+        self.ttl = settings["ttl"] if ttl is None else ttl
+        self.maxsize = maxsize or settings["maxsize"]
+        self.enabled = settings["enabled"] if enabled is None else enabled
+        self.timer = timer
+        self.bypassed = 0
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def _get_cache(self):
+        # The SQLite file is only opened once a response is actually requested
+        with self._lock:
+            if self._cache is None:
+                backend = SqliteBackend(self.path, maxsize=self.maxsize,
+                                        **({"timer": self.timer} if self.timer else {}))
+                # Model calls take seconds: let concurrent identical prompts wait for the first
+                self._cache = ReportCache(backend=backend, ttls={}, default_ttl=self.ttl,
+                                          stale_factor=1, lock_timeout=120, lock_wait=60,
+                                          timer=self.timer)
+            return self._cache
+
+    def generate(self, model_name, prompt, generate, bypass=False):
+        """
+        Returns the cached response for (model_name, prompt), calling
+        `generate(prompt)` on a miss. Exceptions from `generate` propagate
+        and nothing is cached. `bypass` skips the cache for this call.
+        """
+        if bypass or not self.enabled:
+            with self._lock:
+                self.bypassed += 1
+            return generate(prompt)
+        return self._get_cache().get_or_compute(prompt_key(model_name, prompt), lambda: generate(prompt))
+
+    def clear(self):
+        self._get_cache().clear()
+        self.bypassed = 0
+
+    def stats(self):
+        stats = self._get_cache().stats() if self.enabled else {}
+        return dict(stats, enabled=self.enabled, bypassed=self.bypassed)
+
+
+ai_cache = ResponseCache()
@@ -1,8 +1,28 @@
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify, Response
+import functools
+from flask import (Blueprint, render_template, request, redirect, url_for, jsonify, Response, send_file,
+                   g, make_response, has_request_context)
 import psycopg2
 import psycopg2.extras
 from psycopg2.errors import OperationalError
-from .utils import export_report_data, validate_dates, build_tender_status_query
+from .utils import (export_report_data, validate_dates, build_tender_status_query,
+                    build_tender_projects_query, build_project_totals_query,
+                    collect_project_totals, build_overall_summary_query,
+                    overall_summary_parts, stream_csv_response, pdf_response)
+from .cursors import iter_named_cursor, iter_rows
+from .pool import get_pool, current_pool_stats
+from .cache import report_cache, make_cache_key
+from .rollups import rollups_enabled, build_rollup_summary_queries, has_dirty_buckets
+from .statements import compile_where, shape_cache, execute, LEDGER_FILTERS
+from .parallel import parallel_enabled, run_queries, SubQuery, QueryDeadlineExceeded
+from .currency import (normalize_currency, build_converted_summary_queries, converted_totals,
+                       build_currency_trend_query, historical_summary)
+from .jobs import export_jobs, EXPORT_FILTERS, ExportQueueFull, CompanyExportLimit
+from .narratives import narratives, NarrativeQueueFull
+from .rates import rate_store
+from .versions import etags_enabled, data_version, report_etag
+from .compression import compress_response
+from .serialization import json_response
+from .columnar import response_format, transpose, columnar, columnar_tables
 from flask_cors import cross_origin
 
 report_module_api = Blueprint('api', __name__)
@@ -15,25 +35,294 @@ def get_user_context():
     }
     
 
-def get_db_postgres_connection():
+def _connect_postgres():
     """
-    Establishes a new connection to the PostgreSQL database using specific credentials.
+    Opens a raw connection to the PostgreSQL database using specific credentials.
     Replace with your actual database credentials.
     """
+    return psycopg2.connect(
+        dbname="your_db",
+        user="your_user",
+        password="your_password",
+        host="your_host"
+    )
+
+
+def get_db_postgres_connection():
+    """
+    Checks a connection out of the process-wide pool shared by all report routes.
+    Calling close() on the returned connection hands it back to the pool.
+    """
     try:
-        conn = psycopg2.connect(
-            dbname="your_db",
-            user="your_user",
-            password="your_password",
-            host="your_host"
-        )
-        return conn
+        return get_pool(_connect_postgres).getconn()
     except OperationalError as e:
         return(f"Error establishing primary database connection: {e}")
 
 
+@report_module_api.route('/reports/pool-stats', methods=['GET'])
+def pool_stats():
+    user = get_user_context()
+    if user["role"] != 'Admin':
+        return jsonify({"error": "Access denied: insufficient permissions"}), 403
+
+    stats = current_pool_stats()
+    if stats is None:
+        return jsonify({"error": "Connection pool not initialised yet"}), 404
+    return jsonify(stats)
+
+
+def _data_version(company_id):
+    """
+    The company's data version, or None when it cannot be read (no ETag is
+    sent then). The connection it was read on is kept in `g` for the view
+    (see _report_connection) rather than returned to the pool.
+    """
+    conn = get_db_postgres_connection()
+    if isinstance(conn, str):
+        return None
+    try:
+        version = data_version(conn, company_id)
+    except psycopg2.Error as e:
+        print(f"Error reading data version: {e}")
+        conn.close()
+        return None
+    g.report_conn = conn
+    return version
+
+
+def _report_connection():
+    """
+    Connection for the current report request: the one its data version
+    was read on, if still unused, so a request checks out one connection
+    instead of two; a fresh checkout otherwise.
+    """
+    if has_request_context():
+        conn = g.pop("report_conn", None)
+        if conn is not None:
+            return conn
+    return get_db_postgres_connection()
+
+
+def _release_unused_report_connection():
+    """
+    Returns the request's report connection to the pool if nothing took it.
+    Called before fanning sub-queries out to connections of their own, so
+    a request never holds an idle one while waiting for them.
+    """
+    conn = g.pop("report_conn", None) if has_request_context() else None
+    if conn is not None:
+        conn.close()
+
+
+@report_module_api.teardown_request
+def _release_report_connection(exc):
+    """Returns the version lookup's connection when the view never used it (304, cache hit, error)."""
+    _release_unused_report_connection()
+
+
+def _request_etag(endpoint):
+    """
+    ETag of the current report request, or None when ETags are off or the
+    request is not one a report will be served for. Stores the data version
+    in `g` so the report cache entry is tied to it.
+    """
+    if not etags_enabled():
+        return None
+    user = get_user_context()
+    company_id = user["company_id"]
+    if user["role"] not in ('Admin', 'Finance', 'HR') or not company_id:
+        return None
+    version = _data_version(company_id)
+    if version is None:
+        return None
+    g.data_version = version
+    # Converted reports also change when the rates do
+    rates = None
+    if request.args.get('currency'):
+        rates = sorted((base, table.get("date")) for base, table in rate_store.snapshot().items())
+    return report_etag(make_cache_key(company_id, endpoint, request.args), version, request.args, rates)
+
+
+def _report_cache_key(company_id, endpoint):
+    """
+    Report cache key of the current request. With ETags on, it includes the
+    data version, so after a write the report is recomputed instead of an
+    older cached copy being served under the new ETag. Remembered in `g`
+    so the compressed response body is stored next to the entry.
+    """
+    key = make_cache_key(company_id, endpoint, request.args)
+    version = g.get("data_version")
+    g.report_cache_key = key if version is None else key + (version,)
+    return g.report_cache_key
+
+
+def with_etag(endpoint):
+    """
+    Answers If-None-Match requests whose ETag still matches the company's
+    data with 304 Not Modified before the view (and its queries) runs, and
+    tags successful responses otherwise. A no-op unless REPORT_ETAGS=1.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = _request_etag(endpoint)
+            if etag is not None and request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if etag is None or response.status_code != 200:
+                    return response
+            # Weak: the same data may be sent in other encodings
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+        return wrapper
+    return decorator
+
+
+@report_module_api.after_request
+def _compress(response):
+    """Compresses report responses in the encoding the client accepts (see compression.py)."""
+    return compress_response(response, request.accept_encodings, report_cache, g.get("report_cache_key"))
+
+
+@shape_cache
+def _ledger_summary_sql(table, total_key, where_sql):
+    """Returns (total_sql, trend_sql) for one ledger table and WHERE shape."""
+    total_sql = f"""
+        SELECT COALESCE(SUM(amount), 0) AS {total_key}
+        FROM {table}
+        WHERE {where_sql}
+        """
+    trend_sql = f"""
+        SELECT TO_CHAR(date, 'YYYY-MM') AS month,
+               SUM(amount) AS amount
+        FROM {table}
+        WHERE {where_sql}
+        GROUP BY month
+        ORDER BY month
+        """
+    return total_sql, trend_sql
+
+
+def _conversion_args(args):
+    """
+    Returns (currency, historical) from the `currency` and `rates` query
+    arguments. Raises ValueError with a client-facing message when invalid.
+    """
+    currency = normalize_currency(args.get('currency'))
+    rates = args.get('rates') or 'latest'
+    if rates not in ('latest', 'historical'):
+        raise ValueError("rates must be 'latest' or 'historical'")
+    if rates == 'historical' and not currency:
+        raise ValueError("currency is required for historical rates")
+    return currency, rates == 'historical'
+
+
+def _rollup_is_current(table, company_id, start_date, end_date):
+    """
+    False when the company has buckets in the range that changed since the
+    last rollup refresh, so the summary is read from the raw ledger rows
+    instead. The connection stays with the request for the summary queries.
+    """
+    conn = _report_connection()
+    try:
+        dirty = has_dirty_buckets(conn, table, company_id, start_date, end_date)
+    except Exception:
+        conn.close()
+        raise
+    g.report_conn = conn
+    return not dirty
+
+
+def _ledger_summary(table, total_key, company_id, start_date, end_date, project_id, currency=None,
+                    historical=False):
+    """
+    Computes the total and the monthly trend of one ledger table
+    (income_entries or general_expenses) for the given filters. With
+    `currency`, amounts are converted into it inside the queries and the
+    result also carries per-currency subtotals (see reporting_module/currency.py);
+    with `historical`, each month is converted at that month's rates instead.
+    """
+    where_sql, params = compile_where(LEDGER_FILTERS, company_id=company_id, project_id=project_id,
+                                      start_date=start_date, end_date=end_date)
+    if currency and historical:
+        # One pass: monthly sums per source currency, converted in memory
+        sql, sql_params = build_currency_trend_query(table, where_sql, params)
+        conn = _report_connection()
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            execute(conn, cur, sql, sql_params)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+        return historical_summary(rows, total_key, currency)
+
+    if currency:
+        total_sql, total_params, trend_sql, trend_params = build_converted_summary_queries(
+            table, where_sql, params, currency)
+    else:
+        total_sql, trend_sql = _ledger_summary_sql(table, total_key, where_sql)
+        total_params = trend_params = params
+
+        if rollups_enabled():
+            # Whole-month ranges are answered from the pre-aggregated monthly rollup
+            rollup = build_rollup_summary_queries(table, total_key, company_id, start_date, end_date, project_id)
+            if rollup is not None and _rollup_is_current(table, company_id, start_date, end_date):
+                total_sql, trend_sql, params = rollup
+                total_params = trend_params = params
+
+    if parallel_enabled():
+        # Total and trend are independent: run them at the same time on two pooled connections
+        _release_unused_report_connection()
+        results = run_queries(get_db_postgres_connection, [
+            SubQuery("total", total_sql, total_params, "all" if currency else "one"),
+            SubQuery("trend", trend_sql, trend_params),
+        ])
+        total = results["total"]
+        trend_rows = results["trend"]
+    else:
+        conn = _report_connection()
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # Query total (one row per source currency when converting)
+            execute(conn, cur, total_sql, total_params)
+            total = cur.fetchall() if currency else cur.fetchone()
+
+            # Query monthly trend
+            execute(conn, cur, trend_sql, trend_params)
+            trend_rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+
+    monthly_trend = [
+        {"month": row["month"], "amount": float(row["amount"])} for row in trend_rows
+    ]
+
+    if currency:
+        result = converted_totals(total, total_key, currency)
+        result["monthly_trend"] = monthly_trend
+        return result
+
+    return {
+        total_key: float(total[total_key]),
+        "monthly_trend": monthly_trend
+    }
+
+
+# Row arrays of the summary reports, converted with ?format=columnar.
+LEDGER_SUMMARY_TABLES = {
+    "monthly_trend": ["month", "amount"],
+    "by_currency": ["currency", "amount", "converted"],
+}
+OVERALL_SUMMARY_TABLES = {"tender_counts": ["status", "count"]}
+
+
 @report_module_api.route('/reports/income-summary', methods=['GET'])
 @cross_origin()
+@with_etag("income_summary")
 def income_summary():
     try:
         user = get_user_context()
@@ -47,75 +336,36 @@ def income_summary():
         if not company_id:
             return jsonify({"error": "company_id is required in context"}), 400
 
-        conn = get_db_postgres_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
         # Optional query parameters
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         project_id = request.args.get('project_id')
         export = request.args.get('export')
-
-        # Build WHERE clause dynamically
-        where_clauses = ["company_id = %s"]
-        params = [company_id]
-
-        if project_id:
-            where_clauses.append("project_id = %s")
-            params.append(project_id)
-
-        if start_date:
-            where_clauses.append("date >= %s")
-            params.append(start_date)
-
-        if end_date:
-            where_clauses.append("date <= %s")
-            params.append(end_date)
-
-        where_sql = " AND ".join(where_clauses)
-
-        # Query total income
-        cur.execute(
-            f"""
-            SELECT COALESCE(SUM(amount), 0) AS total_income
-            FROM income_entries
-            WHERE {where_sql}
-            """,
-            params
-        )
-        total_income = cur.fetchone()["total_income"]
-
-        # Query monthly trend
-        cur.execute(
-            f"""
-            SELECT TO_CHAR(date, 'YYYY-MM') AS month,
-                   SUM(amount) AS amount
-            FROM income_entries
-            WHERE {where_sql}
-            GROUP BY month
-            ORDER BY month
-            """,
-            params
+        try:
+            currency, historical = _conversion_args(request.args)
+            columnar_format = response_format(request.args) == 'columnar' and not export
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = report_cache.get_or_compute(
+            _report_cache_key(company_id, "income_summary"),
+            lambda: _ledger_summary("income_entries", "total_income", company_id, start_date, end_date,
+                                    project_id, currency, historical)
         )
-        trend_rows = cur.fetchall()
-        monthly_trend = [
-            {"month": row["month"], "amount": float(row["amount"])} for row in trend_rows
-        ]
-
-        cur.close()
-        conn.close()
-
-        result = {
-            "total_income": float(total_income),
-            "monthly_trend": monthly_trend
-        }
+        if columnar_format:
+            return json_response(columnar_tables(result, LEDGER_SUMMARY_TABLES))
         return export_report_data(result, export, filename="income_summary")
 
+    except QueryDeadlineExceeded as e:
+        print(f"Report deadline exceeded in income_summary: {e}")
+        return jsonify({"error": "Report timed out"}), 504
+
     except Exception as e:
         print(f"Unhandled error in income_summary: {e}")
         return jsonify({"error": "Internal server error"}), 500
     
 @report_module_api.route('/reports/expense-summary', methods=['GET'])
+@with_etag("expense_summary")
 def expense_summary():
     try:
         user = get_user_context()
@@ -129,77 +379,65 @@ def expense_summary():
         if not company_id:
             return jsonify({"error": "company_id is required in context"}), 400
 
-        conn = get_db_postgres_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
         # Optional query parameters
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         project_id = request.args.get('project_id')
         export = request.args.get('export')
-
-        # Build WHERE clause
-        where_clauses = ["company_id = %s"]
-        params = [company_id]
-
-        if project_id:
-            where_clauses.append("project_id = %s")
-            params.append(project_id)
-
-        if start_date:
-            where_clauses.append("date >= %s")
-            params.append(start_date)
-
-        if end_date:
-            where_clauses.append("date <= %s")
-            params.append(end_date)
-
-        where_sql = " AND ".join(where_clauses)
-
-        # Query total expenses
-        cur.execute(
-            f"""
-            SELECT COALESCE(SUM(amount), 0) AS total_expense
-            FROM general_expenses
-            WHERE {where_sql}
-            """,
-            params
-        )
-        
-        total_expense = cur.fetchone()["total_expense"]
-
-        # Query monthly trend
-        cur.execute(
-            f"""
-            SELECT TO_CHAR(date, 'YYYY-MM') AS month,
-                   SUM(amount) AS amount
-            FROM general_expenses
-            WHERE {where_sql}
-            GROUP BY month
-            ORDER BY month
-            """,
-            params
+        try:
+            currency, historical = _conversion_args(request.args)
+            columnar_format = response_format(request.args) == 'columnar' and not export
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = report_cache.get_or_compute(
+            _report_cache_key(company_id, "expense_summary"),
+            lambda: _ledger_summary("general_expenses", "total_expense", company_id, start_date, end_date,
+                                    project_id, currency, historical)
         )
-        trend_rows = cur.fetchall()
-        monthly_trend = [
-            {"month": row["month"], "amount": float(row["amount"])} for row in trend_rows
-        ]
-
-        cur.close()
-        conn.close()
-
-        result = {
-            "total_expense": float(total_expense),
-            "monthly_trend": monthly_trend
-        }
-
+        if columnar_format:
+            return json_response(columnar_tables(result, LEDGER_SUMMARY_TABLES))
         return export_report_data(result, export, filename="expense_summary")
 
+    except QueryDeadlineExceeded as e:
+        print(f"Report deadline exceeded in expense_summary: {e}")
+        return jsonify({"error": "Report timed out"}), 504
+
     except Exception as e:
         print(f"Unhandled error in expense_summary: {e}")
         return jsonify({"error": "Internal server error"}), 500
     
+PROJECT_FINANCE_COLUMNS = ["project_id", "project_name", "income", "expenses", "net"]
+
+
+def _project_finance_columns(conn, cur, company_id, start_date, end_date, project_id, projects_sql,
+                             projects_params):
+    """
+    The project-finance report in columnar form (see columnar.py), built
+    from the transposed tuples of a plain cursor over the projects.
+    """
+    ids, names = transpose(iter_named_cursor(conn, projects_sql, projects_params,
+                                             cursor_factory=psycopg2.extensions.cursor), 2)
+    totals = {}
+    if ids:
+        totals_sql, totals_params = build_project_totals_query(
+            company_id=company_id,
+            start_date=start_date,
+            end_date=end_date,
+            project_id=project_id,
+        )
+        execute(conn, cur, totals_sql, totals_params)
+        totals = collect_project_totals(cur.fetchall())
+
+    project_totals = [totals.get(pid, EMPTY_PROJECT_TOTALS) for pid in ids]
+    income = [t["income"] for t in project_totals]
+    expenses = [t["general"] + t["payroll"] for t in project_totals]
+    net = [i - e for i, e in zip(income, expenses)]
+    return columnar(PROJECT_FINANCE_COLUMNS, [ids, names, income, expenses, net])
+
+
 @report_module_api.route('/reports/project-finance', methods=['GET'])
+@with_etag("project_finance")
 def project_finance_summary():
     try:
         user = get_user_context()
@@ -212,100 +450,194 @@ def project_finance_summary():
         if not company_id:
             return jsonify({"error": "company_id is required in context"}), 400
 
-        conn = get_db_postgres_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         project_id = request.args.get('project_id')
         export = request.args.get('export')
+        try:
+            columnar_format = response_format(request.args) == 'columnar' and not export
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # Base filter clause
-        base_filters = ["company_id = %s"]
-        base_params = [company_id]
-
-        if project_id:
-            base_filters.append("project_id = %s")
-            base_params.append(project_id)
-
-        if start_date:
-            base_filters.append("date >= %s")
-            base_params.append(start_date)
-
-        if end_date:
-            base_filters.append("date <= %s")
-            base_params.append(end_date)
-
-        filter_sql = " AND ".join(base_filters)
-
-        # Get projects
         if project_id:
-            cur.execute(
-                "SELECT id, name FROM projects WHERE id = %s AND company_id = %s",
-                (project_id, company_id)
-            )
+            projects_sql = "SELECT id, name FROM projects WHERE id = %s AND company_id = %s"
+            projects_params = (project_id, company_id)
         else:
-            cur.execute(
-                "SELECT id, name FROM projects WHERE company_id = %s",
-                (company_id,)
+            projects_sql = "SELECT id, name FROM projects WHERE company_id = %s"
+            projects_params = (company_id,)
+
+        conn = _report_connection()
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            if columnar_format:
+                return json_response(_project_finance_columns(conn, cur, company_id, start_date, end_date,
+                                                              project_id, projects_sql, projects_params))
+
+            # Get projects, read lazily from a server-side cursor
+            first_project, projects = iter_rows(conn, projects_sql, projects_params)
+            if first_project is None:
+                return json_response([])
+
+            # Income, general and payroll totals for every project in one grouped query
+            totals_sql, totals_params = build_project_totals_query(
+                company_id=company_id,
+                start_date=start_date,
+                end_date=end_date,
+                project_id=project_id,
             )
-        projects = cur.fetchall()
-        if not projects:
+            execute(conn, cur, totals_sql, totals_params)
+            totals = collect_project_totals(cur.fetchall())
+
+            result = []
+
+            for project in projects:
+                pid = project["id"]
+                pname = project["name"]
+                project_totals = totals.get(pid, EMPTY_PROJECT_TOTALS)
+
+                total_income = project_totals["income"]
+                total_expense = project_totals["general"] + project_totals["payroll"]
+                net = total_income - total_expense
+
+                result.append({
+                    "project_id": pid,
+                    "project_name": pname,
+                    "income": total_income,
+                    "expenses": total_expense,
+                    "net": net
+                })
+        finally:
             cur.close()
             conn.close()
-            return jsonify([])
 
-        result = []
+        return export_report_data(result, export, filename="finance_summary")
 
-        for project in projects:
-            pid = project["id"]
-            pname = project["name"]
+    except Exception as e:
+        print(f"Unhandled error in project_finance_summary: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+    
+TENDER_STATUS_COLUMNS = [
+    "tender_id", "status", "start_date", "end_date", "project_id", "project_name",
+    "project_description", "general_expenses_incurred", "payroll_expenses_incurred",
+    "total_income",
+]
 
-            # Income
-            income_params = base_params.copy()
-            cur.execute(
-                f"SELECT COALESCE(SUM(amount), 0) AS total_income "
-                f"FROM income_entries WHERE {filter_sql} AND project_id = %s",
-                income_params + [pid]
-            )
-            total_income = float(cur.fetchone()["total_income"])
+# Columns of build_tender_status_query, in order; the totals columns follow them.
+TENDER_QUERY_COLUMNS = TENDER_STATUS_COLUMNS[:7]
 
-            # Expenses (general + payroll)
-            cur.execute(
-                f"SELECT COALESCE(SUM(amount), 0) AS general_expense "
-                f"FROM general_expenses WHERE {filter_sql} AND project_id = %s",
-                income_params + [pid]
-            )
-            general_expense = float(cur.fetchone()["general_expense"])
+EMPTY_PROJECT_TOTALS = {"income": 0.0, "general": 0.0, "payroll": 0.0}
 
-            cur.execute(
-                f"SELECT COALESCE(SUM(amount), 0) AS payroll_expense "
-                f"FROM payroll_entries WHERE {filter_sql} AND project_id = %s",
-                income_params + [pid]
-            )
-            payroll_expense = float(cur.fetchone()["payroll_expense"])
 
-            total_expense = general_expense + payroll_expense
-            net = total_income - total_expense
+def _fetch_project_totals(conn, cur, company_id, project_ids):
+    """Fetches general/payroll/income totals for the given projects in one query."""
+    totals_sql, totals_params = build_project_totals_query(
+        company_id=company_id,
+        project_ids=project_ids,
+    )
+    execute(conn, cur, totals_sql, totals_params)
+    return collect_project_totals(cur.fetchall())
+
+
+def _tender_status_row(tender, totals):
+    """Builds one tender-status result row from a tender and its project's totals."""
+    project_totals = totals.get(tender["project_id"], EMPTY_PROJECT_TOTALS)
+    return {
+        "tender_id": tender["tender_id"],
+        "status": tender["status"],
+        "start_date": tender["start_date"],
+        "end_date": tender["end_date"],
+        "project_id": tender["project_id"],
+        "project_name": tender["project_name"],
+        "project_description": tender["project_description"],
+        "general_expenses_incurred": {
+            "amount": project_totals["general"]
+        },
+        "payroll_expenses_incurred": {
+            "amount": project_totals["payroll"]
+        },
+        "total_income": {
+            "amount": project_totals["income"]
+        }
+    }
 
-            result.append({
-                "project_id": pid,
-                "project_name": pname,
-                "income": total_income,
-                "expenses": total_expense,
-                "net": net
-            })
 
+def _tender_project_totals(conn, filters):
+    """
+    Totals of the projects the filtered tenders belong to, or None when no
+    tender matches the filters.
+    """
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        projects_sql, projects_params = build_tender_projects_query(**filters)
+        execute(conn, cur, projects_sql, projects_params)
+        project_ids = [row["project_id"] for row in cur.fetchall()]
+        if not project_ids:
+            return None
+        return _fetch_project_totals(conn, cur, filters["company_id"], project_ids)
+    finally:
         cur.close()
+
+
+def _tender_status_rows(conn, company_id, start_date, end_date, project_id, status):
+    """
+    Resolves the (small) per-project totals up front and returns an iterator
+    that lazily reads the tenders from a server-side cursor and yields
+    finished result rows. Returns None when no tender matches the filters.
+    """
+    filters = dict(company_id=company_id, start_date=start_date, end_date=end_date,
+                   project_id=project_id, status=status)
+    totals = _tender_project_totals(conn, filters)
+    if totals is None:
+        return None
+
+    sql, params = build_tender_status_query(**filters)
+    return (_tender_status_row(tender, totals) for tender in iter_named_cursor(conn, sql, params))
+
+
+def _tender_status_columns(conn, company_id, start_date, end_date, project_id, status):
+    """
+    The tender-status report in columnar form (see columnar.py): the tender
+    columns are the transposed tuples of a plain cursor and the expense and
+    income columns hold the bare amounts of each tender's project.
+    """
+    filters = dict(company_id=company_id, start_date=start_date, end_date=end_date,
+                   project_id=project_id, status=status)
+    totals = _tender_project_totals(conn, filters)
+    if totals is None:
+        return columnar(TENDER_STATUS_COLUMNS, transpose((), len(TENDER_STATUS_COLUMNS)))
+
+    sql, params = build_tender_status_query(**filters)
+    values = transpose(iter_named_cursor(conn, sql, params, cursor_factory=psycopg2.extensions.cursor),
+                       len(TENDER_QUERY_COLUMNS))
+    project_ids = values[TENDER_QUERY_COLUMNS.index("project_id")]
+    project_totals = [totals.get(pid, EMPTY_PROJECT_TOTALS) for pid in project_ids]
+    for source in ("general", "payroll", "income"):
+        values.append([t[source] for t in project_totals])
+    return columnar(TENDER_STATUS_COLUMNS, values)
+
+
+def _export_dates(rows):
+    """
+    Tender rows with str() dates, as the CSV and PDF exports have always
+    written them ("None" for a missing end date, a space in timestamps);
+    only the JSON response takes the encoder's ISO 8601 values.
+    """
+    for row in rows:
+        row["start_date"] = str(row["start_date"])
+        row["end_date"] = str(row["end_date"])
+        yield row
+
+
+def _closing(conn, rows):
+    """Yields from rows and returns the connection to the pool once done."""
+    try:
+        yield from rows
+    finally:
         conn.close()
 
-        return export_report_data(result, export, filename="finance_summary")
 
-    except Exception as e:
-        print(f"Unhandled error in project_finance_summary: {e}")
-        return jsonify({"error": "Internal server error"}), 500
-    
 @report_module_api.route('/reports/tender-status', methods=['GET'])
+@with_etag("tender_status")
 def tender_status_report():
     try:
         user = get_user_context()
@@ -328,79 +660,95 @@ def tender_status_report():
         
         if not date_is_valid:
             return jsonify(error_message), 400
-        
-        conn = get_db_postgres_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        sql, params = build_tender_status_query(
-            company_id=company_id,
-            start_date=start_date,
-            end_date=end_date,
-            project_id=project_id,
-            status=status,
-        )
-        cur.execute(sql, params)
-
-        tenders = cur.fetchall()
-        results = []
-        
-        if not tenders:
-            cur.close()
-            conn.close()
-            return jsonify([]), 200
-
-        for tender in tenders:
-            # Per-project finance aggregation
-            pid = tender['project_id']
-            cur.execute("""
-                SELECT COALESCE(SUM(amount), 0) FROM general_expenses 
-                WHERE company_id = %s AND project_id = %s
-            """, (company_id, pid))
-            general_exp = float(cur.fetchone()[0])
-
-            cur.execute("""
-                SELECT COALESCE(SUM(amount), 0) FROM payroll_entries 
-                WHERE company_id = %s AND project_id = %s
-            """, (company_id, pid))
-            payroll_exp = float(cur.fetchone()[0])
-
-            cur.execute("""
-                SELECT COALESCE(SUM(amount), 0) FROM income_entries 
-                WHERE company_id = %s AND project_id = %s
-            """, (company_id, pid))
-            income = float(cur.fetchone()[0])
-
-            results.append({
-                "tender_id": tender["tender_id"],
-                "status": tender["status"],
-                "start_date": str(tender["start_date"]),
-                "end_date": str(tender["end_date"]),
-                "project_id": tender["project_id"],
-                "project_name": tender["project_name"],
-                "project_description": tender["project_description"],
-                "general_expenses_incurred": {
-                    "amount": general_exp
-                },
-                "payroll_expenses_incurred": {
-                    "amount": payroll_exp
-                },
-                "total_income": {
-                    "amount": income
-                }
-            })
+        try:
+            columnar_format = response_format(request.args) == 'columnar' and not export
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        conn = _report_connection()
+        # Streamed exports hand the connection over to the response body
+        streaming = False
+        try:
+            if columnar_format:
+                return json_response(_tender_status_columns(conn, company_id, start_date, end_date,
+                                                            project_id, status))
+
+            tenders = _tender_status_rows(conn, company_id, start_date, end_date, project_id, status)
+            if tenders is None:
+                return json_response([])
+
+            if export == 'csv':
+                response = stream_csv_response(_closing(conn, _export_dates(tenders)), TENDER_STATUS_COLUMNS,
+                                               filename="tender_status")
+                streaming = True
+                return response
+            if export == 'pdf':
+                response = pdf_response(_closing(conn, _export_dates(tenders)), TENDER_STATUS_COLUMNS,
+                                        filename="tender_status")
+                streaming = True
+                return response
+
+            results = list(tenders)
+        finally:
+            if not streaming:
+                conn.close()
 
-        cur.close()
-        conn.close()
         return export_report_data(results, export, filename="tender_status")
 
     except Exception as e:
         print(f"Unhandled error in tender_status_report: {e}")
         return jsonify({"error": "Internal server error"}), 500
     
+def _overall_summary(company_id, start_date, end_date, project_id, status, currency=None):
+    """
+    Computes the overall summary: ledger totals, tender counts per status
+    and the number of projects, in a single round trip (or, in parallel
+    mode, as concurrent sub-queries). With `currency`, the ledger totals
+    are converted into it inside the query.
+    """
+    if parallel_enabled():
+        parts = overall_summary_parts(company_id, start_date, end_date, project_id, status, currency)
+        _release_unused_report_connection()
+        results = run_queries(get_db_postgres_connection, [
+            SubQuery(column, f"SELECT {expr} AS {column}", params, "one")
+            for column, expr, params in parts
+        ])
+        row = {column: results[column][column] for column, _, _ in parts}
+        return _overall_summary_result(row, currency)
+
+    conn = _report_connection()
+    cur = None
+    try:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+        sql, params = build_overall_summary_query(company_id, start_date, end_date, project_id, status, currency)
+        execute(conn, cur, sql, params)
+        return _overall_summary_result(cur.fetchone(), currency)
+    finally:
+        if cur:
+            cur.close()
+        conn.close()
+
+
+def _overall_summary_result(row, currency=None):
+    result = {
+        "total_income": float(row["total_income"]),
+        "total_general_expenses": float(row["total_general_expenses"]),
+        "total_payroll_expenses": float(row["total_payroll_expenses"]),
+        "tender_counts": [
+            {"status": tc["status"], "count": tc["count"]} for tc in row["tender_counts"]
+        ],
+        "project_count": row["project_count"]
+    }
+    if currency:
+        result["currency"] = currency
+        result["missing_rates"] = list(row["missing_rates"])
+    return result
+
+
 @report_module_api.route('/reports/overall-summary', methods=['GET'])
+@with_etag("overall_summary")
 def overall_summary_report():
-    cur = None
-    conn = None
     try:
         user = get_user_context()
         role = user["role"]
@@ -420,96 +768,150 @@ def overall_summary_report():
         
         if not date_is_valid:
             return jsonify(error_message), 400
+        try:
+            currency = normalize_currency(request.args.get('currency'))
+            columnar_format = response_format(request.args) == 'columnar' and not export
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = report_cache.get_or_compute(
+            _report_cache_key(company_id, "overall_summary"),
+            lambda: _overall_summary(company_id, start_date, end_date, project_id, status, currency)
+        )
 
-        filters = ["company_id = %s"]
-        params  = [company_id]
+        if columnar_format:
+            return json_response(columnar_tables(result, OVERALL_SUMMARY_TABLES))
+        return export_report_data(result, export, "overall-summary")
 
-        if project_id:
-            filters.append("project_id = %s")
-            params.append(project_id)
-        if start_date:
-            filters.append("date >= %s")
-            params.append(start_date)
-        if end_date:
-            filters.append("date <= %s")
-            params.append(end_date)
-
-        date_filter_sql = " AND ".join(filters)
-
-        conn = get_db_postgres_connection()
-        cur  = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        cur.execute(
-            f"SELECT COALESCE(SUM(amount),0) AS total_income FROM income_entries WHERE {date_filter_sql}",
-            params
-        )
-        total_income = float(cur.fetchone()["total_income"])
+    except QueryDeadlineExceeded as e:
+        print(f"Report deadline exceeded in overall_summary_report: {e}")
+        return jsonify({"error": "Report timed out"}), 504
 
-        cur.execute(
-            f"SELECT COALESCE(SUM(amount),0) AS total_general_expenses FROM general_expenses WHERE {date_filter_sql}",
-            params
-        )
-        total_gen_exp = float(cur.fetchone()["total_general_expenses"])
+    except Exception as e:
+        print(f"Unhandled error in overall_summary_report: {e}")
+        return jsonify({"error": "Internal server error"}), 500
 
-        cur.execute(
-            f"SELECT COALESCE(SUM(amount),0) AS total_payroll_expenses FROM payroll_entries WHERE {date_filter_sql}",
-            params
-        )
-        total_pay_exp = float(cur.fetchone()["total_payroll_expenses"])
 
-        tender_filters = ["t.company_id = %s"]
-        tparams = [company_id]
-        if project_id:
-            tender_filters.append("t.project_id = %s")
-            tparams.append(project_id)
-        if status:
-            tender_filters.append("t.status = %s")
-            tparams.append(status)
-        if start_date:
-            tender_filters.append("t.start_date >= %s")
-            tparams.append(start_date)
-        if end_date:
-            tender_filters.append("t.end_date <= %s")
-            tparams.append(end_date)
-
-        tender_where = " AND ".join(tender_filters)
-        cur.execute(
-        f"""SELECT t.status, COUNT(*) AS count FROM tenders t WHERE {tender_where} GROUP BY t.status ORDER BY t.status""" ,
-            tparams)
-        
-        tender_counts = [{ "status": row["status"], "count": row["count"] } for row in cur.fetchall()]
+@report_module_api.route('/reports/cache-stats', methods=['GET'])
+def cache_stats():
+    user = get_user_context()
+    if user["role"] != 'Admin':
+        return jsonify({"error": "Access denied: insufficient permissions"}), 403
+    return jsonify(report_cache.stats())
 
 
-        proj_filters = ["company_id = %s"]
-        pparams = [company_id]
-        if project_id:
-            proj_filters.append("id = %s")
-            pparams.append(project_id)
-        cur.execute(
-            f"SELECT COUNT(*) AS project_count FROM projects WHERE {' AND '.join(proj_filters)}",
-            pparams
-        )
-        project_count = cur.fetchone()["project_count"]
+def _export_job_view(job):
+    view = {key: job[key] for key in ("job_id", "report", "format", "status", "progress", "error",
+                                      "created_at", "started_at", "finished_at", "expires_at")}
+    if job["status"] == "done":
+        view["download_url"] = url_for("api.download_export_job", job_id=job["job_id"])
+    return view
 
-        cur.close()
-        conn.close()
-        
-        result = {
-            "total_income": total_income,
-            "total_general_expenses": total_gen_exp,
-            "total_payroll_expenses": total_pay_exp,
-            "tender_counts": tender_counts,
-            "project_count": project_count
-        }
-        
-        return export_report_data(result, export, "overall-summary")
+
+@report_module_api.route('/reports/exports', methods=['POST'])
+def submit_export_job():
+    """
+    Queues an export of a report. Body: {"report": "tender-status",
+    "format": "csv" | "pdf", "filters": {"start_date": ..., ...}}.
+    """
+    try:
+        user = get_user_context()
+        role = user["role"]
+        company_id = user["company_id"]
+
+        if role not in ('Admin', 'Finance', 'HR'):
+            return jsonify({"error": "Access denied: insufficient permissions"}), 403
+        if not company_id:
+            return jsonify({"error": "company_id is required in context"}), 400
+
+        body = request.get_json(silent=True) or {}
+        filters = {key: value for key, value in (body.get("filters") or {}).items() if key in EXPORT_FILTERS}
+        date_is_valid, error_message, _, _ = validate_dates(filters.get("start_date"), filters.get("end_date"))
+        if not date_is_valid:
+            return jsonify(error_message), 400
+
+        try:
+            job = export_jobs.submit(user, body.get("report"), body.get("format"), filters)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except (ExportQueueFull, CompanyExportLimit) as e:
+            return jsonify({"error": str(e)}), 429
+
+        view = _export_job_view(job)
+        view["status_url"] = url_for("api.export_job_status", job_id=job["job_id"])
+        return jsonify(view), 202
 
     except Exception as e:
-        print(f"Unhandled error in overall_summary_report: {e}")
+        print(f"Unhandled error in submit_export_job: {e}")
         return jsonify({"error": "Internal server error"}), 500
-    
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
\ No newline at end of file
+
+
+@report_module_api.route('/reports/exports/<job_id>', methods=['GET'])
+def export_job_status(job_id):
+    user = get_user_context()
+    if user["role"] not in ('Admin', 'Finance', 'HR'):
+        return jsonify({"error": "Access denied: insufficient permissions"}), 403
+
+    job = export_jobs.get(job_id, user["company_id"])
+    if job is None:
+        return jsonify({"error": "Export job not found"}), 404
+    return jsonify(_export_job_view(job))
+
+
+@report_module_api.route('/reports/exports/<job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    user = get_user_context()
+    if user["role"] not in ('Admin', 'Finance', 'HR'):
+        return jsonify({"error": "Access denied: insufficient permissions"}), 403
+
+    job = export_jobs.get(job_id, user["company_id"])
+    if job is None:
+        return jsonify({"error": "Export job not found"}), 404
+    if job["status"] != "done":
+        return jsonify({"error": f"Export is {job['status']}", "job": _export_job_view(job)}), 409
+    return send_file(export_jobs.result_path(job), mimetype=job.get("mimetype"), as_attachment=True,
+                     download_name=f"{job['report']}.{job['format']}")
+
+
+@report_module_api.route('/reports/narratives', methods=['POST'])
+def submit_narrative():
+    """
+    Queues an AI narrative. Body: {"prompt": "...", "deadline": seconds (optional)}.
+    Returns 202 with a task id to poll; the request never waits for the model.
+    """
+    try:
+        user = get_user_context()
+        role = user["role"]
+        company_id = user["company_id"]
+
+        if role not in ('Admin', 'Finance', 'HR'):
+            return jsonify({"error": "Access denied: insufficient permissions"}), 403
+        if not company_id:
+            return jsonify({"error": "company_id is required in context"}), 400
+
+        body = request.get_json(silent=True) or {}
+        try:
+            task = narratives.submit(body.get("prompt"), company_id, body.get("deadline"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except NarrativeQueueFull as e:
+            return jsonify({"error": str(e)}), 429
+
+        task["status_url"] = url_for("api.narrative_status", task_id=task["task_id"])
+        return jsonify(task), 202
+
+    except Exception as e:
+        print(f"Unhandled error in submit_narrative: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@report_module_api.route('/reports/narratives/<task_id>', methods=['GET'])
+def narrative_status(task_id):
+    user = get_user_context()
+    if user["role"] not in ('Admin', 'Finance', 'HR'):
+        return jsonify({"error": "Access denied: insufficient permissions"}), 403
+
+    task = narratives.get(task_id, user["company_id"])
+    if task is None:
+        return jsonify({"error": "Narrative task not found"}), 404
+    return jsonify(task)
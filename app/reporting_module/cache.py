@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+from .cache_backends import MemoryBackend, backend_from_env
+
+# Seconds a cached report stays fresh, per endpoint.
+REPORT_CACHE_TTLS = {
+    "income_summary": 60,
+    "expense_summary": 60,
+    "overall_summary": 30,
+}
+DEFAULT_TTL = 60
+
+# Query arguments that change a report's result and therefore its cache key.
+CACHE_KEY_FILTERS = ("start_date", "end_date", "project_id", "status", "currency", "rates")
+
+# Payloads larger than this are zlib-compressed before they are stored.
+COMPRESS_THRESHOLD = 512
+_RAW, _ZLIB = b"j", b"z"
+
+
+def make_cache_key(company_id, endpoint, args):
+    """
+    Builds the cache key for a report request.
+
+    Only the filters in CACHE_KEY_FILTERS take part, with surrounding
+    whitespace stripped and empty values dropped, so `?status=&start_date=2024-01-01`
+    and `?start_date=2024-01-01` share an entry. Presentation arguments such
+    as `export` are ignored: the cached value is the report data, not the
+    rendered response.
+
+    Args:
+        company_id (str): Company the report is scoped to.
+        endpoint (str): Report name, e.g. "income_summary".
+        args (Mapping): Request query arguments.
+
+    Returns:
+        tuple: A hashable key.
+    """
+    filters = []
+    for name in CACHE_KEY_FILTERS:
+        value = args.get(name)
+        if value is not None:
+            value = str(value).strip()
+        if value:
+            filters.append((name, value))
+    return (str(company_id), endpoint, tuple(filters))
+
+
+def _storage_key(key):
+    return json.dumps(key, separators=(",", ":"))
+
+
+def _dumps(fresh_until, value):
+    payload = json.dumps([fresh_until, value], separators=(",", ":")).encode()
+    if len(payload) > COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(payload)
+    return _RAW + payload
+
+
+def _loads(blob):
+    payload = blob[1:]
+    if blob[:1] == _ZLIB:
+        payload = zlib.decompress(payload)
+    fresh_until, value = json.loads(payload)
+    return fresh_until, value
+
+
+class ReportCache:
+    """
+    Cache of report results on top of a pluggable CacheBackend.
+
+    Values are stored as compact JSON (zlib-compressed when large) together
+    with the time they stop being fresh. Entries are kept for `stale_factor`
+    times their TTL so that, while one worker recomputes an expired report
+    under the backend lock, the others can keep serving the stale copy.
+
+    Args:
+        backend (CacheBackend): Storage; a MemoryBackend of `maxsize` if omitted.
+        maxsize (int): Size of the default MemoryBackend.
+        ttls (dict): Seconds a report stays fresh, per endpoint name.
+        default_ttl (float): TTL for endpoints missing from `ttls`.
+        stale_factor (float): Entries live for ttl * stale_factor in the backend.
+        lock_timeout (float): Seconds after which a recompute lock expires.
+        lock_wait (float): Seconds a worker without a stale copy waits for the
+            lock holder before computing the report itself.
+        timer (callable): Clock used for freshness.
+    """
+
+    def __init__(self, backend=None, maxsize=1024, ttls=None, default_ttl=DEFAULT_TTL,
+                 stale_factor=2, lock_timeout=30, lock_wait=5, timer=None,
+                 poll_interval=0.05):
+        self.timer = timer or time.time
+        self.backend = backend or MemoryBackend(maxsize=maxsize, timer=self.timer)
+        self.ttls = dict(REPORT_CACHE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_factor = stale_factor
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.representation_hits = 0
+        self.representation_misses = 0
+        self._counter_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _ttl(self, key):
+        return self.ttls.get(key[1], self.default_ttl)
+
+    def _lookup(self, key):
+        """Returns (value, fresh) from the backend, or (None, False)."""
+        blob = self.backend.get(_storage_key(key))
+        if blob is None:
+            return None, False
+        fresh_until, value = _loads(blob)
+        return value, self.timer() < fresh_until
+
+    def get(self, key):
+        """Returns the cached value for key if it is still fresh, else None."""
+        value, fresh = self._lookup(key)
+        if fresh:
+            self._count("hits")
+            return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        ttl = self._ttl(key)
+        self.backend.set(_storage_key(key), _dumps(self.timer() + ttl, value), ttl * self.stale_factor)
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, recomputing it on a miss.
+
+        Only the worker holding the backend lock for key calls compute();
+        others serve the stale value if there is one, otherwise wait up to
+        `lock_wait` seconds for the holder to publish a fresh one. Exceptions
+        from compute() propagate and nothing is cached.
+        """
+        value, fresh = self._lookup(key)
+        if fresh:
+            self._count("hits")
+            return value
+
+        lock_key = _storage_key(key)
+        token = self.backend.acquire_lock(lock_key, self.lock_timeout)
+        if token is None:
+            if value is not None:
+                self._count("stale_hits")
+                return value
+
+            self._count("waits")
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                value, fresh = self._lookup(key)
+                if fresh:
+                    self._count("hits")
+                    return value
+
+        self._count("misses")
+        try:
+            value = compute()
+            self.set(key, value)
+            return value
+        finally:
+            if token is not None:
+                self.backend.release_lock(lock_key, token)
+
+    def representation(self, key, name, data, render):
+        """
+        Returns render(data), reusing a copy stored next to the entry for
+        `key` (e.g. the gzip-compressed response body built from it).
+
+        Copies are stored per `name` and digest of `data`, so one rendered
+        from an older result is never returned, and live as long as the
+        entry itself.
+        """
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        storage_key = _storage_key(list(key) + ["representation", name, digest])
+        rendered = self.backend.get(storage_key)
+        if rendered is not None:
+            self._count("representation_hits")
+            return rendered
+
+        self._count("representation_misses")
+        rendered = render(data)
+        self.backend.set(storage_key, rendered, self._ttl(key) * self.stale_factor)
+        return rendered
+
+    def clear(self):
+        self.backend.clear()
+        with self._counter_lock:
+            self.hits = self.stale_hits = self.misses = self.waits = 0
+            self.representation_hits = self.representation_misses = 0
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._counter_lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "representation_hits": self.representation_hits,
+                "representation_misses": self.representation_misses,
+            }
+        stats.update(self.backend.stats())
+        return stats
+
+
+report_cache = ReportCache(backend=backend_from_env())
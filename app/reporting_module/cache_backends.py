@@ -0,0 +1,307 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from cachetools import TLRUCache
+
+
+class CacheBackend:
+    """
+    Storage interface behind ReportCache.
+
+    Backends store opaque bytes under string keys with a time-to-live and
+    provide a non-blocking, self-expiring lock used to let only one worker
+    recompute an expired report.
+    """
+
+    def get(self, key):
+        """Returns the stored bytes, or None if missing or expired."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        """Stores bytes for `ttl` seconds."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def acquire_lock(self, key, ttl):
+        """
+        Tries to take the lock named `key` without blocking. The lock expires
+        on its own after `ttl` seconds so a crashed holder cannot wedge it.
+        Returns a token to pass to release_lock(), or None if it is held.
+        """
+        raise NotImplementedError
+
+    def release_lock(self, key, token):
+        raise NotImplementedError
+
+    def stats(self):
+        """Backend-specific counters merged into ReportCache.stats()."""
+        return {}
+
+
+class _CountingTLRUCache(TLRUCache):
+    """TLRUCache that counts LRU evictions and TTL expirations."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evictions = 0
+        self.expirations = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Per-process backend: a bounded TTL + LRU map and in-process locks.
+
+    Args:
+        maxsize (int): Maximum number of stored entries.
+        timer (callable): Monotonic clock, injectable for tests.
+    """
+
+    def __init__(self, maxsize=1024, timer=time.monotonic):
+        self._timer = timer
+        self._entries = _CountingTLRUCache(maxsize, self._ttu, timer=timer)
+        self._locks = {}
+        self._mutex = threading.Lock()
+
+    @staticmethod
+    def _ttu(key, value, now):
+        return now + value[0]
+
+    def get(self, key):
+        with self._mutex:
+            item = self._entries.get(key)
+            return None if item is None else item[1]
+
+    def set(self, key, value, ttl):
+        with self._mutex:
+            self._entries[key] = (ttl, value)
+
+    def delete(self, key):
+        with self._mutex:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._mutex:
+            self._entries.clear()
+            self._entries.evictions = self._entries.expirations = 0
+            self._locks.clear()
+
+    def acquire_lock(self, key, ttl):
+        now = self._timer()
+        with self._mutex:
+            held = self._locks.get(key)
+            if held is not None and held[1] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (token, now + ttl)
+            return token
+
+    def release_lock(self, key, token):
+        with self._mutex:
+            held = self._locks.get(key)
+            if held is not None and held[0] == token:
+                del self._locks[key]
+
+    def stats(self):
+        with self._mutex:
+            self._entries.expire()
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "maxsize": self._entries.maxsize,
+                "evictions": self._entries.evictions,
+                "expirations": self._entries.expirations,
+            }
+
+
+class SqliteBackend(CacheBackend):
+    """
+    File-based backend shared by all worker processes on one node.
+
+    Entries beyond `maxsize` are evicted soonest-to-expire first.
+
+    Args:
+        path (str): SQLite database file.
+        maxsize (int): Maximum number of stored entries.
+        timer (callable): Wall clock (comparable across processes).
+    """
+
+    def __init__(self, path, maxsize=10000, timer=time.time):
+        self.path = path
+        self.maxsize = maxsize
+        self._timer = timer
+        self._local = threading.local()
+        self.evictions = 0
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS report_cache "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS report_cache_expires ON report_cache (expires)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS report_cache_locks "
+                "(key TEXT PRIMARY KEY, token TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM report_cache WHERE key = ? AND expires > ?",
+            (key, self._timer())
+        ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        now = self._timer()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO report_cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), now + ttl)
+            )
+            conn.execute("DELETE FROM report_cache WHERE expires <= ?", (now,))
+            excess = conn.execute("SELECT COUNT(*) FROM report_cache").fetchone()[0] - self.maxsize
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM report_cache WHERE key IN "
+                    "(SELECT key FROM report_cache ORDER BY expires LIMIT ?)",
+                    (excess,)
+                )
+                self.evictions += excess
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM report_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM report_cache")
+        conn.execute("DELETE FROM report_cache_locks")
+        self.evictions = 0
+
+    def acquire_lock(self, key, ttl):
+        conn = self._conn()
+        now = self._timer()
+        token = uuid.uuid4().hex
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM report_cache_locks WHERE key = ? AND expires <= ?", (key, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO report_cache_locks (key, token, expires) VALUES (?, ?, ?)",
+                (key, token, now + ttl)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return token if cur.rowcount == 1 else None
+
+    def release_lock(self, key, token):
+        self._conn().execute("DELETE FROM report_cache_locks WHERE key = ? AND token = ?", (key, token))
+
+    def stats(self):
+        size = self._conn().execute(
+            "SELECT COUNT(*) FROM report_cache WHERE expires > ?", (self._timer(),)
+        ).fetchone()[0]
+        return {"backend": "sqlite", "size": size, "maxsize": self.maxsize, "evictions": self.evictions}
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend shared by workers on every node through a Redis-compatible server.
+    Eviction is left to the server's maxmemory policy.
+
+    Args:
+        url (str): Server URL, e.g. "redis://localhost:6379/0".
+        client: Optional pre-built client (anything with the redis-py API).
+        prefix (str): Namespace for keys written by this backend.
+    """
+
+    def __init__(self, url=None, client=None, prefix="report-cache:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("RedisBackend requires the 'redis' package") from e
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key):
+        return self._client.get(self._prefix + key)
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self._client.delete(self._prefix + key)
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self._prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def acquire_lock(self, key, ttl):
+        token = uuid.uuid4().hex
+        acquired = self._client.set(
+            self._prefix + "lock:" + key, token, nx=True, px=max(1, int(ttl * 1000))
+        )
+        return token if acquired else None
+
+    def release_lock(self, key, token):
+        # Only the holder may release; compare-and-delete runs atomically on the server.
+        self._client.eval(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0",
+            1, self._prefix + "lock:" + key, token
+        )
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+def backend_from_env():
+    """
+    Builds the backend selected by REPORT_CACHE_BACKEND (memory, sqlite or
+    redis). REPORT_CACHE_PATH and REPORT_CACHE_URL configure the shared ones.
+    """
+    kind = os.getenv("REPORT_CACHE_BACKEND", "memory").lower()
+    maxsize = int(os.getenv("REPORT_CACHE_MAXSIZE", 1024))
+
+    if kind == "memory":
+        return MemoryBackend(maxsize=maxsize)
+    if kind == "sqlite":
+        return SqliteBackend(os.getenv("REPORT_CACHE_PATH", "report_cache.sqlite3"), maxsize=maxsize)
+    if kind == "redis":
+        return RedisBackend(os.getenv("REPORT_CACHE_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown REPORT_CACHE_BACKEND: {kind!r}")
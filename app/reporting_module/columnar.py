@@ -0,0 +1,52 @@
+"""
+Columnar JSON for the tabular reports (`?format=columnar`).
+
+Instead of one object per row, repeating every key, the response is
+
+    {"columns": ["tender_id", "status", ...], "values": [[1, 2, ...], ["Open", "Closed", ...], ...]}
+
+with `values[i]` holding column `columns[i]` for every row. Nested
+`{"amount": x}` wrappers are left out: an amount column holds the numbers.
+Columns are built by transposing the tuples of a plain (non-dict) cursor,
+so no per-row dict is created. The summary reports are objects rather than
+tables; in columnar form each of their row arrays (e.g. `monthly_trend`)
+becomes such a `{"columns", "values"}` object, see columnar_tables().
+"""
+
+RESPONSE_FORMATS = ("records", "columnar")
+
+
+def response_format(args):
+    """
+    The `format` query argument, "records" when absent. Raises ValueError
+    with a client-facing message when unknown.
+    """
+    value = (args.get("format") or "records").strip().lower()
+    if value not in RESPONSE_FORMATS:
+        raise ValueError("format must be 'records' or 'columnar'")
+    return value
+
+
+def transpose(rows, width):
+    """Columns (tuples) of an iterable of row tuples; `width` empty columns when there are no rows."""
+    columns = list(zip(*rows))
+    return columns or [() for _ in range(width)]
+
+
+def columnar(columns, values):
+    """The columnar response body for `columns` and their value arrays."""
+    return {"columns": list(columns), "values": list(values)}
+
+
+def columnar_tables(result, tables):
+    """
+    A copy of the summary object `result` whose row arrays are in columnar
+    form: every field of `tables` ({field: columns}) present in `result`
+    becomes a columnar body of those columns. Other fields are kept as is.
+    """
+    converted = dict(result)
+    for field, columns in tables.items():
+        if field in converted:
+            rows = (tuple(row[column] for column in columns) for row in converted[field])
+            converted[field] = columnar(columns, transpose(rows, len(columns)))
+    return converted
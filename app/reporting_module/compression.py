@@ -0,0 +1,177 @@
+"""
+Content negotiation and compression of report responses.
+
+The encoding is picked from the client's Accept-Encoding among the ones
+available here: gzip always, brotli (`br`) with the `brotli` package and
+zstd with the `zstandard` package. Buffered bodies are compressed whole,
+and a body rendered from a cached report is compressed once and stored
+next to the cache entry. Streamed bodies (CSV exports read from a
+server-side cursor) are compressed chunk by chunk, flushing after every
+chunk so the client keeps receiving data as it is produced.
+"""
+import gzip
+import os
+import zlib
+
+# Preferred first when the client accepts several with the same quality.
+ENCODINGS = ("zstd", "br", "gzip")
+
+# PDF is left out: its content streams are already Flate-compressed, so
+# gzip/zstd would cost CPU (and per-chunk flushes) for almost no saving.
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/csv", "text/plain", "text/html")
+
+
+def compression_settings_from_env():
+    """Reads the compression settings from REPORT_COMPRESSION* environment variables."""
+    return {
+        "enabled": os.getenv("REPORT_COMPRESSION", "1") != "0",
+        "min_size": int(os.getenv("REPORT_COMPRESSION_MIN_SIZE", 1024)),
+        "encodings": [e.strip() for e in os.getenv("REPORT_COMPRESSION_ENCODINGS", ",".join(ENCODINGS)).split(",")
+                      if e.strip()],
+    }
+
+
+def _gzip_stream():
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _brotli():
+    import brotli
+    return brotli
+
+
+def _brotli_stream():
+    compressor = _brotli().Compressor(quality=5)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+def _zstandard():
+    import zstandard
+    return zstandard
+
+
+def _zstd_stream():
+    zstandard = _zstandard()
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    return (compressor.compress, lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush)
+
+
+# encoding -> (one-shot compress, streaming compressor factory, module check)
+_CODECS = {
+    "gzip": (lambda data: gzip.compress(data, 6, mtime=0), _gzip_stream, None),
+    "br": (lambda data: _brotli().compress(data, quality=5), _brotli_stream, _brotli),
+    "zstd": (lambda data: _zstandard().ZstdCompressor(level=3).compress(data), _zstd_stream, _zstandard),
+}
+
+_available = None
+
+
+def available_encodings():
+    """The encodings whose compressor can be imported, in preference order."""
+    global _available
+    if _available is None:
+        available = []
+        for encoding in ENCODINGS:
+            check = _CODECS[encoding][2]
+            try:
+                if check is not None:
+                    check()
+            except ImportError:
+                continue
+            available.append(encoding)
+        _available = tuple(available)
+    return _available
+
+
+def negotiate(accept_encodings, encodings=None):
+    """
+    Picks the encoding for a response.
+
+    Args:
+        accept_encodings (werkzeug.datastructures.Accept): The request's
+            parsed Accept-Encoding header.
+        encodings (list): Encodings the server may use, in preference order;
+            all available ones by default.
+
+    Returns:
+        str: The chosen encoding, or None to send the body as is.
+    """
+    available = available_encodings()
+    candidates = [e for e in (encodings or available) if e in available]
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding):
+    """Compresses a whole body."""
+    return _CODECS[encoding][0](data)
+
+
+def compress_stream(chunks, encoding):
+    """
+    Compresses an iterable of str or bytes chunks, yielding compressed data
+    flushed after every input chunk. Closes `chunks` when done or closed.
+    """
+    process, flush, finish = _CODECS[encoding][1]()
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            out = process(chunk) + flush()
+            if out:
+                yield out
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def compress_response(response, accept_encodings, cache=None, cache_key=None, settings=None):
+    """
+    Compresses a successful report response in the negotiated encoding.
+
+    Args:
+        response (flask.Response): The response to compress in place.
+        accept_encodings (werkzeug.datastructures.Accept): The request's
+            Accept-Encoding.
+        cache (ReportCache): Where the compressed body of a cached report
+            is stored, next to the report.
+        cache_key (tuple): Report cache key the body was rendered from, if any.
+        settings (dict): compression_settings_from_env() by default.
+
+    Returns:
+        flask.Response: The same response.
+    """
+    settings = settings or compression_settings_from_env()
+    if (not settings["enabled"] or response.status_code != 200 or response.direct_passthrough
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(accept_encodings, settings["encodings"])
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < settings["min_size"]:
+            return response
+        if cache is not None and cache_key is not None:
+            body = cache.representation(cache_key, encoding, body, lambda data: compress(data, encoding))
+        else:
+            body = compress(body, encoding)
+        response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
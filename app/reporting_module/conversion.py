@@ -0,0 +1,52 @@
+"""
+Batch currency conversion.
+
+convert_to_pln() in app.py converts one amount per call. convert_batch()
+converts whole columns: each distinct currency's rate is looked up once,
+and the multiplication and the per-currency sums run as array operations.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .rates import rate_store
+
+# amounts: converted amounts in input order; subtotals: {currency: converted
+# sum}; total: sum of all converted amounts.
+ConvertedBatch = namedtuple("ConvertedBatch", ["amounts", "subtotals", "total"])
+
+
+def convert_batch(amounts, currencies, to_currency="PLN", store=None):
+    """
+    Converts parallel sequences of amounts and currency codes into `to_currency`.
+
+    Args:
+        amounts (array-like): Numbers (int, float, Decimal or numeric strings).
+        currencies (array-like): ISO codes, one per amount; case-insensitive.
+        to_currency (str): Target currency.
+        store (RateStore): Rate source; the shared store by default.
+
+    Returns:
+        ConvertedBatch: float64 array of converted amounts, converted
+        subtotals per source currency and their grand total.
+    """
+    store = store or rate_store
+    amounts = np.asarray(amounts, dtype=np.float64)
+    if amounts.ndim != 1 or amounts.size != len(currencies):
+        raise ValueError(f"got {amounts.size} amounts but {len(currencies)} currencies")
+    if amounts.size == 0:
+        return ConvertedBatch(amounts, {}, 0.0)
+
+    # Factorize the codes in one pass; only the distinct ones are normalized
+    seen = {}
+    index = np.fromiter((seen.setdefault(code, len(seen)) for code in currencies),
+                        dtype=np.intp, count=amounts.size)
+    normalized = [str(code).upper() for code in seen]
+    codes = list(dict.fromkeys(normalized))
+    position = {code: i for i, code in enumerate(codes)}
+    index = np.array([position[code] for code in normalized], dtype=np.intp)[index]
+
+    rates = np.array([store.get_rate(code, to_currency) for code in codes], dtype=np.float64)
+    converted = amounts * rates[index]
+    sums = np.bincount(index, weights=converted, minlength=len(codes))
+    return ConvertedBatch(converted, dict(zip(codes, sums.tolist())), float(sums.sum()))
@@ -0,0 +1,267 @@
+"""
+Currency conversion inside the report queries.
+
+The rate store's tables are synced into `report_exchange_rates`, holding
+the full cross-rate matrix of every currency the rates API quotes. With a
+`currency` argument, the ledger reports join each entry to its rate and
+compute SUM(amount * rate) in PostgreSQL, grouped by source currency, so
+multi-currency totals never pull raw rows into the application.
+
+    cd app && python -m reporting_module.currency      # create the table and sync it
+"""
+import os
+import re
+
+import psycopg2.extras
+
+from .rates import rate_store
+from .statements import shape_cache
+
+RATES_TABLE = "report_exchange_rates"
+
+_CURRENCY_CODE = re.compile(r"^[A-Z]{3}$")
+
+
+def currency_settings_from_env():
+    """
+    Column holding each ledger entry's currency, and the currency assumed
+    for entries where it is NULL.
+    """
+    return {
+        "column": os.getenv("REPORT_CURRENCY_COLUMN", "currency"),
+        "ledger_currency": os.getenv("REPORT_LEDGER_CURRENCY", "PLN").upper(),
+    }
+
+
+def normalize_currency(value):
+    """Upper-cased ISO code, or None for an absent value. Raises ValueError if malformed."""
+    if value is None or not str(value).strip():
+        return None
+    code = str(value).strip().upper()
+    if not _CURRENCY_CODE.match(code):
+        raise ValueError(f"Invalid currency code: {value}")
+    return code
+
+
+def ensure_rates_schema(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {RATES_TABLE} (
+                from_currency CHAR(3) NOT NULL,
+                to_currency CHAR(3) NOT NULL,
+                rate NUMERIC(20, 10) NOT NULL,
+                as_of DATE,
+                synced_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (from_currency, to_currency)
+            )
+        """)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def rate_matrix(store=None):
+    """
+    Rows (from_currency, to_currency, rate, as_of) for every pair of the
+    currencies in the store's freshest table: with q[c] units of c per one
+    unit of the base, one unit of c is worth q[t] / q[c] units of t.
+    """
+    store = store or rate_store
+    tables = store.snapshot()
+    if not tables:
+        store.refresh_all()
+        tables = store.snapshot()
+    if not tables:
+        return []
+
+    base, table = max(tables.items(), key=lambda item: item[1]["fetched_at"])
+    quotes = {base: 1.0}
+    quotes.update({c: float(q) for c, q in table["rates"].items() if q})
+    return [
+        (source, target, quotes[target] / quotes[source], table["date"])
+        for source in quotes for target in quotes
+    ]
+
+
+def sync_rates(conn, store=None):
+    """Upserts the store's rate matrix into the rates table. Returns the row count."""
+    rows = rate_matrix(store)
+    if not rows:
+        return 0
+    cur = conn.cursor()
+    try:
+        psycopg2.extras.execute_values(
+            cur,
+            f"""
+            INSERT INTO {RATES_TABLE} (from_currency, to_currency, rate, as_of)
+            VALUES %s
+            ON CONFLICT (from_currency, to_currency) DO UPDATE
+            SET rate = EXCLUDED.rate, as_of = EXCLUDED.as_of, synced_at = now()
+            """,
+            rows,
+            page_size=1000,
+        )
+        conn.commit()
+    finally:
+        cur.close()
+    return len(rows)
+
+
+def install_rate_sync(connect, store=None):
+    """Re-syncs the rates table (on a connection from `connect`) whenever the store refreshes."""
+    store = store or rate_store
+
+    def on_refresh(base, table):
+        conn = connect()
+        if isinstance(conn, str):
+            print(f"Skipping exchange rate sync: {conn}")
+            return
+        try:
+            sync_rates(conn, store)
+        finally:
+            conn.close()
+
+    store.add_listener(on_refresh)
+    return on_refresh
+
+
+def converted_join(alias):
+    """
+    LEFT JOIN of ledger rows `alias` to their rate into the target currency;
+    its parameters are join_params(target). Rows without a synced rate get
+    a NULL `r.rate`.
+    """
+    column = currency_settings_from_env()["column"]
+    return (f"LEFT JOIN {RATES_TABLE} r ON r.from_currency = COALESCE({alias}.{column}, %s)"
+            f" AND r.to_currency = %s")
+
+
+def join_params(target):
+    return [currency_settings_from_env()["ledger_currency"], target]
+
+
+@shape_cache
+def _converted_summary_sql(table, where_sql, join_sql, column):
+    total_sql = f"""
+        SELECT COALESCE(e.{column}, %s) AS currency,
+               COALESCE(SUM(e.amount), 0) AS amount,
+               SUM(e.amount * r.rate) AS converted
+        FROM {table} e
+        {join_sql}
+        WHERE {where_sql}
+        GROUP BY 1
+        ORDER BY 1
+        """
+    trend_sql = f"""
+        SELECT TO_CHAR(e.date, 'YYYY-MM') AS month,
+               COALESCE(SUM(e.amount * r.rate), 0) AS amount
+        FROM {table} e
+        {join_sql}
+        WHERE {where_sql}
+        GROUP BY month
+        ORDER BY month
+        """
+    return total_sql, trend_sql
+
+
+def build_converted_summary_queries(table, where_sql, where_params, target):
+    """
+    Returns (total_sql, total_params, trend_sql, trend_params) for a ledger
+    summary in `target` currency. The total query yields one row per source
+    currency (`currency`, `amount`, `converted`, NULL when no rate is synced);
+    the trend query yields converted monthly sums.
+    """
+    settings = currency_settings_from_env()
+    total_sql, trend_sql = _converted_summary_sql(table, where_sql, converted_join("e"), settings["column"])
+    trend_params = join_params(target) + list(where_params)
+    return total_sql, [settings["ledger_currency"]] + trend_params, trend_sql, trend_params
+
+
+@shape_cache
+def _currency_trend_sql(table, where_sql, column):
+    return f"""
+        SELECT TO_CHAR(date, 'YYYY-MM') AS month,
+               COALESCE({column}, %s) AS currency,
+               SUM(amount) AS amount
+        FROM {table}
+        WHERE {where_sql}
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        """
+
+
+def build_currency_trend_query(table, where_sql, where_params):
+    """Returns (sql, params) summing a ledger table per month and source currency."""
+    settings = currency_settings_from_env()
+    return _currency_trend_sql(table, where_sql, settings["column"]), \
+        [settings["ledger_currency"]] + list(where_params)
+
+
+def historical_summary(rows, total_key, target, history=None):
+    """
+    Converts per-month, per-currency sums (see build_currency_trend_query)
+    into `target` at each month's average historical rate. The rates for
+    the whole span are fetched in bulk once; every lookup after that is in
+    memory.
+    """
+    # rate_history pulls in numpy, so it is only imported once historical rates are asked for
+    from . import rate_history as history_module
+    history = history or history_module.rate_history
+    month_bounds = history_module.month_bounds
+    rows = list(rows)
+    if rows:
+        history.ensure_range(month_bounds(rows[0]["month"])[0], month_bounds(rows[-1]["month"])[1])
+
+    trend = {}
+    by_currency = {}
+    for row in rows:
+        amount = float(row["amount"])
+        rate = history.month_rate(row["currency"], row["month"], target)
+        subtotal = by_currency.setdefault(row["currency"], {"currency": row["currency"], "amount": 0.0, "converted": 0.0})
+        subtotal["amount"] += amount
+        trend.setdefault(row["month"], 0.0)
+        if rate is None:
+            subtotal["converted"] = None
+        else:
+            trend[row["month"]] += amount * rate
+            if subtotal["converted"] is not None:
+                subtotal["converted"] += amount * rate
+
+    subtotals = [by_currency[currency] for currency in sorted(by_currency)]
+    return {
+        total_key: sum(trend.values()),
+        "currency": target,
+        "rates": "historical",
+        "by_currency": subtotals,
+        "missing_rates": [s["currency"] for s in subtotals if s["converted"] is None],
+        "monthly_trend": [{"month": month, "amount": amount} for month, amount in trend.items()],
+    }
+
+
+def converted_totals(rows, total_key, target):
+    """Shapes the per-currency total rows into the report fields."""
+    by_currency = [
+        {"currency": row["currency"], "amount": float(row["amount"]),
+         "converted": None if row["converted"] is None else float(row["converted"])}
+        for row in rows
+    ]
+    return {
+        total_key: sum(row["converted"] for row in by_currency if row["converted"] is not None),
+        "currency": target,
+        "by_currency": by_currency,
+        "missing_rates": [row["currency"] for row in by_currency if row["converted"] is None],
+    }
+
+
+if __name__ == "__main__":
+    from .api import get_db_postgres_connection
+
+    conn = get_db_postgres_connection()
+    if isinstance(conn, str):
+        raise SystemExit(conn)
+    try:
+        ensure_rates_schema(conn)
+        print(f"synced {sync_rates(conn)} exchange rates into {RATES_TABLE}")
+    finally:
+        conn.close()
@@ -0,0 +1,62 @@
+import os
+import uuid
+import psycopg2.extras
+
+# Rows fetched per round trip by server-side cursors.
+DEFAULT_ITERSIZE = 2000
+
+
+def default_itersize():
+    """Batch size for server-side cursors, overridable with REPORT_CURSOR_ITERSIZE."""
+    return int(os.getenv("REPORT_CURSOR_ITERSIZE", DEFAULT_ITERSIZE))
+
+
+def iter_named_cursor(conn, sql, params, itersize=None,
+                      cursor_factory=psycopg2.extras.DictCursor):
+    """
+    Runs `sql` on a named (server-side) cursor and yields its rows lazily,
+    fetching `itersize` rows per round trip. The cursor is closed when the
+    generator is exhausted or closed early; the connection is left open.
+
+    Other queries may run on the same connection while the generator is
+    suspended, since the server-side cursor lives in the open transaction.
+
+    Args:
+        conn: An open psycopg2 connection (must not be in autocommit mode).
+        sql (str): Query to run.
+        params (list): Query parameters.
+        itersize (int): Rows fetched per batch, default_itersize() if omitted.
+        cursor_factory: Row type, DictCursor by default like the report routes.
+    """
+    itersize = itersize or default_itersize()
+    cur = conn.cursor(name=f"report_{uuid.uuid4().hex}", cursor_factory=cursor_factory)
+    cur.itersize = itersize
+    try:
+        cur.execute(sql, params)
+        while True:
+            batch = cur.fetchmany(itersize)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        cur.close()
+
+
+def iter_rows(conn, sql, params, itersize=None):
+    """
+    Shared row-iteration entry point for the report routes.
+
+    Returns (first_row, rows): the first row (None for an empty result) and an
+    iterator over all rows including the first. Peeking lets a route bail out
+    early on empty results without materialising the rest.
+    """
+    rows = iter_named_cursor(conn, sql, params, itersize=itersize)
+    first = next(rows, None)
+    if first is None:
+        return None, iter(())
+
+    def chained():
+        yield first
+        yield from rows
+
+    return first, chained()
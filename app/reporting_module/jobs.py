@@ -0,0 +1,390 @@
+"""
+Asynchronous report exports.
+
+A client submits a report, its filters and an export format and gets a job
+id back. The export runs in a local worker process by replaying the report
+route (so permissions, caching and export_report_data behave exactly as for
+a synchronous `?export=`), and the file is spooled to disk. The client polls
+the job and downloads the result until it expires.
+
+Job state lives in JSON files next to the spooled results, so any web
+worker sharing the spool directory can answer status and download requests.
+Every queued or running job also holds a slot file in the spool's `active`
+directory, claimed under an exclusive file lock. The queue bound and the
+per-company limit count these slots, so they hold across all web workers
+sharing the spool.
+"""
+import contextlib
+import fcntl
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+# Reports that can be exported asynchronously, mapped to their route.
+EXPORT_REPORTS = {
+    "income-summary": "/api/reports/income-summary",
+    "expense-summary": "/api/reports/expense-summary",
+    "project-finance": "/api/reports/project-finance",
+    "tender-status": "/api/reports/tender-status",
+    "overall-summary": "/api/reports/overall-summary",
+}
+EXPORT_FORMATS = ("csv", "pdf")
+EXPORT_FILTERS = ("start_date", "end_date", "project_id", "status", "currency", "rates")
+
+# Seconds between progress updates written by a running job.
+PROGRESS_INTERVAL = 0.5
+
+# Seconds between sweeps of expired results by one web process.
+SWEEP_INTERVAL = 60
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class ExportQueueFull(Exception):
+    """Raised when the process already has its maximum of pending exports."""
+
+
+class CompanyExportLimit(Exception):
+    """Raised when a company already has its maximum of pending exports."""
+
+
+def export_settings_from_env():
+    """Reads the export queue settings from REPORT_EXPORT_* environment variables."""
+    return {
+        "spool_dir": os.getenv("REPORT_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "report-exports")),
+        "workers": int(os.getenv("REPORT_EXPORT_WORKERS", 2)),
+        "max_queue": int(os.getenv("REPORT_EXPORT_QUEUE", 20)),
+        "per_company": int(os.getenv("REPORT_EXPORT_PER_COMPANY", 2)),
+        "ttl": float(os.getenv("REPORT_EXPORT_TTL", 3600)),
+        "max_runtime": float(os.getenv("REPORT_EXPORT_MAX_RUNTIME", 3600)),
+    }
+
+
+class JobStore:
+    """
+    Job metadata (`<id>.json`) and results (`<id>.<format>`) in one
+    directory, plus an `active/<id>` slot file per queued or running job.
+    """
+
+    def __init__(self, spool_dir):
+        self.spool_dir = spool_dir
+        self.slots_dir = os.path.join(spool_dir, "active")
+
+    def meta_path(self, job_id):
+        return os.path.join(self.spool_dir, f"{job_id}.json")
+
+    def data_path(self, job_id, fmt):
+        return os.path.join(self.spool_dir, f"{job_id}.{fmt}")
+
+    def _write(self, meta):
+        path = self.meta_path(meta["job_id"])
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)  # readers never see a half-written file
+
+    def create(self, meta):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._write(meta)
+        return meta
+
+    def load(self, job_id):
+        try:
+            with open(self.meta_path(job_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def update(self, job_id, **changes):
+        meta = self.load(job_id)
+        if meta is None:
+            return None
+        meta.update(changes)
+        self._write(meta)
+        return meta
+
+    def delete(self, job_id, fmt):
+        for path in (self.data_path(job_id, fmt), self.meta_path(job_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @contextlib.contextmanager
+    def _slots_locked(self):
+        os.makedirs(self.slots_dir, exist_ok=True)
+        with open(os.path.join(self.spool_dir, "active.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def claim_slot(self, job_id, company_id, max_queue, per_company, max_runtime, now=None):
+        """
+        Gives job_id one of the `max_queue` slots, at most `per_company` of
+        them going to company_id. Slots whose job finished, vanished or has
+        been active for more than `max_runtime` seconds (its web process
+        died) are released first; abandoned jobs are marked failed.
+
+        Raises:
+            ExportQueueFull: All slots are taken.
+            CompanyExportLimit: The company holds its maximum of slots.
+        """
+        now = time.time() if now is None else now
+        with self._slots_locked():
+            companies = []
+            for slot_job in os.listdir(self.slots_dir):
+                meta = self.load(slot_job)
+                if meta is None or meta["status"] not in ACTIVE_STATUSES:
+                    self.release_slot(slot_job)
+                elif now - meta["created_at"] > max_runtime:
+                    self.update(slot_job, status="failed", error="abandoned", finished_at=now,
+                                expires_at=now)
+                    self.release_slot(slot_job)
+                else:
+                    companies.append(meta["company_id"])
+            if len(companies) >= max_queue:
+                raise ExportQueueFull("Export queue is full, try again later")
+            if companies.count(company_id) >= per_company:
+                raise CompanyExportLimit("Too many exports in progress for this company")
+            open(os.path.join(self.slots_dir, job_id), "w").close()
+
+    def release_slot(self, job_id):
+        try:
+            os.remove(os.path.join(self.slots_dir, job_id))
+        except FileNotFoundError:
+            pass
+
+    def active_count(self):
+        """Jobs holding a slot, including ones not yet found to be stale."""
+        try:
+            return len(os.listdir(self.slots_dir))
+        except FileNotFoundError:
+            return 0
+
+    def sweep(self, now=None):
+        """Deletes finished jobs whose results have expired. Returns how many."""
+        now = time.time() if now is None else now
+        try:
+            names = os.listdir(self.spool_dir)
+        except FileNotFoundError:
+            return 0
+        removed = 0
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            meta = self.load(name[:-len(".json")])
+            if meta and meta.get("expires_at") and meta["expires_at"] <= now:
+                self.delete(meta["job_id"], meta["format"])
+                removed += 1
+        return removed
+
+
+_report_app = None
+
+
+def _get_report_app():
+    """Minimal Flask app serving the report blueprint inside a worker process."""
+    global _report_app
+    if _report_app is None:
+        from flask import Flask
+        from .api import report_module_api
+
+        app = Flask(__name__)
+        app.register_blueprint(report_module_api, url_prefix='/api')
+        _report_app = app
+    return _report_app
+
+
+def _user_headers(user):
+    # The report routes read the caller from these headers (see api.get_user_context)
+    return {"X-Company-ID": user["company_id"], "X-User-Role": user["role"]}
+
+
+def run_export_job(spool_dir, job_id, user, ttl):
+    """
+    Worker-process entry point: renders one export into the spool directory,
+    recording progress (bytes written) and the final status in the job file.
+    """
+    store = JobStore(spool_dir)
+    meta = store.update(job_id, status="running", started_at=time.time())
+    if meta is None:
+        return
+
+    data_path = store.data_path(job_id, meta["format"])
+    partial = data_path + ".part"
+    written = 0
+    try:
+        client = _get_report_app().test_client()
+        response = client.get(
+            EXPORT_REPORTS[meta["report"]],
+            query_string=dict(meta["filters"], export=meta["format"]),
+            headers=_user_headers(user),
+            buffered=False,
+        )
+        try:
+            if response.status_code != 200:
+                error = (response.get_json(silent=True) or {}).get("error") or f"HTTP {response.status_code}"
+                store.update(job_id, status="failed", error=error, finished_at=time.time(),
+                             expires_at=time.time() + ttl)
+                return
+
+            last_update = time.monotonic()
+            with open(partial, "wb") as out:
+                for chunk in response.iter_encoded():
+                    out.write(chunk)
+                    written += len(chunk)
+                    if time.monotonic() - last_update >= PROGRESS_INTERVAL:
+                        store.update(job_id, progress={"bytes": written})
+                        last_update = time.monotonic()
+            os.replace(partial, data_path)
+        finally:
+            response.close()
+
+        finished = time.time()
+        store.update(job_id, status="done", progress={"bytes": written}, mimetype=response.mimetype,
+                     finished_at=finished, expires_at=finished + ttl)
+    except Exception as e:
+        if os.path.exists(partial):
+            os.remove(partial)
+        store.update(job_id, status="failed", error=str(e), finished_at=time.time(),
+                     expires_at=time.time() + ttl)
+
+
+class ExportJobManager:
+    """
+    Accepts export jobs and runs them on a pool of worker processes.
+
+    Args:
+        spool_dir (str): Directory for job files and results.
+        workers (int): Worker processes.
+        max_queue (int): Jobs queued or running at once in this process.
+        per_company (int): Jobs queued or running at once for one company.
+        ttl (float): Seconds a finished job and its file are kept.
+        max_runtime (float): Seconds after which a job still queued or
+            running is considered abandoned and its slot reclaimed.
+        executor (Executor): Runs run_export_job; a spawn-based process
+            pool is created on first use if omitted.
+    """
+
+    def __init__(self, spool_dir=None, workers=None, max_queue=None, per_company=None, ttl=None,
+                 max_runtime=None, executor=None):
+        settings = export_settings_from_env()
+        self.store = JobStore(spool_dir or settings["spool_dir"])
+        self.workers = workers or settings["workers"]
+        self.max_queue = max_queue or settings["max_queue"]
+        self.per_company = per_company or settings["per_company"]
+        self.ttl = settings["ttl"] if ttl is None else ttl
+        self.max_runtime = max_runtime or settings["max_runtime"]
+        self._executor = executor
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Spawned, not forked: the web process holds threads and pooled sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, user, report, fmt, filters):
+        """
+        Queues an export and returns its job metadata.
+
+        Raises:
+            ValueError: Unknown report or format.
+            ExportQueueFull: Too many pending jobs across the spool.
+            CompanyExportLimit: Too many pending jobs for the user's company.
+        """
+        if report not in EXPORT_REPORTS:
+            raise ValueError(f"Unknown report: {report}")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+        self._maybe_sweep()
+        company_id = str(user["company_id"])
+        job_id = uuid.uuid4().hex
+        # The job file comes first: other workers judge a slot by its job's status
+        meta = self.store.create({
+            "job_id": job_id,
+            "company_id": company_id,
+            "report": report,
+            "format": fmt,
+            "filters": {k: v for k, v in filters.items() if k in EXPORT_FILTERS and v},
+            "status": "queued",
+            "progress": {"bytes": 0},
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": None,
+        })
+        try:
+            self.store.claim_slot(job_id, company_id, self.max_queue, self.per_company, self.max_runtime)
+        except Exception:
+            self.store.delete(job_id, fmt)
+            raise
+        try:
+            future = self._get_executor().submit(run_export_job, self.store.spool_dir, job_id,
+                                                 {"company_id": company_id, "role": user["role"]}, self.ttl)
+        except Exception:
+            self.store.release_slot(job_id)
+            self.store.delete(job_id, fmt)
+            raise
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+        return meta
+
+    def _maybe_sweep(self):
+        """Sweeps expired results at most every SWEEP_INTERVAL seconds."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + SWEEP_INTERVAL
+        self.store.sweep()
+
+    def _finished(self, job_id, future):
+        self.store.release_slot(job_id)
+        error = future.exception() if not future.cancelled() else "cancelled"
+        if error is not None:
+            # The worker died before it could record the outcome itself
+            meta = self.store.load(job_id)
+            if meta and meta["status"] in ACTIVE_STATUSES:
+                self.store.update(job_id, status="failed", error=str(error), finished_at=time.time(),
+                                  expires_at=time.time() + self.ttl)
+
+    def get(self, job_id, company_id):
+        """Job metadata if it exists, belongs to company_id and has not expired, else None."""
+        meta = self.store.load(job_id)
+        if meta is None or meta["company_id"] != str(company_id):
+            return None
+        if meta.get("expires_at") and meta["expires_at"] <= time.time():
+            self.store.delete(job_id, meta["format"])
+            return None
+        return meta
+
+    def result_path(self, meta):
+        return self.store.data_path(meta["job_id"], meta["format"])
+
+    def stats(self):
+        return {
+            "active": self.store.active_count(),
+            "max_queue": self.max_queue,
+            "per_company": self.per_company,
+            "workers": self.workers,
+        }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+export_jobs = ExportJobManager()
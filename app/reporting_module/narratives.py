@@ -0,0 +1,199 @@
+"""
+Asynchronous AI narrative generation.
+
+Request threads never wait for the model: they submit a prompt, get a task
+id back and poll it. Prompts run on a small dedicated thread pool, so a
+burst of slow model calls queues up there instead of pinning the workers
+that serve reports. Identical prompts already in flight share one task,
+each task has a deadline after which it is reported as timed out, and the
+number of unfinished tasks is capped.
+
+app.py supplies the model call with configure(); responses go through the
+persistent AI response cache.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .ai_cache import ai_cache, prompt_key
+
+PENDING_STATUSES = ("queued", "running")
+
+
+class NarrativeQueueFull(Exception):
+    """Raised when the maximum number of unfinished narrative tasks is reached."""
+
+
+def narrative_settings_from_env():
+    """Reads the narrative executor settings from REPORT_AI_* environment variables."""
+    return {
+        "workers": int(os.getenv("REPORT_AI_WORKERS", 4)),
+        "max_pending": int(os.getenv("REPORT_AI_QUEUE", 32)),
+        "deadline": float(os.getenv("REPORT_AI_DEADLINE", 30)),
+        "result_ttl": float(os.getenv("REPORT_AI_RESULT_TTL", 600)),
+        "max_prompt": int(os.getenv("REPORT_AI_MAX_PROMPT", 20000)),
+    }
+
+
+class _Task:
+    __slots__ = ("task_id", "key", "status", "result", "error", "created_at", "deadline",
+                 "finished_at", "future", "companies")
+
+    def __init__(self, key, deadline, now):
+        self.task_id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = now
+        self.deadline = now + deadline
+        self.finished_at = None
+        self.future = None
+        self.companies = set()
+
+
+class NarrativeExecutor:
+    """
+    Runs model calls on a bounded thread pool behind a submit/poll interface.
+
+    Args:
+        workers (int): Model calls running at once.
+        max_pending (int): Unfinished tasks (queued or running) accepted.
+        deadline (float): Default and maximum seconds a task may take.
+        result_ttl (float): Seconds a finished task can still be polled.
+        cache (ResponseCache): Response cache the calls go through.
+        timer (callable): Monotonic clock.
+    """
+
+    def __init__(self, workers=None, max_pending=None, deadline=None, result_ttl=None, cache=None,
+                 timer=time.monotonic):
+        settings = narrative_settings_from_env()
+        self.workers = workers or settings["workers"]
+        self.max_pending = max_pending or settings["max_pending"]
+        self.deadline = deadline or settings["deadline"]
+        self.result_ttl = settings["result_ttl"] if result_ttl is None else result_ttl
+        self.max_prompt = settings["max_prompt"]
+        self.cache = cache or ai_cache
+        self.timer = timer
+
+        self.model_name = None
+        self._generate = None
+        self._executor = None
+        self._tasks = {}      # task_id -> _Task
+        self._in_flight = {}  # prompt key -> _Task still queued or running
+        self._lock = threading.Lock()
+        self.coalesced = 0
+        self.timed_out = 0
+
+    def configure(self, model_name, generate):
+        """Sets the model call, generate(prompt, timeout) -> str."""
+        self.model_name = model_name
+        self._generate = generate
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ai-narrative")
+        return self._executor
+
+    def _run(self, task, prompt):
+        with self._lock:
+            if task.status != "queued":
+                return  # timed out while waiting for a worker
+            task.status = "running"
+        remaining = max(task.deadline - self.timer(), 0.001)
+        try:
+            result = self.cache.generate(self.model_name, prompt,
+                                         lambda p: self._generate(p, timeout=remaining))
+        except Exception as e:
+            print(f"Error generating narrative: {e}")
+            self._finish(task, "failed", error=str(e))
+        else:
+            self._finish(task, "done", result=result)
+
+    def _finish(self, task, status, result=None, error=None):
+        with self._lock:
+            if task.status not in PENDING_STATUSES:
+                return  # already timed out; a late result is only kept in the response cache
+            task.status, task.result, task.error = status, result, error
+            task.finished_at = self.timer()
+            if self._in_flight.get(task.key) is task:
+                del self._in_flight[task.key]
+
+    def _expire(self, now):
+        """Marks overdue tasks timed out and forgets finished ones past result_ttl (lock held)."""
+        for task in list(self._tasks.values()):
+            if task.status in PENDING_STATUSES and now >= task.deadline:
+                task.status, task.error, task.finished_at = "timed_out", "Narrative generation timed out", now
+                task.future.cancel()
+                self.timed_out += 1
+                if self._in_flight.get(task.key) is task:
+                    del self._in_flight[task.key]
+            elif task.finished_at is not None and now - task.finished_at >= self.result_ttl:
+                del self._tasks[task.task_id]
+
+    def submit(self, prompt, company_id=None, deadline=None):
+        """
+        Queues a prompt and returns its task view. An identical prompt
+        already queued or running is joined instead of sent again.
+
+        Raises:
+            ValueError: Empty or oversized prompt, or no model configured.
+            NarrativeQueueFull: Too many unfinished tasks.
+        """
+        if self._generate is None:
+            raise ValueError("No narrative model configured")
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise ValueError("prompt is required")
+        if len(prompt) > self.max_prompt:
+            raise ValueError(f"prompt is longer than {self.max_prompt} characters")
+        deadline = min(float(deadline or self.deadline), self.deadline)
+
+        key = prompt_key(self.model_name, prompt)
+        with self._lock:
+            now = self.timer()
+            self._expire(now)
+            task = self._in_flight.get(key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                if len(self._in_flight) >= self.max_pending:
+                    raise NarrativeQueueFull("Too many narratives in progress, try again later")
+                task = _Task(key, deadline, now)
+                self._tasks[task.task_id] = task
+                self._in_flight[key] = task
+                task.future = self._get_executor().submit(self._run, task, prompt)
+            task.companies.add(str(company_id))
+            return self._view(task)
+
+    def get(self, task_id, company_id=None):
+        """Task view if it exists and `company_id` submitted it, else None."""
+        with self._lock:
+            self._expire(self.timer())
+            task = self._tasks.get(task_id)
+            if task is None or str(company_id) not in task.companies:
+                return None
+            return self._view(task)
+
+    def _view(self, task):
+        return {"task_id": task.task_id, "status": task.status, "result": task.result, "error": task.error}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._in_flight),
+                "tasks": len(self._tasks),
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "coalesced": self.coalesced,
+                "timed_out": self.timed_out,
+            }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+narratives = NarrativeExecutor()
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import psycopg2
+import psycopg2.extras
+
+from .statements import execute
+
+
+class QueryDeadlineExceeded(Exception):
+    """Raised when the sub-queries of one report do not finish in time."""
+
+
+# One independent statement of a report. `fetch` is "one" or "all".
+SubQuery = namedtuple("SubQuery", ["name", "sql", "params", "fetch"], defaults=["all"])
+
+
+def parallel_settings_from_env():
+    """Reads the parallel execution mode from REPORT_PARALLEL_* environment variables."""
+    return {
+        "enabled": os.getenv("REPORT_PARALLEL_QUERIES", "0") == "1",
+        "workers": int(os.getenv("REPORT_PARALLEL_WORKERS", 8)),
+        "per_request": int(os.getenv("REPORT_PARALLEL_PER_REQUEST", 3)),
+        "deadline": float(os.getenv("REPORT_PARALLEL_DEADLINE", 30)),
+    }
+
+
+def parallel_enabled():
+    return parallel_settings_from_env()["enabled"]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the process-wide thread pool shared by all requests."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=parallel_settings_from_env()["workers"],
+                    thread_name_prefix="report-query"
+                )
+    return _executor
+
+
+def reset_executor():
+    """Shuts down and forgets the process-wide thread pool (after fork or in tests)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _run_one(connect, query, holder, lock):
+    conn = connect()
+    if isinstance(conn, str):
+        # get_db_postgres_connection reports connection failures as a message
+        raise psycopg2.OperationalError(conn)
+    with lock:
+        holder.append(conn)
+    try:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            execute(conn, cur, query.sql, query.params)
+            return cur.fetchone() if query.fetch == "one" else cur.fetchall()
+        finally:
+            cur.close()
+    finally:
+        # Once returned to the pool the connection may serve another request,
+        # so it leaves `holder` (under the lock _cancel_all holds) first
+        with lock:
+            holder.remove(conn)
+        conn.close()
+
+
+def _cancel(conn):
+    try:
+        conn.cancel()
+    except Exception:
+        pass
+
+
+def _cancel_all(holders, lock):
+    """Cancels the queries still running on connections a sub-query holds."""
+    with lock:
+        for holder in holders:
+            for conn in holder:
+                _cancel(conn)
+
+
+def run_queries(connect, queries, max_concurrency=None, deadline=None, executor=None):
+    """
+    Runs independent sub-queries of one report at the same time, each on its
+    own connection from `connect`, and returns {name: rows}.
+
+    At most `max_concurrency` of them run at once so one report cannot take
+    over the shared thread pool (or the connection pool). If they have not
+    all finished within `deadline` seconds, queries still in flight are
+    cancelled on the server and QueryDeadlineExceeded is raised. The first
+    failing sub-query's exception is re-raised after the rest are cancelled.
+
+    Args:
+        connect (callable): Returns a connection; it is closed after use.
+        queries (list): SubQuery items.
+        max_concurrency (int): Per-request cap, REPORT_PARALLEL_PER_REQUEST by default.
+        deadline (float): Seconds for the whole batch, REPORT_PARALLEL_DEADLINE by default.
+        executor (Executor): Pool to run on, the shared one by default.
+
+    Returns:
+        dict: Rows keyed by SubQuery.name (a single row for fetch="one").
+    """
+    settings = parallel_settings_from_env()
+    max_concurrency = max(1, max_concurrency or settings["per_request"])
+    deadline = settings["deadline"] if deadline is None else deadline
+    executor = executor or get_executor()
+
+    ends_at = time.monotonic() + deadline
+    lock = threading.Lock()
+    pending = deque(queries)
+    running = {}
+    results = {}
+    try:
+        while pending or running:
+            while pending and len(running) < max_concurrency:
+                query = pending.popleft()
+                holder = []
+                running[executor.submit(_run_one, connect, query, holder, lock)] = (query, holder)
+
+            remaining = ends_at - time.monotonic()
+            done = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)[0] if remaining > 0 else set()
+            if not done:
+                names = ", ".join(query.name for query, _ in running.values())
+                raise QueryDeadlineExceeded(f"report sub-queries exceeded {deadline}s: {names}")
+
+            for future in done:
+                query, _ = running.pop(future)
+                results[query.name] = future.result()
+    except BaseException:
+        for future in running:
+            future.cancel()
+        _cancel_all([holder for _, holder in running.values()], lock)
+        raise
+    return results
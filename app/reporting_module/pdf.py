@@ -0,0 +1,211 @@
+"""
+Multi-page PDF rendering for report exports.
+
+Rows are laid out in page-sized chunks: each chunk is its own Table with a
+repeated header row and fixed row heights, sized to fill exactly one page,
+so reportlab never has to measure or split one huge table. Pages are built
+one at a time from the row iterator and drawn into a fresh Frame on the
+canvas (reportlab's public Frame.addFromList), so only the rows and
+flowables of the current page are held in memory. The PDF bytes themselves
+are buffered until the canvas is saved.
+
+When a document is expected to be very large (more rows than
+REPORT_PDF_COMPACT_ROWS) or rendering exceeds REPORT_PDF_TIME_BUDGET
+seconds, the remaining pages switch to a compact layout: smaller type, no
+cell grid, and text drawn column by column instead of through Table
+layout.
+"""
+import io
+import os
+import time
+from itertools import islice
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Frame, Table, TableStyle, Spacer, Paragraph, Flowable
+from reportlab.platypus.doctemplate import LayoutError
+
+PAGE_SIZE = letter
+PAGE_MARGIN = inch
+
+# Padding a Frame applies on every side of the page body.
+FRAME_PADDING = 6
+
+TABLE_HEADER_HEIGHT = 24
+TABLE_ROW_HEIGHT = 16
+COMPACT_FONT_SIZE = 6.5
+COMPACT_ROW_HEIGHT = 8
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+])
+
+
+def pdf_settings_from_env():
+    """Reads the compact-layout thresholds from REPORT_PDF_* environment variables."""
+    return {
+        "compact_rows": int(os.getenv("REPORT_PDF_COMPACT_ROWS", 5000)),
+        "time_budget": float(os.getenv("REPORT_PDF_TIME_BUDGET", 15)),
+    }
+
+
+class CompactRows(Flowable):
+    """
+    One page of rows in the compact layout. Each column is drawn as a single
+    text object, and cells are clipped to their column width by character
+    count rather than measured.
+    """
+
+    def __init__(self, headers, rows, col_widths):
+        super().__init__()
+        self.headers = headers
+        self.rows = rows
+        self.col_widths = col_widths
+        self.width = sum(col_widths)
+        self.height = COMPACT_ROW_HEIGHT * (len(rows) + 1) + 2
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        canv = self.canv
+        top = self.height - COMPACT_FONT_SIZE
+        x = 0
+        for col, (header, col_width) in enumerate(zip(self.headers, self.col_widths)):
+            max_chars = max(1, int(col_width / (COMPACT_FONT_SIZE * 0.55)))
+            text = canv.beginText(x + 1, top)
+            text.setFont("Helvetica-Bold", COMPACT_FONT_SIZE, COMPACT_ROW_HEIGHT)
+            text.textLine(header[:max_chars])
+            text.setFont("Helvetica", COMPACT_FONT_SIZE, COMPACT_ROW_HEIGHT)
+            for row in self.rows:
+                text.textLine(row[col][:max_chars])
+            canv.drawText(text)
+            x += col_width
+        rule = self.height - COMPACT_ROW_HEIGHT - 1
+        canv.setLineWidth(0.5)
+        canv.line(0, rule, self.width, rule)
+
+
+class PdfReport:
+    """
+    Renders report rows into a PDF document.
+
+    Args:
+        headers (list): Column keys, in order.
+        title (str): Heading on the first page.
+        compact_rows (int): Row count above which the whole report is compact.
+        time_budget (float): Seconds of rendering after which the remaining
+            pages switch to the compact layout.
+        timer (callable): Clock used for the budget.
+    """
+
+    def __init__(self, headers, title, compact_rows=None, time_budget=None, timer=time.perf_counter):
+        settings = pdf_settings_from_env()
+        self.headers = list(headers)
+        self.title = title
+        self.compact_rows = settings["compact_rows"] if compact_rows is None else compact_rows
+        self.time_budget = settings["time_budget"] if time_budget is None else time_budget
+        self.timer = timer
+        self.pages = {"table": 0, "compact": 0}
+
+    def render(self, rows, row_count=None):
+        """
+        Builds the document from an iterable of dict rows and returns its bytes.
+        `row_count`, when known up front, lets very large reports start in
+        the compact layout.
+        """
+        buffer = io.BytesIO()
+        canv = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+        canv.setTitle(self.title)
+        styles = getSampleStyleSheet()
+
+        body_width = PAGE_SIZE[0] - 2 * PAGE_MARGIN
+        body_height = PAGE_SIZE[1] - 2 * PAGE_MARGIN
+        title = Paragraph(self.title, styles['h1'])
+        spacer = Spacer(1, 0.25 * inch)
+        frame_width = body_width - 2 * FRAME_PADDING
+        frame_height = body_height - 2 * FRAME_PADDING
+        title_height = title.wrap(frame_width, frame_height)[1] + title.getSpaceBefore() + title.getSpaceAfter()
+        first_page_height = frame_height - title_height - spacer.height
+
+        col_widths = [body_width / max(len(self.headers), 1)] * len(self.headers)
+
+        compact = row_count is not None and row_count > self.compact_rows
+        started = self.timer()
+
+        def table_rows_fitting(height):
+            return max(1, int((height - TABLE_HEADER_HEIGHT) // TABLE_ROW_HEIGHT) - 1)
+
+        def compact_rows_fitting(height):
+            return max(1, int((height - 2) // COMPACT_ROW_HEIGHT) - 2)
+
+        def pages():
+            """Yields the flowables of one page at a time."""
+            nonlocal compact
+            cells = ([str(row.get(header, '')) for header in self.headers] for row in rows)
+            page = [title, spacer]
+            height = first_page_height
+            while True:
+                if not compact and self.timer() - started > self.time_budget:
+                    compact = True
+                size = compact_rows_fitting(height) if compact else table_rows_fitting(height)
+                chunk = list(islice(cells, size))
+                if not chunk:
+                    if page:
+                        yield page
+                    return
+                if compact:
+                    self.pages["compact"] += 1
+                    page.append(CompactRows(self.headers, chunk, col_widths))
+                else:
+                    self.pages["table"] += 1
+                    table = Table([self.headers] + chunk, colWidths=col_widths, repeatRows=1,
+                                  rowHeights=[TABLE_HEADER_HEIGHT] + [TABLE_ROW_HEIGHT] * len(chunk))
+                    table.setStyle(TABLE_STYLE)
+                    page.append(table)
+                yield page
+                page = []
+                height = frame_height
+
+        for page in pages():
+            _draw_page(canv, page)
+        canv.save()
+        return buffer.getvalue()
+
+
+def _draw_page(canv, flowables):
+    """
+    Draws `flowables` into the page body and ends the page. A flowable that
+    does not fit goes on to a fresh page; one that fits on no page raises
+    LayoutError instead of being dropped.
+    """
+    while flowables:
+        frame = Frame(PAGE_MARGIN, PAGE_MARGIN, PAGE_SIZE[0] - 2 * PAGE_MARGIN, PAGE_SIZE[1] - 2 * PAGE_MARGIN,
+                      leftPadding=FRAME_PADDING, bottomPadding=FRAME_PADDING,
+                      rightPadding=FRAME_PADDING, topPadding=FRAME_PADDING)
+        remaining = len(flowables)
+        frame.addFromList(flowables, canv)
+        canv.showPage()
+        if len(flowables) == remaining:
+            raise LayoutError(f"{flowables[0].__class__.__name__} is too large for a page")
+
+
+def render_pdf(rows, headers, title, **kwargs):
+    """Renders rows into PDF bytes; see PdfReport for the keyword arguments."""
+    row_count = len(rows) if hasattr(rows, "__len__") else None
+    return PdfReport(headers, title, **kwargs).render(rows, row_count)
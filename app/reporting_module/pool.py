@@ -0,0 +1,298 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class _PoolEntry:
+    """A raw connection plus the bookkeeping the pool needs to recycle it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.uses = 0
+        # Prepared statements live as long as the server session (statements.py)
+        self.statements = None
+
+
+class PooledConnection:
+    """
+    Proxy handed out by the pool.
+
+    Behaves like a psycopg2 connection, except that close() returns the
+    underlying connection to the pool instead of closing it. Calling close()
+    more than once is harmless.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        if self._entry is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(self._entry.raw, name)
+
+    def __setattr__(self, name, value):
+        # Session settings such as `autocommit` belong to the real connection
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        elif self._entry is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        else:
+            setattr(self._entry.raw, name, value)
+
+    @property
+    def closed(self):
+        return self._entry is None or self._entry.raw.closed
+
+    def close(self):
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool.release(entry)
+
+    def __del__(self):
+        # Safety net for code paths that drop a connection without closing it
+        # (e.g. an exception between checkout and close): give it back rather
+        # than leaking a pool slot forever.
+        if self._entry is not None:
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of PostgreSQL connections.
+
+    Args:
+        connect (callable): Zero-argument factory returning a new DB-API connection.
+        min_size (int): Connections opened eagerly and kept while idle.
+        max_size (int): Upper bound on open connections (idle + in use).
+        timeout (float): Seconds getconn() waits for a free connection.
+        max_uses (int): Recycle a connection after this many checkouts (0 = never).
+        max_age (float): Recycle a connection older than this many seconds (0 = never).
+        health_check (bool): Run "SELECT 1" on checkout and replace dead connections.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0,
+                 max_uses=0, max_age=0, health_check=True):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.health_check = health_check
+
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        for _ in range(min_size):
+            self._idle.append(self._open())
+            self._size += 1
+
+    def _open(self):
+        return _PoolEntry(self._connect())
+
+    def _expired(self, entry):
+        if self.max_uses and entry.uses >= self.max_uses:
+            return True
+        if self.max_age and time.monotonic() - entry.created_at >= self.max_age:
+            return True
+        return False
+
+    def _healthy(self, entry):
+        raw = entry.raw
+        if raw.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            cur = raw.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+            raw.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, entry):
+        try:
+            entry.raw.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """
+        Checks out a connection, waiting up to `timeout` seconds for one to
+        become free. Returns a PooledConnection; close() it to give it back.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    self._failures += 1
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._failures += 1
+                    raise PoolTimeout(
+                        f"no connection available within {self.timeout}s "
+                        f"(max_size={self.max_size})"
+                    )
+                self._cond.wait(remaining)
+
+        # Opening and probing happen outside the lock so a slow server does
+        # not serialise every other checkout behind it.
+        try:
+            if entry is not None and (self._expired(entry) or not self._healthy(entry)):
+                self._discard(entry)
+                entry = None
+            if entry is None:
+                entry = self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._failures += 1
+                self._cond.notify()
+            raise
+
+        entry.uses += 1
+        waited = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        return PooledConnection(self, entry)
+
+    def release(self, entry):
+        """Returns a checked-out entry to the pool (called by PooledConnection.close)."""
+        reuse = not self._closed and not entry.raw.closed and not self._expired(entry)
+        if reuse:
+            try:
+                # Never hand the next caller an open transaction.
+                entry.raw.rollback()
+            except psycopg2.Error:
+                reuse = False
+
+        with self._cond:
+            if reuse:
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+        if not reuse:
+            self._discard(entry)
+
+    def close(self):
+        """Closes idle connections; in-use ones are closed as they are released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        """Returns a snapshot of pool usage counters."""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "max_size": self.max_size,
+                "min_size": self.min_size,
+                "size": self._size,
+                "in_use": self._size - idle,
+                "idle": idle,
+                "checkouts": self._checkouts,
+                "checkout_failures": self._failures,
+                "wait_time_total": round(self._wait_total, 6),
+                "wait_time_avg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "wait_time_max": round(self._wait_max, 6),
+            }
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+def pool_settings_from_env():
+    """Reads pool sizing from REPORT_DB_POOL_* environment variables."""
+    return {
+        "min_size": _env_int("REPORT_DB_POOL_MIN", 1),
+        "max_size": _env_int("REPORT_DB_POOL_MAX", 10),
+        "timeout": _env_float("REPORT_DB_POOL_TIMEOUT", 5.0),
+        "max_uses": _env_int("REPORT_DB_POOL_MAX_USES", 1000),
+        "max_age": _env_float("REPORT_DB_POOL_MAX_AGE", 1800),
+        "health_check": os.getenv("REPORT_DB_POOL_HEALTH_CHECK", "1") != "0",
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(connect):
+    """
+    Returns the process-wide pool, creating it with `connect` on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(connect, **pool_settings_from_env())
+    return _pool
+
+
+def reset_pool():
+    """Closes and forgets the process-wide pool (e.g. after fork or in tests)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+
+def current_pool_stats():
+    """Stats of the process-wide pool, or None if it has not been created yet."""
+    pool = _pool
+    return pool.stats() if pool is not None else None
@@ -0,0 +1,303 @@
+"""
+Historical exchange rates, keyed by day.
+
+Whole date ranges are fetched in one call to the rates API's time series
+endpoint (`/<start>..<end>?from=<base>`) and kept as one dense float64 array
+per currency, one value per calendar day, with weekends and holidays
+filled from the previous business day. Arrays are stored as `.npy` files
+under REPORT_RATES_HISTORY_DIR, so after the first warm-up every day or
+month lookup is an in-memory array read.
+
+The held range and its arrays are published together as one immutable
+snapshot, replaced in a single assignment, so lookups read it without
+taking the lock. Fetches run outside the lock too; only merging their
+result into a new snapshot holds it.
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import requests
+
+from .rates import rate_settings_from_env
+
+# Days fetched before a requested start, so a range starting on a weekend
+# or holiday still has a previous business day to fill from.
+LEAD_DAYS = 7
+
+# A day without a quote is taken as a weekend or holiday (final) once it is
+# this many days old; until then its rates may simply not be published yet.
+FINAL_AFTER_DAYS = 2
+
+# Seconds before days that were not published yet are asked for again.
+RECHECK_AFTER = 900
+
+# start: first day held; covered_through: last day known to be final, later
+# days use its value; series: currency -> read-only float64 array, units per one base unit.
+_Held = namedtuple("_Held", ["start", "covered_through", "series"])
+
+_NOTHING_HELD = _Held(None, None, {})
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def month_bounds(month):
+    """First and last day of a "YYYY-MM" month."""
+    first = datetime.strptime(month, "%Y-%m").date()
+    following = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first, following - timedelta(days=1)
+
+
+def _forward_fill(values):
+    """Replaces NaNs with the last value before them; leading NaNs stay."""
+    index = np.where(np.isnan(values), -1, np.arange(len(values)))
+    np.maximum.accumulate(index, out=index)
+    filled = values[np.maximum(index, 0)]
+    filled[index < 0] = np.nan
+    return filled
+
+
+def _read_only(values):
+    values.flags.writeable = False
+    return values
+
+
+class HistoricalRates:
+    """
+    Day-by-day rates of every quoted currency against `base`.
+
+    Args:
+        url (str): Root of a Frankfurter-compatible API.
+        directory (str): Where the per-currency arrays are stored; "" keeps
+            them in memory only.
+        base (str): Currency the API quotes against.
+        timeout (float): HTTP timeout in seconds.
+        today (callable): Returns the current date; days after the last
+            published one use the latest rate.
+    """
+
+    def __init__(self, url=None, directory=None, base="PLN", timeout=None, today=date.today):
+        settings = rate_settings_from_env()
+        self.url = (url or settings["url"]).rstrip("/")
+        self.directory = os.getenv("REPORT_RATES_HISTORY_DIR", "exchange_rate_history") if directory is None else directory
+        self.base = base.upper()
+        self.timeout = settings["timeout"] if timeout is None else timeout
+        self.today = today
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._held = _NOTHING_HELD
+        self._tail_checked = None  # (covered_through, checked through, monotonic time) of the last fetch past it
+        self.fetches = 0
+
+    # --- storage ----------------------------------------------------------
+
+    def _base_dir(self):
+        return os.path.join(self.directory, self.base)
+
+    def _load(self):
+        """Reads the stored arrays once; the caller holds `_lock`."""
+        if self._loaded:
+            return
+        if self.directory:
+            try:
+                with open(os.path.join(self._base_dir(), "meta.json")) as f:
+                    meta = json.load(f)
+                series = {c: _read_only(np.load(os.path.join(self._base_dir(), f"{c}.npy")))
+                          for c in meta["currencies"]}
+                self._held = _Held(_to_date(meta["start"]), _to_date(meta["covered_through"]), series)
+            except (OSError, ValueError, KeyError) as e:
+                if not isinstance(e, FileNotFoundError):
+                    print(f"Ignoring unreadable exchange rate history: {e}")
+        # Only now: lookups skip the lock once this is set
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                self._load()
+
+    def _save(self):
+        if not self.directory:
+            return
+        held = self._held
+        directory = self._base_dir()
+        os.makedirs(directory, exist_ok=True)
+        for currency, values in held.series.items():
+            tmp = os.path.join(directory, f".{currency}.{os.getpid()}.npy")
+            np.save(tmp, values)
+            os.replace(tmp, os.path.join(directory, f"{currency}.npy"))
+        meta = {"start": held.start.isoformat(), "covered_through": held.covered_through.isoformat(),
+                "currencies": sorted(held.series)}
+        tmp = os.path.join(directory, f".meta.{os.getpid()}.json")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+
+    # --- fetching ---------------------------------------------------------
+
+    def _fetch(self, first, last):
+        """{day: {currency: quote}} for the business days in [first, last]."""
+        response = requests.get(f"{self.url}/{first.isoformat()}..{last.isoformat()}",
+                                params={"from": self.base}, timeout=self.timeout)
+        response.raise_for_status()
+        self.fetches += 1
+        return {_to_date(day): quotes for day, quotes in response.json().get("rates", {}).items()}
+
+    def _merge(self, first, last, quotes_by_day):
+        """
+        Widens the arrays to cover the fetched days, writes the quotes in and
+        publishes the result as a new snapshot; the caller holds `_lock`.
+        Days after the latest quote are only taken as final (weekends and
+        holidays) once they are FINAL_AFTER_DAYS old: before that they may
+        just not be published yet, and stay outside the held range.
+        """
+        held = self._held
+        if quotes_by_day:
+            # The API answers from the business day before `first` when that is not one
+            first = min(first, min(quotes_by_day))
+        final = [min(last, self.today() - timedelta(days=FINAL_AFTER_DAYS))]
+        if quotes_by_day:
+            final.append(max(quotes_by_day))
+        if held.covered_through is not None:
+            final.append(held.covered_through)
+        start = first if held.start is None else min(first, held.start)
+        end = max(final)
+        if end < start:
+            return
+        length = (end - start).days + 1
+        currencies = set(held.series)
+        for quotes in quotes_by_day.values():
+            currencies.update(quotes)
+
+        merged = {}
+        for currency in currencies:
+            values = np.full(length, np.nan, dtype=np.float64)
+            old = held.series.get(currency)
+            if old is not None:
+                offset = (held.start - start).days
+                values[offset:offset + len(old)] = old
+            merged[currency] = values
+        for day, quotes in quotes_by_day.items():
+            if start <= day <= end:
+                for currency, quote in quotes.items():
+                    merged[currency][(day - start).days] = quote
+
+        series = {currency: _read_only(_forward_fill(values)) for currency, values in merged.items()}
+        self._held = _Held(start, end, series)
+
+    def ensure_range(self, first, last):
+        """
+        Makes sure every day in [first, last] is held, fetching only the
+        missing part before and/or after the held range (one request each).
+        Days from today on, and recent days whose rates are not published
+        yet, are filled from the latest published rate; the latter are
+        fetched again at most every RECHECK_AFTER seconds. The fetches run
+        without holding the lock, so lookups and other ranges do not wait
+        for them. Returns False if a needed fetch failed.
+        """
+        first = _to_date(first)
+        last = min(_to_date(last), self.today() - timedelta(days=1))
+        self._ensure_loaded()
+        if last < first:
+            return True
+        with self._lock:
+            held = self._held
+            segments = []
+            if held.start is None:
+                segments.append((first - timedelta(days=LEAD_DAYS), last))
+            else:
+                if first < held.start + timedelta(days=LEAD_DAYS):
+                    segments.append((first - timedelta(days=LEAD_DAYS), held.start - timedelta(days=1)))
+                if last > held.covered_through and not self._recently_checked(held.covered_through, last):
+                    segments.append((held.covered_through + timedelta(days=1), last))
+        segments = [(seg_first, seg_last) for seg_first, seg_last in segments if seg_first <= seg_last]
+        if not segments:
+            return True
+
+        ok = True
+        fetched = []
+        for seg_first, seg_last in segments:
+            try:
+                fetched.append((seg_first, seg_last, self._fetch(seg_first, seg_last)))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Error fetching exchange rate history {seg_first}..{seg_last}: {e}")
+                ok = False
+        if not fetched:
+            return ok
+        with self._lock:
+            for seg_first, seg_last, quotes in fetched:
+                self._merge(seg_first, seg_last, quotes)
+                if held.covered_through is None or seg_last > held.covered_through:
+                    self._tail_checked = (self._held.covered_through, seg_last, time.monotonic())
+            if self._held.start is not None:
+                self._save()
+        return ok
+
+    def _recently_checked(self, covered_through, last):
+        """Whether the days from `covered_through` to `last` were asked for less than RECHECK_AFTER ago."""
+        checked = self._tail_checked
+        return (checked is not None and checked[0] == covered_through and last <= checked[1]
+                and time.monotonic() - checked[2] < RECHECK_AFTER)
+
+    # --- lookups ----------------------------------------------------------
+
+    def _quotes(self, held, currency, first, last):
+        """Quotes of `currency` per base unit for each day in [first, last] (NaN where unknown)."""
+        length = (last - first).days + 1
+        if currency == self.base:
+            return np.ones(length, dtype=np.float64)
+        values = held.series.get(currency)
+        out = np.full(length, np.nan, dtype=np.float64)
+        if values is None:
+            return out
+        # Days after the held range take its last value (not yet published or still to come)
+        index = np.arange(length) + (first - held.start).days
+        held = index >= 0
+        index = np.minimum(index, len(values) - 1)
+        out[held] = values[index[held]]
+        return out
+
+    def _rates(self, from_currency, to_currency, first, last):
+        self._ensure_loaded()
+        held = self._held  # one snapshot for the whole lookup
+        if held.start is None:
+            return np.full((last - first).days + 1, np.nan)
+        to_currency = (to_currency or self.base).upper()
+        return self._quotes(held, to_currency, first, last) / self._quotes(held, from_currency.upper(), first, last)
+
+    def rate(self, from_currency, day, to_currency=None):
+        """Rate converting one unit of `from_currency` into `to_currency` (the base by default) on `day`, or None."""
+        day = _to_date(day)
+        value = self._rates(from_currency, to_currency, day, day)[0]
+        return None if np.isnan(value) else float(value)
+
+    def month_rate(self, from_currency, month, to_currency=None):
+        """Average daily rate over a "YYYY-MM" month, or None if no day of it is known."""
+        first, last = month_bounds(month)
+        values = self._rates(from_currency, to_currency, first, last)
+        values = values[~np.isnan(values)]
+        return float(values.mean()) if values.size else None
+
+    def stats(self):
+        held = self._held
+        return {
+            "base": self.base,
+            "start": held.start and held.start.isoformat(),
+            "covered_through": held.covered_through and held.covered_through.isoformat(),
+            "currencies": len(held.series),
+            "fetches": self.fetches,
+        }
+
+
+rate_history = HistoricalRates()
@@ -0,0 +1,279 @@
+"""
+Exchange-rate store.
+
+Rates are fetched per base currency: one `latest?from=<base>` call returns
+the base's rate against every quoted currency, and any pair involving that
+base (or its inverse) is answered from the table. Tables are shared by all
+threads, expire after REPORT_RATES_TTL seconds, are refreshed in the
+background once they pass REPORT_RATES_REFRESH_AHEAD of their lifetime, and
+are persisted to REPORT_RATES_PATH so a restarted process starts warm.
+"""
+import json
+import os
+import threading
+import time
+
+import requests
+
+DEFAULT_RATES_URL = "https://api.frankfurter.app"
+
+# Seconds before a base whose fetch failed is requested again.
+RETRY_AFTER = 60
+
+
+def rate_settings_from_env():
+    """Reads the rate store settings from REPORT_RATES_* environment variables."""
+    return {
+        "url": os.getenv("REPORT_RATES_URL", DEFAULT_RATES_URL),
+        "path": os.getenv("REPORT_RATES_PATH", "exchange_rates.json"),
+        "ttl": float(os.getenv("REPORT_RATES_TTL", 86400)),
+        "refresh_ahead": float(os.getenv("REPORT_RATES_REFRESH_AHEAD", 0.8)),
+        "bases": [b.strip().upper() for b in os.getenv("REPORT_RATES_BASES", "PLN").split(",") if b.strip()],
+        "timeout": float(os.getenv("REPORT_RATES_TIMEOUT", 5)),
+    }
+
+
+class RateStore:
+    """
+    Thread-safe table of exchange rates keyed by base currency.
+
+    Args:
+        url (str): Root of a Frankfurter-compatible API.
+        path (str): JSON file the tables are persisted to; "" disables it.
+        ttl (float): Seconds a fetched table is considered fresh.
+        refresh_ahead (float): Fraction of `ttl` after which a lookup also
+            starts a background refresh.
+        bases (list): Base currencies refreshed by refresh_all().
+        timeout (float): HTTP timeout in seconds.
+        timer (callable): Wall clock; fetch times are persisted, so it must
+            be comparable across processes.
+    """
+
+    def __init__(self, url=None, path=None, ttl=None, refresh_ahead=None, bases=None, timeout=None,
+                 timer=time.time):
+        settings = rate_settings_from_env()
+        self.url = (url or settings["url"]).rstrip("/")
+        self.path = settings["path"] if path is None else path
+        self.ttl = settings["ttl"] if ttl is None else ttl
+        self.refresh_ahead = settings["refresh_ahead"] if refresh_ahead is None else refresh_ahead
+        self.bases = settings["bases"] if bases is None else [b.upper() for b in bases]
+        self.timeout = settings["timeout"] if timeout is None else timeout
+        self.timer = timer
+
+        self._tables = {}  # base -> {"fetched_at": float, "date": str, "rates": {currency: rate}}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._fetching = {}  # base -> threading.Event set when that fetch completes
+        self._failed_at = {}  # base -> time of the last failed fetch
+        self._refresher = None
+        self._stop = threading.Event()
+        self._listeners = []
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    # --- persistence -----------------------------------------------------
+
+    def _load(self):
+        """Reads the persisted tables once, on first use."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.path:
+                return
+            try:
+                with open(self.path) as f:
+                    tables = json.load(f)
+            except (OSError, ValueError):
+                return
+            for base, table in tables.items():
+                if isinstance(table, dict) and "rates" in table and "fetched_at" in table:
+                    self._tables.setdefault(base, table)
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = dict(self._tables)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Error saving exchange rates: {e}")
+
+    # --- fetching --------------------------------------------------------
+
+    def _fetch(self, base):
+        response = requests.get(f"{self.url}/latest", params={"from": base}, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return {"fetched_at": self.timer(), "date": data.get("date"), "rates": data["rates"]}
+
+    def refresh(self, base):
+        """
+        Fetches the table for `base` now. Concurrent calls for the same base
+        share one HTTP request. Returns True on success; on failure the
+        previous table (if any) is kept.
+        """
+        base = base.upper()
+        with self._lock:
+            done = self._fetching.get(base)
+            leader = done is None
+            if leader:
+                done = self._fetching[base] = threading.Event()
+        if not leader:
+            done.wait(self.timeout * 2)
+            return base in self._tables
+
+        try:
+            table = self._fetch(base)
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            print(f"Error fetching exchange rates for {base}: {e}")
+            with self._lock:
+                self.fetch_errors += 1
+                self._failed_at[base] = self.timer()
+            return False
+        else:
+            with self._lock:
+                self._tables[base] = table
+                self._failed_at.pop(base, None)
+                self.fetches += 1
+            self._save()
+            for listener in list(self._listeners):
+                try:
+                    listener(base, table)
+                except Exception as e:
+                    print(f"Error in exchange rate listener: {e}")
+            return True
+        finally:
+            with self._lock:
+                del self._fetching[base]
+            done.set()
+
+    def _refresh_in_background(self, base):
+        with self._lock:
+            if base in self._fetching:
+                return
+        threading.Thread(target=self.refresh, args=(base,), daemon=True).start()
+
+    def add_listener(self, listener):
+        """Calls listener(base, table) after every successful refresh."""
+        self._listeners.append(listener)
+
+    def refresh_all(self):
+        for base in self.bases:
+            self.refresh(base)
+
+    # --- lookups ---------------------------------------------------------
+
+    def _age(self, base):
+        table = self._tables.get(base)
+        return None if table is None else self.timer() - table["fetched_at"]
+
+    def _table(self, base, fetch=True):
+        """Fresh table for `base`, fetching it if missing or expired (stale on failure)."""
+        age = self._age(base)
+        if age is None or age >= self.ttl:
+            failed_at = self._failed_at.get(base)
+            if fetch and (failed_at is None or self.timer() - failed_at >= RETRY_AFTER):
+                self.refresh(base)
+        elif age >= self.ttl * self.refresh_ahead:
+            self._refresh_in_background(base)
+        table = self._tables.get(base)
+        return table["rates"] if table else None
+
+    def _fresh(self, base):
+        age = self._age(base)
+        return age is not None and age < self.ttl
+
+    def snapshot(self):
+        """Copy of the current tables, {base: {"fetched_at", "date", "rates"}}."""
+        self._load()
+        with self._lock:
+            return {base: dict(table) for base, table in self._tables.items()}
+
+    def get_rate(self, from_currency, to_currency="PLN", default=1.0):
+        """
+        Rate converting one unit of `from_currency` into `to_currency`.
+        Answered from an existing table for either currency when possible;
+        otherwise the `to_currency` table is fetched, which also covers every
+        other source currency. Returns `default` if no rate is available.
+        """
+        from_currency, to_currency = from_currency.upper(), to_currency.upper()
+        if from_currency == to_currency:
+            return 1.0
+        self._load()
+
+        if self._fresh(from_currency):
+            rates = self._table(from_currency)
+            if to_currency in rates:
+                return float(rates[to_currency])
+        rates = self._table(to_currency)
+        if rates and rates.get(from_currency):
+            return 1.0 / float(rates[from_currency])
+        rates = self._table(from_currency, fetch=False)
+        if rates and to_currency in rates:
+            return float(rates[to_currency])
+
+        print(f"No exchange rate for {from_currency}_{to_currency}, using {default}")
+        return default
+
+    def get_rates(self, currencies, to_currency="PLN", default=1.0):
+        """{currency: rate into `to_currency`} for each distinct currency."""
+        return {c: self.get_rate(c, to_currency, default) for c in dict.fromkeys(currencies)}
+
+    # --- background refresh ----------------------------------------------
+
+    def _refresh_due_in(self, base, interval):
+        """Seconds until `base` is `interval` old (now if missing), backing off RETRY_AFTER after a failure."""
+        age = self._age(base)
+        due = 0 if age is None else interval - age
+        failed_at = self._failed_at.get(base)
+        if failed_at is not None:
+            due = max(due, RETRY_AFTER - (self.timer() - failed_at))
+        return max(due, 0)
+
+    def start_background_refresh(self, interval=None):
+        """
+        Starts a daemon thread that refreshes each configured base once it is
+        `interval` seconds old (by default shortly before it expires). Tables
+        loaded from disk are not refetched until then, so a restarted worker
+        makes no call while its persisted tables are fresh.
+        """
+        if self._refresher is not None:
+            return
+        interval = interval or self.ttl * self.refresh_ahead
+        self._stop.clear()
+
+        def loop():
+            self._load()
+            while True:
+                wait = min((self._refresh_due_in(base, interval) for base in self.bases), default=interval)
+                if self._stop.wait(wait):
+                    return
+                for base in self.bases:
+                    if self._refresh_due_in(base, interval) <= 0:
+                        self.refresh(base)
+
+        self._refresher = threading.Thread(target=loop, name="rate-store-refresh", daemon=True)
+        self._refresher.start()
+
+    def stop_background_refresh(self):
+        if self._refresher is not None:
+            self._stop.set()
+            self._refresher.join()
+            self._refresher = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "bases": {base: {"date": t["date"], "age": self.timer() - t["fetched_at"],
+                                 "currencies": len(t["rates"])} for base, t in self._tables.items()},
+                "fetches": self.fetches,
+                "fetch_errors": self.fetch_errors,
+            }
+
+
+rate_store = RateStore()
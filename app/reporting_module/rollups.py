@@ -0,0 +1,317 @@
+"""
+Per-(company_id, project_id, month) sums of the ledger tables.
+
+Statement-level triggers on the ledger tables record every (company, month)
+bucket a statement touched in `report_rollup_dirty`, taken from the old rows
+as well as the new ones, so deleted rows, rows moved to another month,
+company or project, and truncated tables all mark the buckets they left.
+A refresh recomputes exactly the dirty buckets and clears them in the same
+transaction. The first refresh of a table, and `--full`, rebuild it.
+
+    cd app && python -m reporting_module.rollups [--full]
+"""
+import argparse
+import calendar
+import os
+from datetime import date, datetime
+
+import psycopg2
+import psycopg2.extras
+
+from .statements import compile_where, execute, shape_cache
+from .versions import trigger_ddl, bump_data_versions
+
+ROLLUP_TABLE = "report_monthly_rollups"
+DIRTY_TABLE = "report_rollup_dirty"
+REFRESH_TABLE = "report_rollup_refreshes"
+DIRTY_FUNCTION = "report_mark_rollup_dirty"
+
+ROLLUP_FILTERS = (
+    ("source_table", "source_table = %s"),
+    ("company_id", "company_id = %s"),
+    ("project_id", "project_id = %s"),
+    ("first_month", "month >= %s"),
+    ("last_month", "month <= %s"),
+)
+
+DIRTY_FILTERS = (
+    ("source_table", "source_table = %s"),
+    ("company_id", "company_id = %s"),
+    ("first_month", "month >= %s"),
+    ("last_month", "month <= %s"),
+)
+
+# Ledger tables kept in the rollup.
+ROLLUP_SOURCES = ("income_entries", "general_expenses", "payroll_entries")
+
+_MARK = f"""
+            INSERT INTO {DIRTY_TABLE} (source_table, company_id, month)
+            SELECT DISTINCT TG_TABLE_NAME, company_id::text, date_trunc('month', date)::date
+            FROM {{rows}} WHERE company_id IS NOT NULL AND date IS NOT NULL
+            ON CONFLICT (source_table, company_id, month) DO UPDATE SET marked_at = now();
+"""
+
+ROLLUP_DDL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        source_table TEXT NOT NULL,
+        company_id TEXT NOT NULL,
+        project_id TEXT,
+        month DATE NOT NULL,
+        amount NUMERIC NOT NULL,
+        entries INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS {ROLLUP_TABLE}_lookup
+        ON {ROLLUP_TABLE} (source_table, company_id, month)
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {DIRTY_TABLE} (
+        source_table TEXT NOT NULL,
+        company_id TEXT NOT NULL,
+        month DATE NOT NULL,
+        marked_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (source_table, company_id, month)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {REFRESH_TABLE} (
+        source_table TEXT PRIMARY KEY,
+        refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    # Marking an already dirty bucket updates its row instead of skipping it:
+    # a refresh whose snapshot predates the write then fails with a
+    # serialization error when clearing the bucket, rather than clearing it
+    # without having seen the write.
+    f"""
+    CREATE OR REPLACE FUNCTION {DIRTY_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            {_MARK.format(rows="new_rows")}
+        ELSIF TG_OP = 'DELETE' THEN
+            {_MARK.format(rows="old_rows")}
+        ELSIF TG_OP = 'UPDATE' THEN
+            {_MARK.format(rows="(SELECT company_id, date FROM old_rows UNION ALL SELECT company_id, date FROM new_rows) b")}
+        ELSE
+            INSERT INTO {DIRTY_TABLE} (source_table, company_id, month)
+            SELECT DISTINCT source_table, company_id, month FROM {ROLLUP_TABLE} WHERE source_table = TG_TABLE_NAME
+            ON CONFLICT (source_table, company_id, month) DO UPDATE SET marked_at = now();
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+)
+
+# Restricts the recomputed ledger rows and rollup buckets to the dirty ones.
+_DIRTY_LEDGER_ROWS = (
+    f" AND (e.company_id::text, date_trunc('month', e.date)::date) IN ("
+    f"SELECT company_id, month FROM {DIRTY_TABLE} WHERE source_table = %s)"
+)
+_DIRTY_BUCKETS = (
+    f" AND (r.company_id, r.month) IN (SELECT company_id, month FROM {DIRTY_TABLE} WHERE source_table = %s)"
+)
+
+
+def rollups_enabled():
+    """
+    Summaries read the rollup only when REPORT_USE_ROLLUPS=1, and then only
+    for companies without dirty buckets in the range (has_dirty_buckets).
+    """
+    return os.getenv("REPORT_USE_ROLLUPS", "0") == "1"
+
+
+def month_range(start_date, end_date):
+    """
+    Maps a report date range onto rollup months.
+
+    Returns (first_month, last_month) as dates (either may be None for an
+    open end) when the range covers whole months only: `start_date` is the
+    first of a month and `end_date` the last day of one. Returns None when
+    the range cuts through a month or a date does not parse, in which case
+    the raw ledger rows must be read.
+    """
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+    except (TypeError, ValueError):
+        return None
+
+    if start and start.day != 1:
+        return None
+    if end and end.day != calendar.monthrange(end.year, end.month)[1]:
+        return None
+    return start, (date(end.year, end.month, 1) if end else None)
+
+
+def build_rollup_summary_queries(table, total_key, company_id, start_date=None, end_date=None, project_id=None):
+    """
+    Returns (total_sql, trend_sql, params) reading the total and the monthly
+    trend of `table` from the rollup, shaped like the raw ledger queries, or
+    None if the filters cannot be answered from whole months.
+    """
+    months = month_range(start_date, end_date)
+    if table not in ROLLUP_SOURCES or months is None:
+        return None
+    first_month, last_month = months
+
+    where_sql, params = compile_where(ROLLUP_FILTERS, source_table=table, company_id=company_id,
+                                      project_id=project_id, first_month=first_month, last_month=last_month)
+    return _rollup_summary_sql(total_key, where_sql) + (params,)
+
+
+@shape_cache
+def _rollup_summary_sql(total_key, where_sql):
+    total_sql = f"""
+        SELECT COALESCE(SUM(amount), 0) AS {total_key}
+        FROM {ROLLUP_TABLE}
+        WHERE {where_sql}
+        """
+    trend_sql = f"""
+        SELECT TO_CHAR(r.month, 'YYYY-MM') AS month,
+               SUM(r.amount) AS amount
+        FROM {ROLLUP_TABLE} r
+        WHERE {where_sql}
+        GROUP BY r.month
+        ORDER BY r.month
+        """
+    return total_sql, trend_sql
+
+
+def has_dirty_buckets(conn, table, company_id, start_date=None, end_date=None):
+    """
+    Whether any of the company's buckets of `table` in the (whole-month)
+    range changed since the last refresh, in which case the rollup would
+    answer with stale sums and the raw ledger rows must be read instead.
+    One lookup on the dirty table's primary key.
+    """
+    first_month, last_month = month_range(start_date, end_date)
+    where_sql, params = compile_where(DIRTY_FILTERS, source_table=table, company_id=company_id,
+                                      first_month=first_month, last_month=last_month)
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        execute(conn, cur, _dirty_buckets_sql(where_sql), params)
+        return bool(cur.fetchone()["dirty"])
+    finally:
+        cur.close()
+
+
+@shape_cache
+def _dirty_buckets_sql(where_sql):
+    return f"SELECT EXISTS (SELECT 1 FROM {DIRTY_TABLE} WHERE {where_sql}) AS dirty"
+
+
+def ensure_rollup_schema(conn):
+    """Creates the rollup tables and the triggers marking dirty buckets on the ledger tables."""
+    cur = conn.cursor()
+    try:
+        for ddl in ROLLUP_DDL:
+            cur.execute(ddl)
+        for table in ROLLUP_SOURCES:
+            for ddl in trigger_ddl(table, DIRTY_FUNCTION, prefix="report_rollup"):
+                cur.execute(ddl)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def refresh_rollup(conn, table, full=False):
+    """
+    Brings the rollup of one ledger table up to date in a single
+    REPEATABLE READ transaction, so the buckets deleted and re-inserted and
+    the dirty marks cleared all come from the same snapshot. Marks added by
+    writes the snapshot does not see stay for the next refresh. The data
+    versions of the companies whose buckets were recomputed are bumped in
+    the same transaction (see versions.py).
+
+    Args:
+        conn: psycopg2 connection.
+        table (str): One of ROLLUP_SOURCES.
+        full (bool): Rebuild every bucket instead of the dirty ones; also
+            done when the table was never refreshed.
+
+    Returns:
+        dict: {"table", "buckets", "full"} for logging.
+    """
+    if table not in ROLLUP_SOURCES:
+        raise ValueError(f"{table} is not a rollup source")
+
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+        cur.execute(f"SELECT refreshed_at FROM {REFRESH_TABLE} WHERE source_table = %s", [table])
+        full = full or cur.fetchone() is None
+
+        if full:
+            cur.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE source_table = %s", [table])
+            dirty_sql, dirty_params = "", []
+        else:
+            dirty_sql, dirty_params = _DIRTY_LEDGER_ROWS, [table]
+            cur.execute(f"DELETE FROM {ROLLUP_TABLE} r WHERE r.source_table = %s{_DIRTY_BUCKETS}",
+                        [table, table])
+
+        # Rows without a company or date belong to no bucket (the triggers
+        # skip them too) and would break the NOT NULL columns
+        cur.execute(
+            f"""
+            INSERT INTO {ROLLUP_TABLE} (source_table, company_id, project_id, month, amount, entries)
+            SELECT %s, e.company_id, e.project_id, date_trunc('month', e.date)::date,
+                   COALESCE(SUM(e.amount), 0), COUNT(*)
+            FROM {table} e
+            WHERE e.company_id IS NOT NULL AND e.date IS NOT NULL{dirty_sql}
+            GROUP BY e.company_id, e.project_id, date_trunc('month', e.date)::date
+            """,
+            [table] + dirty_params
+        )
+        buckets = cur.rowcount
+
+        # Summaries read from the rollup are cached and tagged by data
+        # version; the ledger write bumped it before this refresh ran.
+        if full:
+            bump_data_versions(cur)
+        else:
+            bump_data_versions(cur, f"SELECT company_id FROM {DIRTY_TABLE} WHERE source_table = %s", [table])
+
+        cur.execute(f"DELETE FROM {DIRTY_TABLE} WHERE source_table = %s", [table])
+        cur.execute(
+            f"""
+            INSERT INTO {REFRESH_TABLE} (source_table, refreshed_at)
+            VALUES (%s, now())
+            ON CONFLICT (source_table) DO UPDATE SET refreshed_at = now()
+            """,
+            [table]
+        )
+        conn.commit()
+        return {"table": table, "buckets": buckets, "full": full}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def refresh_rollups(conn, full=False):
+    """Refreshes every ledger table's rollup; returns one summary per table."""
+    ensure_rollup_schema(conn)
+    return [refresh_rollup(conn, table, full=full) for table in ROLLUP_SOURCES]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the monthly ledger rollups.")
+    parser.add_argument("--full", action="store_true", help="rebuild every bucket")
+    args = parser.parse_args()
+
+    from .api import get_db_postgres_connection
+
+    conn = get_db_postgres_connection()
+    if isinstance(conn, str):
+        raise SystemExit(conn)
+    try:
+        for summary in refresh_rollups(conn, full=args.full):
+            mode = "rebuilt" if summary["full"] else "dirty buckets recomputed"
+            print(f"{summary['table']}: {summary['buckets']} buckets, {mode}")
+    finally:
+        conn.close()
@@ -0,0 +1,153 @@
+"""
+Indexes the report queries depend on, and a check that provisions them.
+
+    cd app && python -m reporting_module.schema [--create]
+"""
+import argparse
+import os
+from collections import namedtuple
+
+import psycopg2.extras
+
+# A b-tree index: key `columns`, optional covering `include` columns.
+IndexSpec = namedtuple("IndexSpec", ["name", "table", "columns", "include"], defaults=[()])
+
+# Ledger reports filter on company_id, optionally project_id, and a date
+# range, then sum amount: covering the amount keeps those aggregates to
+# index-only scans. The (company_id, date) variant serves the common case
+# without a project filter, where a project_id key column would force a
+# scan of every project's range.
+LEDGER_TABLES = ("income_entries", "general_expenses", "payroll_entries")
+
+REPORT_INDEXES = tuple(
+    spec
+    for table in LEDGER_TABLES
+    for spec in (
+        IndexSpec(f"ix_{table}_company_project_date", table, ("company_id", "project_id", "date"), ("amount",)),
+        IndexSpec(f"ix_{table}_company_date", table, ("company_id", "date"), ("amount",)),
+    )
+) + (
+    IndexSpec("ix_tenders_company_project_status_start", "tenders",
+              ("company_id", "project_id", "status", "start_date"), ("end_date",)),
+    IndexSpec("ix_tenders_company_start", "tenders",
+              ("company_id", "start_date"), ("status", "end_date", "project_id")),
+    IndexSpec("ix_projects_company", "projects", ("company_id", "id"), ("name",)),
+)
+
+
+def create_index_sql(spec, concurrently=True):
+    """Returns the CREATE INDEX statement for an IndexSpec."""
+    sql = (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {spec.name} "
+        f"ON {spec.table} ({', '.join(spec.columns)})"
+    )
+    if spec.include:
+        sql += f" INCLUDE ({', '.join(spec.include)})"
+    return sql
+
+
+def index_status(conn, specs=REPORT_INDEXES):
+    """
+    Looks the declared indexes up in the catalog.
+
+    Returns:
+        dict: {index_name: {"valid": bool, "scans": int}} for the indexes
+        that exist. `valid` is False for leftovers of a failed concurrent
+        build; `scans` is pg_stat_user_indexes.idx_scan since the last
+        statistics reset.
+    """
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        cur.execute(
+            """
+            SELECT c.relname AS name, i.indisvalid AS valid, COALESCE(s.idx_scan, 0) AS scans
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+            WHERE c.relname = ANY(%s)
+            """,
+            [[spec.name for spec in specs]]
+        )
+        return {row["name"]: {"valid": row["valid"], "scans": row["scans"]} for row in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def check_schema(conn, create=False, specs=REPORT_INDEXES):
+    """
+    Reports which declared indexes are missing, invalid or unused and,
+    with `create`, builds the missing (and rebuilds the invalid) ones with
+    CREATE INDEX CONCURRENTLY so the tables stay writable meanwhile.
+
+    Concurrent builds cannot run inside a transaction, so the connection is
+    switched to autocommit for the duration of the check.
+
+    Returns:
+        dict: Lists of index names under "missing", "invalid", "created"
+        and "unused" (present but never scanned).
+    """
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        status = index_status(conn, specs)
+        missing = [spec for spec in specs if spec.name not in status]
+        invalid = [spec for spec in specs if spec.name in status and not status[spec.name]["valid"]]
+        unused = [name for name, s in status.items() if s["valid"] and s["scans"] == 0]
+
+        created = []
+        if create:
+            cur = conn.cursor()
+            try:
+                for spec in invalid:
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {spec.name}")
+                for spec in invalid + missing:
+                    cur.execute(create_index_sql(spec))
+                    created.append(spec.name)
+            finally:
+                cur.close()
+
+        return {
+            "missing": [spec.name for spec in missing],
+            "invalid": [spec.name for spec in invalid],
+            "created": created,
+            "unused": sorted(unused),
+        }
+    finally:
+        conn.autocommit = previous_autocommit
+
+
+def create_indexes_enabled():
+    """
+    Whether check_and_update_schema() builds missing indexes by default: only
+    with REPORT_SCHEMA_CREATE_INDEXES=1. Otherwise it reports them, and they
+    are built by `flask --app app init-reports` or `--create` below.
+    """
+    return os.getenv("REPORT_SCHEMA_CREATE_INDEXES", "0") == "1"
+
+
+def format_report(report):
+    """One line per finding, for startup logs."""
+    lines = []
+    for key, label in (("created", "created index"), ("missing", "missing index"),
+                       ("invalid", "invalid index"), ("unused", "unused index")):
+        if key == "missing" and report["created"]:
+            continue
+        lines.extend(f"{label}: {name}" for name in report[key])
+    return lines or ["all report indexes present"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check (and optionally create) the report indexes.")
+    parser.add_argument("--create", action="store_true", help="build missing indexes concurrently")
+    args = parser.parse_args()
+
+    from .api import get_db_postgres_connection
+
+    conn = get_db_postgres_connection()
+    if isinstance(conn, str):
+        raise SystemExit(conn)
+    try:
+        for line in format_report(check_schema(conn, create=args.create)):
+            print(line)
+    finally:
+        conn.close()
@@ -0,0 +1,101 @@
+"""
+JSON encoding of report responses.
+
+Report bodies are encoded by a pluggable `dumps(data) -> bytes`, chosen with
+REPORT_JSON_ENCODER: `orjson` (the default when the package is installed),
+`json` (standard library) or any name added with register_encoder().
+Both built-in encoders take Decimal (as a number), date and datetime (ISO
+8601) and psycopg2 DictRow (as an object) values directly, so routes can
+hand over rows without converting every value first. The standard library
+fallback looks for DictRows only where result rows go (see _with_dict_rows).
+"""
+import datetime
+import decimal
+import json
+import os
+
+import psycopg2.extras
+from flask import Response
+
+
+def _default(obj):
+    """Values neither encoder handles on its own."""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, psycopg2.extras.DictRow):
+        return dict(obj.items())
+    # Subclasses of the basic types (orjson hands them over as is)
+    for base in (dict, list, str, int, float):
+        if isinstance(obj, base):
+            return base(obj)
+    if isinstance(obj, tuple):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_dumps(data):
+    import orjson
+    # Passing subclasses through sends DictRow (a list subclass) to _default
+    return orjson.dumps(data, default=_default,
+                        option=orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_NON_STR_KEYS)
+
+
+def _rows_as_dicts(rows):
+    if isinstance(rows, psycopg2.extras.DictRow):
+        return dict(rows.items())
+    if isinstance(rows, (list, tuple)) and any(isinstance(row, psycopg2.extras.DictRow) for row in rows):
+        return [dict(row.items()) if isinstance(row, psycopg2.extras.DictRow) else row for row in rows]
+    return rows
+
+
+def _with_dict_rows(data):
+    """
+    `data` with DictRows turned into dicts where result rows go: the data
+    itself, its items, or the items of its top-level values. Nothing deeper
+    is visited, so the common case costs one isinstance check per row.
+    """
+    if isinstance(data, dict):
+        return {key: _rows_as_dicts(value) for key, value in data.items()}
+    return _rows_as_dicts(data)
+
+
+def _json_dumps(data):
+    # The standard encoder writes list subclasses as arrays without asking
+    # _default, so DictRows are turned into objects up front.
+    return json.dumps(_with_dict_rows(data), default=_default, separators=(",", ":")).encode()
+
+
+ENCODERS = {
+    "orjson": _orjson_dumps,
+    "json": _json_dumps,
+}
+
+
+def register_encoder(name, dumps):
+    """Makes `dumps(data) -> bytes` selectable as REPORT_JSON_ENCODER=<name>."""
+    ENCODERS[name] = dumps
+
+
+def _orjson_available():
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_encoder():
+    """The `dumps` selected by REPORT_JSON_ENCODER, falling back to `json` without orjson."""
+    name = os.getenv("REPORT_JSON_ENCODER", "").strip()
+    if not name:
+        name = "orjson" if _orjson_available() else "json"
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown REPORT_JSON_ENCODER: {name!r}")
+    return ENCODERS[name]
+
+
+def json_response(data, status=200):
+    """A JSON response encoded with the configured encoder."""
+    return Response(get_encoder()(data), status=status, mimetype="application/json")
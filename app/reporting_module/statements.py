@@ -0,0 +1,159 @@
+"""
+Query shapes and server-side prepared statements for the report queries.
+
+A report's WHERE clause depends only on which optional filters are present,
+so each filter set declares its conjuncts once and compile_where() maps the
+present ones to a cached SQL shape: the text is built once per shape, not
+once per request. With REPORT_PREPARED_STATEMENTS=1, execute() additionally
+runs each shape as a named prepared statement of the pooled connection, so
+PostgreSQL parses and plans it once per connection instead of per call.
+"""
+import functools
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+from .pool import PooledConnection
+
+# (argument, conjunct) pairs in the order they appear in the WHERE clause.
+LEDGER_FILTERS = (
+    ("company_id", "company_id = %s"),
+    ("project_id", "project_id = %s"),
+    ("start_date", "date >= %s"),
+    ("end_date", "date <= %s"),
+    ("project_ids", "project_id = ANY(%s)"),
+)
+TENDER_STATUS_FILTERS = (
+    ("company_id", "t.company_id = %s"),
+    ("start_date", "t.start_date >= %s"),
+    ("end_date", "t.end_date <= %s"),
+    ("project_id", "t.project_id = %s"),
+    ("status", "t.status = %s"),
+)
+TENDER_COUNT_FILTERS = (
+    ("company_id", "t.company_id = %s"),
+    ("project_id", "t.project_id = %s"),
+    ("status", "t.status = %s"),
+    ("start_date", "t.start_date >= %s"),
+    ("end_date", "t.end_date <= %s"),
+)
+PROJECT_FILTERS = (
+    ("company_id", "company_id = %s"),
+    ("project_id", "id = %s"),
+)
+
+DEFAULT_STATEMENT_CACHE_SIZE = 64
+
+
+@functools.lru_cache(maxsize=512)
+def _where_shape(filters, present):
+    conjuncts = dict(filters)
+    return " AND ".join(conjuncts[name] for name in present)
+
+
+def compile_where(filters, **values):
+    """
+    Returns (where_sql, params) for the filters whose value is present
+    (not None and not an empty string), in declaration order.
+
+    Args:
+        filters (tuple): (argument, conjunct) pairs such as LEDGER_FILTERS.
+        **values: Filter values keyed by argument name.
+    """
+    present = tuple(name for name, _ in filters if values.get(name) is not None and values.get(name) != "")
+    return _where_shape(filters, present), [values[name] for name in present]
+
+
+def shape_cache(func):
+    """Caches a function that renders SQL text from hashable shape arguments."""
+    return functools.lru_cache(maxsize=256)(func)
+
+
+def prepared_enabled():
+    return os.getenv("REPORT_PREPARED_STATEMENTS", "0") == "1"
+
+
+_PLACEHOLDER = re.compile(r"%%|%s")
+
+
+def to_positional(sql):
+    """Rewrites psycopg2 `%s` placeholders as PostgreSQL `$1..$n`. Returns (sql, n)."""
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group() == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER.sub(number, sql), count
+
+
+class StatementCache:
+    """
+    Bounded LRU of the statements prepared on one connection. Preparing past
+    `maxsize` deallocates the least recently used statement on the server.
+    """
+
+    def __init__(self, maxsize=DEFAULT_STATEMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._names = OrderedDict()  # sql -> (name, parameter count)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def prepare(self, cur, sql):
+        """Returns (name, parameter count), issuing PREPARE on a miss."""
+        entry = self._names.get(sql)
+        if entry is not None:
+            self._names.move_to_end(sql)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        positional, count = to_positional(sql)
+        name = "report_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+        cur.execute(f"PREPARE {name} AS {positional}")
+        self._names[sql] = entry = (name, count)
+
+        while len(self._names) > self.maxsize:
+            _, (old_name, _) = self._names.popitem(last=False)
+            cur.execute(f"DEALLOCATE {old_name}")
+            self.evictions += 1
+        return entry
+
+    def __len__(self):
+        return len(self._names)
+
+    def stats(self):
+        return {"size": len(self._names), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def statement_cache(conn):
+    """The StatementCache of a pooled connection, created on first use."""
+    entry = conn._entry
+    if entry.statements is None:
+        entry.statements = StatementCache(int(os.getenv("REPORT_PREPARED_CACHE_SIZE", DEFAULT_STATEMENT_CACHE_SIZE)))
+    return entry.statements
+
+
+def execute(conn, cur, sql, params):
+    """
+    Executes `sql` on `cur` (a cursor of `conn`). When prepared statements
+    are enabled and `conn` comes from the pool, runs it as the connection's
+    prepared statement for that SQL shape; otherwise a plain execute.
+    """
+    if not prepared_enabled() or not isinstance(conn, PooledConnection):
+        cur.execute(sql, params)
+        return
+
+    name, count = statement_cache(conn).prepare(cur, sql)
+    if len(params) != count:
+        raise ValueError(f"statement expects {count} parameters, got {len(params)}")
+    if count:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * count)})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
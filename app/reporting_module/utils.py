@@ -1,12 +1,11 @@
 import io
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Spacer, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.lib.units import inch
 from flask import Response, jsonify
 import csv
 from datetime import datetime
+from .statements import (compile_where, shape_cache, LEDGER_FILTERS, TENDER_STATUS_FILTERS,
+                         TENDER_COUNT_FILTERS, PROJECT_FILTERS)
+from .currency import converted_join, join_params, currency_settings_from_env
+from .serialization import json_response
 
 #My solutions
 
@@ -25,7 +24,7 @@ def export_report_data(data, export_format, filename='report'):
                         or a JSON response for unsupported formats.
     """
     if not export_format:
-        return jsonify(data)
+        return json_response(data)
 
     # Normalize a single dict into a list
     if isinstance(data, dict):
@@ -42,75 +41,72 @@ def export_report_data(data, export_format, filename='report'):
     headers = list(data[0].keys()) if data else []
 
     if export_format == 'csv':
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(data)
-
-        response = Response(output.getvalue(), mimetype='text/csv')
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}.csv'
-        return response
+        return stream_csv_response(data, headers, filename)
 
     elif export_format == 'pdf':
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Add a title
-        title_style = styles['h1']
-        story.append(Paragraph(filename.replace('_', ' ').title(), title_style))
-        story.append(Spacer(1, 0.25 * inch))
-
-        # Prepare data for the table
-        # Add headers as the first row
-        pdf_data = [headers]
-        for row in data:
-            # Ensure all values are strings for PDF table
-            pdf_data.append([str(row.get(header, '')) for header in headers]) # Use .get for safety
-            
-        print(pdf_data)
-
-        coll_width = (letter[0] - 2*inch) / len(headers)
-        colWidths = [coll_width] * len(headers)
-        # Create the table
-        table = Table(pdf_data, colWidths=colWidths)
-
-        # Add style to the table
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('WORDWRAP', (0, 1), (-1, -1), True),
-        ])
-
-        table.setStyle(style)
-        story.append(table)
-
-        try:
-            doc.build(story)
-        except Exception as e:
-            print(f"Error building PDF: {e}")
-            return jsonify({"error": "Could not generate PDF"}), 500
-
-        buffer.seek(0)
-        return Response(buffer, mimetype='application/pdf',
-                        headers={"Content-Disposition": f"attachment;filename={filename}.pdf"})
+        return pdf_response(data, headers, filename)
 
     else:
-        return jsonify(data)
+        return json_response(data)
     
 
+def pdf_response(rows, headers, filename='report'):
+    """
+    Renders rows (a list or any iterable of dicts, consumed lazily) into a
+    multi-page PDF attachment. See pdf.py for the layout and size limits.
+    """
+    from .pdf import render_pdf  # reportlab is only imported once a PDF is requested
+    try:
+        pdf = render_pdf(rows, headers, title=filename.replace('_', ' ').title())
+    except Exception as e:
+        print(f"Error building PDF: {e}")
+        return jsonify({"error": "Could not generate PDF"}), 500
+    finally:
+        close = getattr(rows, "close", None)
+        if close is not None:
+            close()
+
+    return Response(pdf, mimetype='application/pdf',
+                    headers={"Content-Disposition": f"attachment;filename={filename}.pdf"})
+
+
+# Rows buffered before a CSV chunk is handed to the client.
+CSV_CHUNK_ROWS = 500
+
+def iter_csv(rows, headers, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Yields a CSV document in chunks: the header line first, then one chunk
+    per `chunk_rows` rows. `rows` may be any iterable of dictionaries, so a
+    lazily fetched result set is never held in memory as a whole.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=headers)
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue()
+
+def stream_csv_response(rows, headers, filename='report'):
+    """
+    Returns a streamed CSV attachment built from an iterable of dictionaries.
+    """
+    response = Response(iter_csv(rows, headers), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.csv'
+    return response
+
 
 def validate_dates(start_date_str, end_date_str):
     """
@@ -152,29 +148,23 @@ def validate_dates(start_date_str, end_date_str):
 
     return True, None, start_date, end_date
 
+def _tender_status_filters(company_id, start_date=None, end_date=None, project_id=None, status=None):
+            """
+            Returns (where_sql, params) shared by the tender-status queries.
+            """
+            return compile_where(TENDER_STATUS_FILTERS, company_id=company_id, start_date=start_date,
+                                 end_date=end_date, project_id=project_id, status=status)
+
 def build_tender_status_query(company_id, start_date=None, end_date=None, project_id=None, status=None):
             """
             Returns (sql, params) for the tender-status report.
             """
-            where = ["t.company_id = %s"]
-            params = [company_id]
-
-            if start_date:
-                where.append("t.start_date >= %s")
-                params.append(start_date)
-            if end_date:
-                where.append("t.end_date <= %s")
-                params.append(end_date)
-            if project_id:
-                where.append("t.project_id = %s")
-                params.append(project_id)
-            if status:
-                where.append("t.status = %s")
-                params.append(status)
-
-            where_sql = " AND ".join(where)
-
-            sql = f"""
+            where_sql, params = _tender_status_filters(company_id, start_date, end_date, project_id, status)
+            return _tender_status_sql(where_sql), params
+
+@shape_cache
+def _tender_status_sql(where_sql):
+            return f"""
                 SELECT
                     t.id AS tender_id,
                     t.status,
@@ -189,4 +179,139 @@ def build_tender_status_query(company_id, start_date=None, end_date=None, projec
                 WHERE {where_sql}
                 ORDER BY t.start_date DESC
             """
-            return sql, params
\ No newline at end of file
+
+def build_tender_projects_query(company_id, start_date=None, end_date=None, project_id=None, status=None):
+            """
+            Returns (sql, params) listing the distinct projects of the tenders
+            matched by build_tender_status_query with the same filters.
+            """
+            where_sql, params = _tender_status_filters(company_id, start_date, end_date, project_id, status)
+            return _tender_projects_sql(where_sql), params
+
+@shape_cache
+def _tender_projects_sql(where_sql):
+            return f"""
+                SELECT DISTINCT p.id AS project_id
+                FROM tenders t
+                JOIN projects p 
+                    ON p.id = t.project_id AND p.company_id = t.company_id
+                WHERE {where_sql}
+            """
+
+# Ledger tables summed per project, keyed by the label used in the result rows.
+PROJECT_TOTAL_SOURCES = (
+    ("income", "income_entries"),
+    ("general", "general_expenses"),
+    ("payroll", "payroll_entries"),
+)
+
+def build_project_totals_query(company_id, start_date=None, end_date=None, project_id=None, project_ids=None):
+    """
+    Returns (sql, params) computing per-project totals of every ledger table
+    in one statement. Each result row has `source` (a PROJECT_TOTAL_SOURCES
+    label), `project_id` and `total`.
+
+    Args:
+        company_id (str): Company the ledger rows must belong to.
+        start_date (str): Optional inclusive lower bound on `date`.
+        end_date (str): Optional inclusive upper bound on `date`.
+        project_id (str): Optional single project filter.
+        project_ids (list): Optional list of projects to restrict the totals to.
+    """
+    where_sql, params = compile_where(
+        LEDGER_FILTERS, company_id=company_id, project_id=project_id, start_date=start_date,
+        end_date=end_date, project_ids=None if project_ids is None else list(project_ids)
+    )
+    return _project_totals_sql(where_sql), params * len(PROJECT_TOTAL_SOURCES)
+
+@shape_cache
+def _project_totals_sql(where_sql):
+    selects = [
+        f"SELECT '{label}' AS source, project_id, COALESCE(SUM(amount), 0) AS total "
+        f"FROM {table} WHERE {where_sql} GROUP BY project_id"
+        for label, table in PROJECT_TOTAL_SOURCES
+    ]
+    return " UNION ALL ".join(selects)
+
+def collect_project_totals(rows):
+    """
+    Folds rows produced by build_project_totals_query into
+    {project_id: {"income": float, "general": float, "payroll": float}}.
+    """
+    totals = {}
+    for row in rows:
+        project_totals = totals.setdefault(
+            row["project_id"], {label: 0.0 for label, _ in PROJECT_TOTAL_SOURCES}
+        )
+        project_totals[row["source"]] = float(row["total"])
+    return totals
+
+def overall_summary_parts(company_id, start_date=None, end_date=None, project_id=None, status=None,
+                          currency=None):
+    """
+    Returns the independent pieces of the overall summary as a list of
+    (column, sql_expression, params). Each expression is a parenthesised
+    scalar sub-select yielding the value of `column`; `tender_counts` is a
+    JSON array of {"status", "count"} ordered by status.
+
+    Args:
+        company_id (str): Company the rows must belong to.
+        start_date (str): Optional inclusive lower bound on ledger `date` and tender `start_date`.
+        end_date (str): Optional inclusive upper bound on ledger `date` and tender `end_date`.
+        project_id (str): Optional single project filter.
+        status (str): Optional tender status filter.
+        currency (str): Optional target currency; ledger sums are converted
+            into it with the synced rates. Entries without a rate cannot be
+            added to the sums; an extra `missing_rates` part lists their
+            currencies (a sorted JSON array), like the ledger summaries do.
+    """
+    ledger_sql, lparams = compile_where(LEDGER_FILTERS, company_id=company_id, project_id=project_id,
+                                        start_date=start_date, end_date=end_date)
+    tender_sql, tparams = compile_where(TENDER_COUNT_FILTERS, company_id=company_id, project_id=project_id,
+                                        status=status, start_date=start_date, end_date=end_date)
+    project_sql, pparams = compile_where(PROJECT_FILTERS, company_id=company_id, project_id=project_id)
+
+    missing = []
+    if currency:
+        amount, join_sql, lparams = "e.amount * r.rate", f" e {converted_join('e')}", join_params(currency) + lparams
+        settings = currency_settings_from_env()
+        unconverted = " UNION ".join(
+            f"SELECT COALESCE(e.{settings['column']}, %s) AS currency FROM {table}{join_sql} "
+            f"WHERE {ledger_sql} AND r.rate IS NULL"
+            for table in ("income_entries", "general_expenses", "payroll_entries")
+        )
+        missing = [("missing_rates",
+                    f"(SELECT COALESCE(json_agg(m.currency ORDER BY m.currency), '[]'::json) FROM ({unconverted}) m)",
+                    ([settings["ledger_currency"]] + lparams) * 3)]
+    else:
+        amount, join_sql = "amount", ""
+
+    return [
+        ("total_income",
+         f"(SELECT COALESCE(SUM({amount}),0) FROM income_entries{join_sql} WHERE {ledger_sql})", lparams),
+        ("total_general_expenses",
+         f"(SELECT COALESCE(SUM({amount}),0) FROM general_expenses{join_sql} WHERE {ledger_sql})", lparams),
+        ("total_payroll_expenses",
+         f"(SELECT COALESCE(SUM({amount}),0) FROM payroll_entries{join_sql} WHERE {ledger_sql})", lparams),
+        ("tender_counts",
+         "(SELECT COALESCE(json_agg(json_build_object('status', s.status, 'count', s.count) ORDER BY s.status), '[]'::json)"
+         f" FROM (SELECT t.status, COUNT(*) AS count FROM tenders t WHERE {tender_sql} GROUP BY t.status) s)", tparams),
+        ("project_count",
+         f"(SELECT COUNT(*) FROM projects WHERE {project_sql})", pparams),
+    ] + missing
+
+def build_overall_summary_query(company_id, start_date=None, end_date=None, project_id=None, status=None,
+                                currency=None):
+    """
+    Returns (sql, params) computing the whole overall summary in one
+    statement: one row with `total_income`, `total_general_expenses`,
+    `total_payroll_expenses`, `tender_counts` and `project_count`
+    (see overall_summary_parts).
+    """
+    parts = overall_summary_parts(company_id, start_date, end_date, project_id, status, currency)
+    return _overall_summary_sql(tuple((column, expr) for column, expr, _ in parts)), \
+        [p for _, _, params in parts for p in params]
+
+@shape_cache
+def _overall_summary_sql(columns):
+    return "SELECT " + ", ".join(f"{expr} AS {column}" for column, expr in columns)
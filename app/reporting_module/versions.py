@@ -0,0 +1,168 @@
+"""
+Per-company data versions and the report ETags derived from them.
+
+Statement-level triggers on the ledger, tender and project tables bump a
+counter in `report_data_versions` for every company a statement touched,
+so "has anything this company's reports read changed?" is a single primary
+key lookup. A report's ETag hashes that counter with the normalized
+filters (the report cache key) and the requested representation; a client
+sending it back in If-None-Match gets a 304 before any aggregation runs.
+
+Writers touching the same company queue briefly on its counter row until
+they commit. Enable with REPORT_ETAGS=1 once the triggers are installed:
+
+    cd app && python -m reporting_module.versions
+"""
+import argparse
+import hashlib
+import json
+import os
+
+VERSION_TABLE = "report_data_versions"
+VERSION_FUNCTION = "report_bump_data_version"
+
+# Tables the reports read; a change to any of them changes the version.
+VERSIONED_TABLES = ("income_entries", "general_expenses", "payroll_entries", "tenders", "projects")
+
+# Query arguments that change the response body but not the data, and so
+# are part of the ETag without being part of the cache key.
+ETAG_REPRESENTATION_ARGS = ("export", "format")
+
+_BUMP = f"""
+        INSERT INTO {VERSION_TABLE} AS v (company_id, version)
+        SELECT DISTINCT company_id::text, 1 FROM {{rows}} WHERE company_id IS NOT NULL
+        ON CONFLICT (company_id) DO UPDATE SET version = v.version + 1, changed_at = now();
+"""
+
+VERSION_DDL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+        company_id TEXT PRIMARY KEY,
+        version BIGINT NOT NULL,
+        changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION {VERSION_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            {_BUMP.format(rows="new_rows")}
+        ELSIF TG_OP = 'DELETE' THEN
+            {_BUMP.format(rows="old_rows")}
+        ELSIF TG_OP = 'UPDATE' THEN
+            {_BUMP.format(rows="(SELECT company_id FROM old_rows UNION SELECT company_id FROM new_rows) c")}
+        ELSE
+            UPDATE {VERSION_TABLE} SET version = version + 1, changed_at = now();
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+)
+
+# Transition tables allow one event per trigger.
+_TRIGGER_EVENTS = (
+    ("ins", "INSERT", "REFERENCING NEW TABLE AS new_rows"),
+    ("upd", "UPDATE", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("del", "DELETE", "REFERENCING OLD TABLE AS old_rows"),
+    ("trunc", "TRUNCATE", ""),
+)
+
+
+def etags_enabled():
+    """Report responses carry ETags only when REPORT_ETAGS=1."""
+    return os.getenv("REPORT_ETAGS", "0") == "1"
+
+
+def trigger_ddl(table, function=VERSION_FUNCTION, prefix="report_version"):
+    """
+    Statements (re)creating statement-level INSERT, UPDATE, DELETE and
+    TRUNCATE triggers of `table` calling `function`, which sees the changed
+    rows as `old_rows`/`new_rows`. Triggers are named `<table>_<prefix>_<event>`.
+    """
+    statements = []
+    for suffix, event, referencing in _TRIGGER_EVENTS:
+        name = f"{table}_{prefix}_{suffix}"
+        statements.append(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        statements.append(
+            f"CREATE TRIGGER {name} AFTER {event} ON {table} {referencing} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+    return statements
+
+
+def ensure_version_schema(conn, tables=VERSIONED_TABLES):
+    """Creates the version table, the trigger function and the triggers on `tables`."""
+    cur = conn.cursor()
+    try:
+        for ddl in VERSION_DDL:
+            cur.execute(ddl)
+        for table in tables:
+            for ddl in trigger_ddl(table):
+                cur.execute(ddl)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def data_version(conn, company_id):
+    """Current data version of a company; 0 if nothing was written since the triggers exist."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT version FROM {VERSION_TABLE} WHERE company_id = %s", (str(company_id),))
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+    finally:
+        cur.close()
+
+
+def bump_data_versions(cur, companies_sql=None, params=()):
+    """
+    Bumps the data version of the companies `companies_sql` selects (a
+    `company_id` column), or of every company when omitted, in the caller's
+    transaction. For derived data the triggers do not see change, such as
+    the monthly rollups. A no-op while the version table is not installed.
+    """
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", [VERSION_TABLE])
+    if not cur.fetchone()[0]:
+        return
+    if companies_sql is None:
+        cur.execute(f"UPDATE {VERSION_TABLE} SET version = version + 1, changed_at = now()")
+    else:
+        cur.execute(_BUMP.format(rows=f"({companies_sql}) c"), list(params))
+
+
+def report_etag(cache_key, version, args, extra=None):
+    """
+    Opaque ETag value of a report response.
+
+    Args:
+        cache_key (tuple): make_cache_key() of the request: company, report
+            and normalized filters.
+        version (int): The company's data version.
+        args (Mapping): Request query arguments, for ETAG_REPRESENTATION_ARGS.
+        extra: Anything else the response depends on (e.g. exchange rates),
+            JSON-serializable.
+
+    Returns:
+        str: The unquoted tag.
+    """
+    representation = [(name, str(args.get(name) or "").strip()) for name in ETAG_REPRESENTATION_ARGS]
+    payload = json.dumps([cache_key, version, representation, extra], separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Install the data-version triggers report ETags rely on.")
+    parser.parse_args()
+
+    from .api import get_db_postgres_connection
+
+    conn = get_db_postgres_connection()
+    if isinstance(conn, str):
+        raise SystemExit(conn)
+    try:
+        ensure_version_schema(conn)
+        print(f"Version triggers installed on {', '.join(VERSIONED_TABLES)}")
+    finally:
+        conn.close()
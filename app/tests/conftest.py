@@ -0,0 +1,15 @@
+import os
+
+import pytest
+from reporting_module.cache import report_cache
+
+# Requests must not sync rates or check the schema against a real database
+os.environ.setdefault("REPORT_START_SERVICES", "0")
+
+
+@pytest.fixture(autouse=True)
+def clear_report_cache():
+    """Report results are cached per company and filters; isolate every test."""
+    report_cache.clear()
+    yield
+    report_cache.clear()
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+import app as app_module
+from reporting_module.ai_cache import ResponseCache, normalize_prompt, prompt_key
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Local stand-in for genai.GenerativeModel that records every call."""
+
+    def __init__(self, delay=0, fail=False):
+        self.prompts = []
+        self.delay = delay
+        self.fail = fail
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return StubResponse(f"  summary #{len(self.prompts)}  ")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    model = StubModel()
+    monkeypatch.setattr(app_module, "model", model)
+    monkeypatch.setattr(app_module, "ai_cache", ResponseCache(path=str(tmp_path / "ai.sqlite3"), ttl=3600))
+    return model
+
+
+def test_prompt_normalization_and_keys():
+    assert normalize_prompt("  Summarize:\r\nIncome 100   \r\n\n") == "Summarize:\nIncome 100"
+    assert prompt_key("gemini-pro", "Summarize \n") == prompt_key("gemini-pro", "Summarize")
+    assert prompt_key("gemini-pro", "Summarize") != prompt_key("gemini-1.5", "Summarize")
+    assert prompt_key("gemini-pro", "Summarize A") != prompt_key("gemini-pro", "Summarize B")
+
+
+def test_identical_prompts_are_answered_from_the_cache(stub):
+    first = app_module.gemini_request("Summarize the March report")
+    second = app_module.gemini_request("Summarize the March report  \n")
+
+    assert first == second == "summary #1"
+    assert len(stub.prompts) == 1
+    stats = app_module.ai_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_bypass_flag_always_calls_the_model(stub):
+    app_module.gemini_request("Summarize")
+    assert app_module.gemini_request("Summarize", bypass_cache=True) == "summary #2"
+    assert len(stub.prompts) == 2
+    assert app_module.ai_cache.stats()["bypassed"] == 1
+
+
+def test_errors_are_not_cached(stub):
+    stub.fail = True
+    assert app_module.gemini_request("Summarize") == "There was an error while processing your request."
+
+    stub.fail = False
+    assert app_module.gemini_request("Summarize") == "summary #2"
+
+
+def test_responses_expire_and_persist(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "ai.sqlite3")
+    model = StubModel()
+    generate = lambda prompt: model.generate_content(prompt).text.strip()
+
+    ResponseCache(path=path, ttl=100, timer=clock).generate("m", "p", generate)
+    restarted = ResponseCache(path=path, ttl=100, timer=clock)
+    assert restarted.generate("m", "p", generate) == "summary #1"
+
+    clock.now += 101
+    assert restarted.generate("m", "p", generate) == "summary #2"
+
+
+def test_size_bound_evicts(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "ai.sqlite3"), ttl=100, maxsize=2)
+    for prompt in ("a", "b", "c"):
+        cache.generate("m", prompt, str.upper)
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_concurrent_identical_prompts_share_one_call(tmp_path):
+    model = StubModel(delay=0.2)
+    cache = ResponseCache(path=str(tmp_path / "ai.sqlite3"), ttl=100)
+    generate = lambda prompt: model.generate_content(prompt).text.strip()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.generate("m", "p", generate)))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["summary #1"] * 4
+    assert len(model.prompts) == 1
+
+
+def test_disabled_cache_never_stores(tmp_path):
+    model = StubModel()
+    cache = ResponseCache(path=str(tmp_path / "ai.sqlite3"), enabled=False)
+    generate = lambda prompt: model.generate_content(prompt).text.strip()
+
+    cache.generate("m", "p", generate)
+    cache.generate("m", "p", generate)
+    assert len(model.prompts) == 2
+    assert not (tmp_path / "ai.sqlite3").exists()
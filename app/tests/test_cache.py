@@ -0,0 +1,302 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from app import app
+from reporting_module.cache import ReportCache, make_cache_key, report_cache, _storage_key
+from reporting_module.cache_backends import MemoryBackend, SqliteBackend, RedisBackend, backend_from_env
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_make_cache_key_normalizes_filters():
+    a = make_cache_key("1", "income_summary", {"start_date": " 2024-01-01 ", "status": "", "export": "csv"})
+    b = make_cache_key(1, "income_summary", {"start_date": "2024-01-01"})
+    assert a == b == ("1", "income_summary", (("start_date", "2024-01-01"),))
+
+
+def test_make_cache_key_orders_filters_canonically():
+    a = make_cache_key("1", "overall_summary", {"status": "Open", "project_id": "7"})
+    b = make_cache_key("1", "overall_summary", {"project_id": "7", "status": "Open"})
+    assert a == b
+    assert a != make_cache_key("2", "overall_summary", {"project_id": "7", "status": "Open"})
+
+
+def test_report_cache_counts_hits_and_misses():
+    cache = ReportCache(maxsize=4)
+    key = make_cache_key("1", "income_summary", {})
+    compute = MagicMock(return_value={"total_income": 1.0})
+
+    assert cache.get_or_compute(key, compute) == {"total_income": 1.0}
+    assert cache.get_or_compute(key, compute) == {"total_income": 1.0}
+
+    compute.assert_called_once()
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_report_cache_applies_per_endpoint_ttl():
+    timer = FakeTimer()
+    cache = ReportCache(maxsize=4, ttls={"fast": 10, "slow": 100}, timer=timer)
+    fast = ("1", "fast", ())
+    slow = ("1", "slow", ())
+    cache.set(fast, "f")
+    cache.set(slow, "s")
+
+    timer.now = 50
+    assert cache.get(fast) is None
+    assert cache.get(slow) == "s"
+    assert cache.stats()["expirations"] == 1
+
+
+def test_report_cache_evicts_least_recently_used():
+    cache = ReportCache(maxsize=2)
+    keys = [("1", "income_summary", (("project_id", str(i)),)) for i in range(3)]
+    cache.set(keys[0], 0)
+    cache.set(keys[1], 1)
+    cache.get(keys[0])  # keys[1] is now least recently used
+    cache.set(keys[2], 2)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == 0
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_report_cache_does_not_store_failures():
+    cache = ReportCache(maxsize=2)
+    key = ("1", "income_summary", ())
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute(key, MagicMock(side_effect=RuntimeError("db down")))
+    assert cache.get_or_compute(key, lambda: "ok") == "ok"
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_income_summary_served_from_cache(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchone.return_value = {"total_income": 100}
+    mock_cursor.fetchall.return_value = [{"month": "2025-01", "amount": 100}]
+
+    first = client.get("/api/reports/income-summary?start_date=2025-01-01")
+    second = client.get("/api/reports/income-summary?start_date=2025-01-01&export=")
+
+    assert first.get_json() == second.get_json()
+    mock_db_conn.assert_called_once()
+
+    # A different filter is a different entry
+    client.get("/api/reports/income-summary?start_date=2025-02-01")
+    assert mock_db_conn.call_count == 2
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_cache_is_scoped_per_company(mock_db_conn, mock_user_context, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchone.return_value = {"total_expense": 5}
+    mock_cursor.fetchall.return_value = []
+
+    for company_id in ("1", "2"):
+        mock_user_context.return_value = {"role": "Admin", "company_id": company_id}
+        assert client.get("/api/reports/expense-summary").status_code == 200
+
+    assert mock_db_conn.call_count == 2
+
+
+@patch('reporting_module.api.get_user_context')
+def test_cache_stats_route(mock_user_context, client):
+    mock_user_context.return_value = {"role": "Admin", "company_id": "1"}
+    report_cache.set(("1", "income_summary", ()), {"total_income": 1.0})
+    report_cache.get(("1", "income_summary", ()))
+
+    response = client.get("/api/reports/cache-stats")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["size"] == 1
+    assert data["hits"] == 1
+
+    mock_user_context.return_value = {"role": "HR", "company_id": "1"}
+    assert client.get("/api/reports/cache-stats").status_code == 403
+
+
+def test_report_cache_compresses_large_values():
+    backend = MemoryBackend(maxsize=4)
+    cache = ReportCache(backend=backend)
+    key = ("1", "income_summary", ())
+    value = {"monthly_trend": [{"month": "2025-01", "amount": 1.0}] * 200}
+    cache.set(key, value)
+
+    assert backend.get(_storage_key(key))[:1] == b"z"
+    assert cache.get(key) == value
+
+
+def test_sqlite_backend_is_shared_between_cache_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a = ReportCache(backend=SqliteBackend(path))
+    worker_b = ReportCache(backend=SqliteBackend(path))
+    key = ("1", "overall_summary", ())
+    compute = MagicMock(return_value={"total_income": 10.0})
+
+    assert worker_a.get_or_compute(key, compute) == {"total_income": 10.0}
+    assert worker_b.get_or_compute(key, compute) == {"total_income": 10.0}
+    compute.assert_called_once()
+    assert worker_b.stats()["backend"] == "sqlite"
+    assert worker_b.stats()["size"] == 1
+
+
+def test_sqlite_backend_evicts_soonest_to_expire(tmp_path):
+    backend = SqliteBackend(str(tmp_path / "cache.sqlite3"), maxsize=2)
+    backend.set("a", b"1", 10)
+    backend.set("b", b"2", 100)
+    backend.set("c", b"3", 100)
+
+    assert backend.get("a") is None
+    assert backend.get("b") == b"2"
+    assert backend.stats()["evictions"] == 1
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda tmp_path: MemoryBackend(),
+    lambda tmp_path: SqliteBackend(str(tmp_path / "locks.sqlite3")),
+])
+def test_backend_lock_is_exclusive_until_released_or_expired(make_backend, tmp_path):
+    backend = make_backend(tmp_path)
+    token = backend.acquire_lock("k", 30)
+    assert token is not None
+    assert backend.acquire_lock("k", 30) is None
+
+    backend.release_lock("k", "not-the-holder")
+    assert backend.acquire_lock("k", 30) is None
+
+    backend.release_lock("k", token)
+    assert backend.acquire_lock("k", 0) is not None
+    assert backend.acquire_lock("k", 30) is not None  # zero-ttl lock already expired
+
+
+def test_stale_value_served_while_another_worker_recomputes():
+    timer = FakeTimer()
+    cache = ReportCache(ttls={"income_summary": 10}, timer=timer)
+    key = ("1", "income_summary", ())
+    cache.set(key, "old")
+    timer.now = 15  # past the TTL, within the stale window
+
+    token = cache.backend.acquire_lock(_storage_key(key), 30)  # another worker is recomputing
+    compute = MagicMock(return_value="new")
+    assert cache.get_or_compute(key, compute) == "old"
+    compute.assert_not_called()
+    assert cache.stats()["stale_hits"] == 1
+
+    cache.backend.release_lock(_storage_key(key), token)
+    assert cache.get_or_compute(key, compute) == "new"
+    compute.assert_called_once()
+
+
+def test_cold_miss_waits_for_lock_holder():
+    cache = ReportCache(ttls={"income_summary": 10}, lock_wait=2, poll_interval=0.01)
+    key = ("1", "income_summary", ())
+    token = cache.backend.acquire_lock(_storage_key(key), 30)
+
+    def holder():
+        time.sleep(0.05)
+        cache.set(key, "computed elsewhere")
+        cache.backend.release_lock(_storage_key(key), token)
+
+    t = threading.Thread(target=holder)
+    t.start()
+    compute = MagicMock(return_value="duplicate")
+    assert cache.get_or_compute(key, compute) == "computed elsewhere"
+    t.join()
+
+    compute.assert_not_called()
+    assert cache.stats()["waits"] == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = ReportCache(lock_wait=2, poll_interval=0.01)
+    key = ("1", "overall_summary", ())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"total_income": 1.0}
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=(key, compute)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [k for k in self.data if k.startswith(match.rstrip("*"))]
+
+    def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+
+
+def test_redis_backend_round_trip_and_lock():
+    client = FakeRedis()
+    cache = ReportCache(backend=RedisBackend(client=client))
+    key = ("1", "expense_summary", ())
+
+    assert cache.get_or_compute(key, lambda: {"total_expense": 2.0}) == {"total_expense": 2.0}
+    assert cache.get(key) == {"total_expense": 2.0}
+    assert all(k.startswith("report-cache:") for k in client.data)
+    assert not any(":lock:" in k for k in client.data)  # lock released
+
+    cache.clear()
+    assert client.data == {}
+
+
+def test_backend_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPORT_CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("REPORT_CACHE_PATH", str(tmp_path / "env.sqlite3"))
+    assert isinstance(backend_from_env(), SqliteBackend)
+
+    monkeypatch.setenv("REPORT_CACHE_BACKEND", "bogus")
+    with pytest.raises(ValueError):
+        backend_from_env()
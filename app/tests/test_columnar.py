@@ -0,0 +1,166 @@
+from datetime import date
+from unittest.mock import patch, MagicMock
+
+import psycopg2.extensions
+import pytest
+from app import app
+from reporting_module.columnar import response_format, transpose
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def mock_db(mock_db_conn, fetchall_side_effect, fetchmany_side_effect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchall.side_effect = fetchall_side_effect
+    mock_cursor.fetchmany.side_effect = fetchmany_side_effect
+    return mock_conn, mock_cursor
+
+
+def named_cursor_factories(mock_conn):
+    return [c.kwargs["cursor_factory"] for c in mock_conn.cursor.call_args_list if "name" in c.kwargs]
+
+
+def test_response_format_and_transpose():
+    assert response_format({}) == "records"
+    assert response_format({"format": " Columnar "}) == "columnar"
+    with pytest.raises(ValueError):
+        response_format({"format": "arrow"})
+
+    assert transpose(iter([(1, "a"), (2, "b")]), 2) == [(1, 2), ("a", "b")]
+    assert transpose(iter(()), 3) == [(), (), ()]
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_tender_status_columnar(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Admin", "company_id": "9"}
+    tenders = [
+        (11, "Open", date(2024, 1, 1), date(2024, 3, 31), 901, "Project S", "Desc S"),
+        (12, "Closed", date(2023, 1, 1), date(2023, 3, 31), 902, "Project T", "Desc T"),
+    ]
+    totals = [
+        {"source": "general", "project_id": 901, "total": 10.0},
+        {"source": "payroll", "project_id": 901, "total": 20.0},
+        {"source": "income", "project_id": 901, "total": 30.0},
+    ]
+    mock_conn, _ = mock_db(mock_db_conn, [[{"project_id": 901}, {"project_id": 902}], totals], [tenders, []])
+
+    response = client.get("/api/reports/tender-status?format=columnar")
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "columns": ["tender_id", "status", "start_date", "end_date", "project_id", "project_name",
+                    "project_description", "general_expenses_incurred", "payroll_expenses_incurred",
+                    "total_income"],
+        "values": [
+            [11, 12], ["Open", "Closed"], ["2024-01-01", "2023-01-01"], ["2024-03-31", "2023-03-31"],
+            [901, 902], ["Project S", "Project T"], ["Desc S", "Desc T"],
+            [10.0, 0.0], [20.0, 0.0], [30.0, 0.0],
+        ],
+    }
+    # Tenders are read as plain tuples, not DictRows
+    assert named_cursor_factories(mock_conn) == [psycopg2.extensions.cursor]
+    mock_conn.close.assert_called_once()
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_tender_status_columnar_without_tenders(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Admin", "company_id": "9"}
+    mock_conn, _ = mock_db(mock_db_conn, [[]], [[]])
+
+    data = client.get("/api/reports/tender-status?format=columnar").get_json()
+
+    assert len(data["columns"]) == 10
+    assert data["values"] == [[]] * 10
+    mock_conn.close.assert_called_once()
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_project_finance_columnar(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    totals = [
+        {"source": "income", "project_id": 1, "total": 500.0},
+        {"source": "general", "project_id": 1, "total": 120.0},
+        {"source": "payroll", "project_id": 1, "total": 80.0},
+    ]
+    mock_conn, _ = mock_db(mock_db_conn, [totals], [[(1, "Alpha"), (2, "Beta")], []])
+
+    response = client.get("/api/reports/project-finance?format=columnar")
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "columns": ["project_id", "project_name", "income", "expenses", "net"],
+        "values": [[1, 2], ["Alpha", "Beta"], [500.0, 0.0], [200.0, 0.0], [300.0, 0.0]],
+    }
+    assert named_cursor_factories(mock_conn) == [psycopg2.extensions.cursor]
+    mock_conn.close.assert_called_once()
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_project_finance_columnar_without_projects(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    _, mock_cursor = mock_db(mock_db_conn, [], [[]])
+
+    data = client.get("/api/reports/project-finance?format=columnar").get_json()
+
+    assert data["values"] == [[]] * 5
+    # Only the projects query runs: no totals without projects
+    assert mock_cursor.execute.call_count == 1
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_ledger_summary_trend_is_columnar(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    _, mock_cursor = mock_db(mock_db_conn, None, None)
+    mock_cursor.fetchone.return_value = {"total_income": 300}
+    mock_cursor.fetchall.side_effect = None
+    mock_cursor.fetchall.return_value = [{"month": "2025-01", "amount": 100}, {"month": "2025-02", "amount": 200}]
+
+    records = client.get("/api/reports/income-summary").get_json()
+    data = client.get("/api/reports/income-summary?format=columnar").get_json()
+
+    assert data == {
+        "total_income": 300.0,
+        "monthly_trend": {"columns": ["month", "amount"], "values": [["2025-01", "2025-02"], [100.0, 200.0]]},
+    }
+    # Both formats come from one cached result
+    assert records["monthly_trend"] == [{"month": "2025-01", "amount": 100.0}, {"month": "2025-02", "amount": 200.0}]
+    assert mock_cursor.execute.call_count == 2
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_overall_summary_tender_counts_are_columnar(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    _, mock_cursor = mock_db(mock_db_conn, None, None)
+    mock_cursor.fetchone.return_value = {
+        "total_income": 10, "total_general_expenses": 5, "total_payroll_expenses": 2, "project_count": 1,
+        "tender_counts": [{"status": "Closed", "count": 2}, {"status": "Open", "count": 3}],
+    }
+
+    data = client.get("/api/reports/overall-summary?format=columnar").get_json()
+
+    assert data["tender_counts"] == {"columns": ["status", "count"], "values": [["Closed", "Open"], [2, 3]]}
+    assert data["project_count"] == 1
+
+
+@patch('reporting_module.api.get_user_context')
+def test_unknown_format_is_rejected(mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+
+    for report in ("project-finance", "tender-status", "income-summary", "expense-summary", "overall-summary"):
+        response = client.get(f"/api/reports/{report}?format=xml")
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "format must be 'records' or 'columnar'"
@@ -0,0 +1,144 @@
+import gzip
+import zlib
+from datetime import date
+from unittest.mock import patch, MagicMock
+
+import pytest
+from werkzeug.http import parse_accept_header
+
+from app import app
+from reporting_module import compression
+from reporting_module.cache import report_cache
+from reporting_module.compression import negotiate, compress_stream
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def accept(header):
+    return parse_accept_header(header)
+
+
+def mock_ledger_db(mock_db_conn, months=120):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchone.return_value = {"total_income": 15000}
+    mock_cursor.fetchall.return_value = [
+        {"month": f"{2000 + i // 12}-{i % 12 + 1:02d}", "amount": 1000 + i} for i in range(months)
+    ]
+    return mock_conn
+
+
+def test_negotiation_follows_quality_then_server_preference(monkeypatch):
+    monkeypatch.setattr(compression, "_available", ("zstd", "br", "gzip"))
+    assert negotiate(accept("gzip, br, zstd")) == "zstd"
+    assert negotiate(accept("gzip, br;q=0.5")) == "gzip"
+    assert negotiate(accept("*")) == "zstd"
+    assert negotiate(accept("br;q=0, gzip;q=0.1")) == "gzip"
+    assert negotiate(accept("identity")) is None
+    assert negotiate(accept("")) is None
+    assert negotiate(accept("gzip, br"), encodings=["br"]) == "br"
+
+    monkeypatch.setattr(compression, "_available", ("gzip",))
+    assert negotiate(accept("br, gzip;q=0.5")) == "gzip"
+
+
+def test_stream_is_flushed_per_chunk_and_closes_its_source():
+    closed = []
+
+    def chunks():
+        try:
+            yield "a,b\n"
+            yield b"1,2\n"
+        finally:
+            closed.append(True)
+
+    stream = compress_stream(chunks(), "gzip")
+    first = next(stream)
+    # Each chunk is flushed, so what arrived so far already decompresses
+    assert zlib.decompressobj(31).decompress(first) == b"a,b\n"
+    assert gzip.decompress(first + b"".join(stream)) == b"a,b\n1,2\n"
+    assert closed == [True]
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_json_report_is_gzipped_and_cached_compressed(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    mock_ledger_db(mock_db_conn)
+
+    plain = client.get("/api/reports/income-summary")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    with patch('reporting_module.compression.compress', wraps=compression.compress) as compress:
+        first = client.get("/api/reports/income-summary", headers={"Accept-Encoding": "gzip, deflate"})
+        second = client.get("/api/reports/income-summary", headers={"Accept-Encoding": "gzip"})
+
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert len(first.data) < len(plain.data)
+    assert gzip.decompress(first.data) == plain.data
+    assert second.data == first.data
+    assert compress.call_count == 1
+    assert report_cache.stats()["representation_hits"] == 1
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_small_bodies_and_errors_are_sent_as_is(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    mock_ledger_db(mock_db_conn, months=1)
+
+    response = client.get("/api/reports/income-summary", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+    mock_user_context.return_value = {"role": "Intern", "company_id": "1"}
+    response = client.get("/api/reports/income-summary", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 403
+    assert "Content-Encoding" not in response.headers
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_streamed_csv_is_compressed(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Admin", "company_id": "9"}
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchall.side_effect = [[{'project_id': 901}], []]
+    mock_cursor.fetchmany.side_effect = [[
+        {'tender_id': i, 'status': 'Open', 'start_date': date(2024, 1, 1), 'end_date': date(2024, 3, 31),
+         'project_id': 901, 'project_name': 'Project S', 'project_description': 'Desc S'}
+        for i in range(1200)
+    ], []]
+
+    response = client.get("/api/reports/tender-status?export=csv", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    lines = gzip.decompress(response.get_data()).decode().splitlines()
+    assert lines[0].startswith("tender_id,status")
+    assert len(lines) == 1201
+    mock_conn.close.assert_called_once()
+
+
+def test_compression_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("REPORT_COMPRESSION", "0")
+    response = app.response_class("x" * 5000, mimetype="text/csv")
+    compression.compress_response(response, accept("gzip"))
+    assert "Content-Encoding" not in response.headers
+
+
+def test_pdf_is_sent_as_is():
+    response = app.response_class(b"%PDF-1.4" + b"x" * 5000, mimetype="application/pdf")
+    compression.compress_response(response, accept("gzip"))
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,55 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from reporting_module.conversion import convert_batch
+
+RATES = {"EUR": 4.0, "USD": 3.5, "PLN": 1.0}
+
+
+def fake_store():
+    store = MagicMock()
+    store.get_rate.side_effect = lambda currency, to_currency: RATES[currency] if currency != to_currency else 1.0
+    return store
+
+
+def test_convert_batch_converts_and_subtotals():
+    store = fake_store()
+    result = convert_batch(
+        [Decimal("10.50"), 20, "5", 100.0, 2],
+        ["EUR", "usd", "EUR", "PLN", "USD"],
+        store=store,
+    )
+
+    np.testing.assert_allclose(result.amounts, [42.0, 70.0, 20.0, 100.0, 7.0])
+    assert result.subtotals == {"EUR": pytest.approx(62.0), "PLN": pytest.approx(100.0), "USD": pytest.approx(77.0)}
+    assert result.total == pytest.approx(239.0)
+
+
+def test_convert_batch_looks_each_currency_up_once():
+    store = fake_store()
+    convert_batch([1] * 1000, ["EUR", "USD"] * 500, store=store)
+
+    assert sorted(call.args[0] for call in store.get_rate.call_args_list) == ["EUR", "USD"]
+
+
+def test_convert_batch_matches_scalar_conversion():
+    store = fake_store()
+    amounts = [12.34, 56.78, 90.12]
+    currencies = ["USD", "EUR", "PLN"]
+    result = convert_batch(amounts, currencies, store=store)
+
+    expected = [float(a) * store.get_rate(c, "PLN") for a, c in zip(amounts, currencies)]
+    np.testing.assert_allclose(result.amounts, expected)
+
+
+def test_convert_batch_edge_cases():
+    store = fake_store()
+    empty = convert_batch([], [], store=store)
+    assert empty.amounts.size == 0
+    assert empty.subtotals == {}
+    assert empty.total == 0.0
+
+    with pytest.raises(ValueError):
+        convert_batch([1, 2], ["EUR"], store=store)
@@ -0,0 +1,140 @@
+from unittest.mock import patch, MagicMock
+
+import pytest
+from app import app
+from reporting_module.currency import (rate_matrix, sync_rates, normalize_currency,
+                                       build_converted_summary_queries, RATES_TABLE)
+from reporting_module.rates import RateStore
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def pln_store():
+    store = RateStore(url="http://127.0.0.1:9", path="", ttl=3600)
+    store._loaded = True
+    store._tables["PLN"] = {"fetched_at": store.timer(), "date": "2025-06-02",
+                            "rates": {"EUR": 0.25, "USD": 0.2}}
+    return store
+
+
+def setup_db(mock_db_conn, total_rows, trend_rows):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchall.side_effect = [total_rows, trend_rows]
+    return mock_cursor
+
+
+def test_rate_matrix_holds_every_cross_rate():
+    rows = {(s, t): (rate, as_of) for s, t, rate, as_of in rate_matrix(pln_store())}
+
+    assert len(rows) == 9
+    assert rows[("EUR", "PLN")] == (pytest.approx(4.0), "2025-06-02")
+    assert rows[("PLN", "USD")][0] == pytest.approx(0.2)
+    assert rows[("EUR", "USD")][0] == pytest.approx(0.8)
+    assert rows[("USD", "USD")][0] == pytest.approx(1.0)
+
+
+@patch('reporting_module.currency.psycopg2.extras.execute_values')
+def test_sync_rates_upserts_the_matrix(mock_execute_values):
+    conn = MagicMock()
+    assert sync_rates(conn, pln_store()) == 9
+
+    cur, sql, rows = mock_execute_values.call_args.args
+    assert f"INSERT INTO {RATES_TABLE}" in sql
+    assert "ON CONFLICT (from_currency, to_currency) DO UPDATE" in sql
+    assert len(rows) == 9
+    conn.commit.assert_called_once()
+
+
+def test_normalize_currency():
+    assert normalize_currency(" eur ") == "EUR"
+    assert normalize_currency("") is None
+    assert normalize_currency(None) is None
+    with pytest.raises(ValueError):
+        normalize_currency("EURO")
+    with pytest.raises(ValueError):
+        normalize_currency("E1R")
+
+
+def test_converted_summary_queries_join_rates():
+    total_sql, total_params, trend_sql, trend_params = build_converted_summary_queries(
+        "income_entries", "company_id = %s", ["1"], "EUR")
+
+    assert f"LEFT JOIN {RATES_TABLE} r ON r.from_currency = COALESCE(e.currency, %s) AND r.to_currency = %s" in total_sql
+    assert "SUM(e.amount * r.rate) AS converted" in total_sql
+    assert "GROUP BY 1" in total_sql
+    assert total_params == ["PLN", "PLN", "EUR", "1"]
+    assert "COALESCE(SUM(e.amount * r.rate), 0) AS amount" in trend_sql
+    assert trend_params == ["PLN", "EUR", "1"]
+    assert total_sql.count("%s") == len(total_params)
+    assert trend_sql.count("%s") == len(trend_params)
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_income_summary_in_target_currency(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    mock_cursor = setup_db(
+        mock_db_conn,
+        [{"currency": "EUR", "amount": 100, "converted": 100},
+         {"currency": "PLN", "amount": 400, "converted": 100},
+         {"currency": "XYZ", "amount": 5, "converted": None}],
+        [{"month": "2025-01", "amount": 200}],
+    )
+
+    response = client.get("/api/reports/income-summary?currency=eur&start_date=2025-01-01")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total_income"] == 200.0
+    assert data["currency"] == "EUR"
+    assert data["by_currency"][1] == {"currency": "PLN", "amount": 400.0, "converted": 100.0}
+    assert data["missing_rates"] == ["XYZ"]
+    assert data["monthly_trend"] == [{"month": "2025-01", "amount": 200.0}]
+
+    total_sql, total_params = mock_cursor.execute.call_args_list[0].args
+    assert "FROM income_entries e" in total_sql
+    assert total_params == ["PLN", "PLN", "EUR", "1", "2025-01-01"]
+
+
+@patch('reporting_module.api.get_user_context')
+def test_expense_summary_rejects_invalid_currency(mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+
+    response = client.get("/api/reports/expense-summary?currency=euros")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid currency code: euros"
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_overall_summary_in_target_currency(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Admin", "company_id": "1"}
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchone.return_value = {
+        "total_income": 10, "total_general_expenses": 5, "total_payroll_expenses": 2,
+        "tender_counts": [], "project_count": 1, "missing_rates": ["GBP"],
+    }
+
+    response = client.get("/api/reports/overall-summary?currency=USD")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["currency"] == "USD"
+    # Entries in currencies without a rate are reported, not silently dropped
+    assert data["missing_rates"] == ["GBP"]
+
+    sql, params = mock_cursor.execute.call_args.args
+    assert sql.count(f"LEFT JOIN {RATES_TABLE} r") == 6
+    assert "SUM(e.amount * r.rate)" in sql
+    assert sql.count("r.rate IS NULL") == 3
+    assert params[:3] == ["PLN", "USD", "1"]
+    assert sql.count("%s") == len(params)
@@ -0,0 +1,77 @@
+from unittest.mock import MagicMock
+import psycopg2.extras
+import pytest
+
+from reporting_module.cursors import iter_named_cursor, iter_rows
+
+
+def make_conn(batches):
+    conn = MagicMock()
+    cursor = MagicMock()
+    cursor.fetchmany.side_effect = batches
+    conn.cursor.return_value = cursor
+    return conn, cursor
+
+
+def test_iter_named_cursor_yields_rows_batch_by_batch():
+    conn, cursor = make_conn([[1, 2], [3], []])
+
+    rows = iter_named_cursor(conn, "SELECT x FROM t WHERE a = %s", [7], itersize=2)
+    assert list(rows) == [1, 2, 3]
+
+    kwargs = conn.cursor.call_args.kwargs
+    assert kwargs["name"].startswith("report_")
+    assert kwargs["cursor_factory"] is psycopg2.extras.DictCursor
+    cursor.execute.assert_called_once_with("SELECT x FROM t WHERE a = %s", [7])
+    cursor.fetchmany.assert_called_with(2)
+    assert cursor.itersize == 2
+    cursor.close.assert_called_once()
+    conn.close.assert_not_called()
+
+
+def test_iter_named_cursor_does_not_query_until_iterated():
+    conn, cursor = make_conn([[]])
+    rows = iter_named_cursor(conn, "SELECT 1", [])
+    conn.cursor.assert_not_called()
+    assert list(rows) == []
+
+
+def test_iter_named_cursor_closes_cursor_when_abandoned():
+    conn, cursor = make_conn([[1, 2], [3], []])
+    rows = iter_named_cursor(conn, "SELECT 1", [], itersize=2)
+    assert next(rows) == 1
+    rows.close()
+    cursor.close.assert_called_once()
+
+
+def test_iter_named_cursor_closes_cursor_on_error():
+    conn, cursor = make_conn([])
+    cursor.execute.side_effect = psycopg2.ProgrammingError("boom")
+    with pytest.raises(psycopg2.ProgrammingError):
+        list(iter_named_cursor(conn, "SELECT 1", []))
+    cursor.close.assert_called_once()
+
+
+def test_iter_named_cursor_itersize_from_environment(monkeypatch):
+    monkeypatch.setenv("REPORT_CURSOR_ITERSIZE", "50")
+    conn, cursor = make_conn([[]])
+    list(iter_named_cursor(conn, "SELECT 1", []))
+    cursor.fetchmany.assert_called_once_with(50)
+
+
+def test_iter_rows_peeks_first_row():
+    conn, cursor = make_conn([[{"id": 1}, {"id": 2}], [{"id": 3}], []])
+    first, rows = iter_rows(conn, "SELECT id FROM projects", [], itersize=2)
+    assert first == {"id": 1}
+    # Only the first batch has been read so far
+    assert cursor.fetchmany.call_count == 1
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    cursor.close.assert_called_once()
+
+
+def test_iter_rows_empty_result():
+    conn, cursor = make_conn([[]])
+    first, rows = iter_rows(conn, "SELECT id FROM projects", [])
+    assert first is None
+    assert list(rows) == []
+    cursor.close.assert_called_once()
@@ -94,3 +94,18 @@ def test_expense_summary_internal_error(mock_user_context, client):
     response = client.get("/api/reports/expense-summary")
     assert response.status_code == 500
     assert response.get_json()["error"] == "Internal server error"
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_expense_summary_query_error_returns_connection(mock_db_conn, mock_user_context, client):
+    mock_user_context.return_value = {"role": "Admin", "company_id": "1"}
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.execute.side_effect = Exception("Query failed")
+
+    response = client.get("/api/reports/expense-summary?project_id=5")
+    assert response.status_code == 500
+    mock_cursor.close.assert_called_once()
+    mock_conn.close.assert_called_once()
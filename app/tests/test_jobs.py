@@ -0,0 +1,176 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+
+import pytest
+from app import app
+from reporting_module.jobs import ExportJobManager, JobStore, ExportQueueFull, CompanyExportLimit
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    """Export jobs run on threads in tests; same worker function, no process spawn."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    manager = ExportJobManager(spool_dir=str(tmp_path), max_queue=3, per_company=2, ttl=60, executor=executor)
+    with patch('reporting_module.api.export_jobs', manager):
+        yield manager
+    executor.shutdown(wait=True)
+
+
+def setup_income_db(mock_db_conn):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchone.return_value = {"total_income": 15000}
+    mock_cursor.fetchall.return_value = [{"month": "2025-01", "amount": 15000}]
+    return mock_conn
+
+
+def wait_for(client, job_id, headers, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/reports/exports/{job_id}", headers=headers).get_json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("export job did not finish")
+
+
+HEADERS = {"X-Company-ID": "1", "X-User-Role": "Finance"}
+
+
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_export_job_submit_poll_download(mock_db_conn, client, jobs):
+    setup_income_db(mock_db_conn)
+
+    response = client.post("/api/reports/exports", headers=HEADERS, json={
+        "report": "income-summary", "format": "csv", "filters": {"start_date": "2025-01-01"}
+    })
+    assert response.status_code == 202
+    submitted = response.get_json()
+    assert submitted["status"] == "queued"
+    assert submitted["status_url"] == f"/api/reports/exports/{submitted['job_id']}"
+
+    job = wait_for(client, submitted["job_id"], HEADERS)
+    assert job["status"] == "done"
+    assert job["progress"]["bytes"] > 0
+    assert job["expires_at"] > job["finished_at"]
+
+    download = client.get(job["download_url"], headers=HEADERS)
+    assert download.status_code == 200
+    assert download.headers["Content-Disposition"] == "attachment; filename=income-summary.csv"
+    assert b"total_income" in download.data
+    assert b"15000.0" in download.data
+
+
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_export_job_records_route_error(mock_db_conn, client, jobs):
+    mock_db_conn.side_effect = Exception("database is down")
+
+    submitted = client.post("/api/reports/exports", headers=HEADERS, json={
+        "report": "expense-summary", "format": "pdf"
+    }).get_json()
+
+    job = wait_for(client, submitted["job_id"], HEADERS)
+    assert job["status"] == "failed"
+    assert job["error"] == "Internal server error"
+    assert "download_url" not in job
+    assert client.get(f"/api/reports/exports/{job['job_id']}/download", headers=HEADERS).status_code == 409
+
+
+def test_export_job_is_scoped_to_company(client, jobs):
+    job = jobs.store.create({"job_id": "abc", "company_id": "1", "report": "income-summary", "format": "csv",
+                             "status": "queued", "expires_at": None})
+    other = {"X-Company-ID": "2", "X-User-Role": "Admin"}
+    assert client.get(f"/api/reports/exports/{job['job_id']}", headers=other).status_code == 404
+    assert client.get(f"/api/reports/exports/{job['job_id']}/download", headers=other).status_code == 404
+
+
+def test_export_job_validation(client, jobs):
+    assert client.post("/api/reports/exports", headers={"X-Company-ID": "1", "X-User-Role": "Intern"},
+                       json={"report": "income-summary", "format": "csv"}).status_code == 403
+    assert client.post("/api/reports/exports", headers={"X-User-Role": "Admin"},
+                       json={"report": "income-summary", "format": "csv"}).status_code == 400
+
+    response = client.post("/api/reports/exports", headers=HEADERS, json={"report": "payslips", "format": "csv"})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Unknown report: payslips"
+
+    response = client.post("/api/reports/exports", headers=HEADERS, json={"report": "income-summary", "format": "xlsx"})
+    assert response.status_code == 400
+
+    response = client.post("/api/reports/exports", headers=HEADERS, json={
+        "report": "income-summary", "format": "csv", "filters": {"start_date": "01/01/2025"}
+    })
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid date format. Please use YYYY-MM-DD."
+
+
+def test_export_job_limits_are_shared_across_processes(tmp_path):
+    blocked = MagicMock()  # an executor whose jobs never finish
+    # Two managers on one spool stand in for two web workers
+    first, second = (ExportJobManager(spool_dir=str(tmp_path), max_queue=3, per_company=2, executor=blocked)
+                     for _ in range(2))
+    finance = {"company_id": "1", "role": "Finance"}
+
+    job = first.submit(finance, "income-summary", "csv", {})
+    second.submit(finance, "tender-status", "pdf", {})
+    with pytest.raises(CompanyExportLimit):
+        first.submit(finance, "overall-summary", "csv", {})
+
+    second.submit({"company_id": "2", "role": "Admin"}, "income-summary", "csv", {})
+    with pytest.raises(ExportQueueFull):
+        first.submit({"company_id": "3", "role": "Admin"}, "income-summary", "csv", {})
+    assert first.stats()["active"] == second.stats()["active"] == 3
+
+    # A finished future releases its slot for every worker
+    done = MagicMock()
+    done.cancelled.return_value = False
+    done.exception.return_value = None
+    first._finished(job["job_id"], done)
+    assert second.stats()["active"] == 2
+    second.submit(finance, "overall-summary", "csv", {})
+
+
+def test_slots_of_finished_or_abandoned_jobs_are_reclaimed(tmp_path):
+    store = JobStore(str(tmp_path))
+    for job_id, status, created_at in (("done", "done", 1000.0), ("stuck", "running", 0.0)):
+        store.create({"job_id": job_id, "company_id": "1", "format": "csv", "status": status,
+                      "created_at": created_at})
+        store.claim_slot(job_id, "1", max_queue=5, per_company=5, max_runtime=60, now=created_at)
+
+    store.claim_slot("new", "1", max_queue=5, per_company=1, max_runtime=60, now=1010.0)
+
+    assert os.listdir(store.slots_dir) == ["new"]
+    assert store.load("stuck")["status"] == "failed"
+    assert store.load("stuck")["error"] == "abandoned"
+
+
+def test_status_polls_do_not_sweep_the_spool(client, jobs):
+    jobs.store.create({"job_id": "old", "company_id": "1", "format": "csv", "status": "done", "expires_at": 1.0})
+    with patch.object(jobs.store, "sweep") as sweep:
+        assert client.get("/api/reports/exports/old", headers=HEADERS).status_code == 404
+    sweep.assert_not_called()
+    assert jobs.store.load("old") is None
+
+
+def test_job_store_sweeps_expired_results(tmp_path):
+    store = JobStore(str(tmp_path))
+    for job_id, expires_at in (("old", 100.0), ("new", 300.0), ("running", None)):
+        store.create({"job_id": job_id, "format": "csv", "expires_at": expires_at})
+        (tmp_path / f"{job_id}.csv").write_text("data")
+
+    assert store.sweep(now=200.0) == 1
+    assert store.load("old") is None
+    assert not (tmp_path / "old.csv").exists()
+    assert store.load("new") is not None
+    assert store.load("running") is not None
@@ -0,0 +1,172 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from app import app
+from reporting_module.ai_cache import ResponseCache
+from reporting_module.narratives import NarrativeExecutor, NarrativeQueueFull
+
+
+class FakeModel:
+    """Local stand-in for the model call: blocks until released, honouring the timeout."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, timeout=None):
+        with self._lock:
+            self.calls.append((prompt, timeout))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if not self.release.wait(timeout):
+                raise TimeoutError("model call timed out")
+            return f"narrative for {prompt}"
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "condition not met in time"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def fake():
+    return FakeModel()
+
+
+@pytest.fixture
+def executor(fake, tmp_path):
+    executor = NarrativeExecutor(workers=2, max_pending=3, deadline=5, result_ttl=60,
+                                 cache=ResponseCache(path=str(tmp_path / "ai.sqlite3"), ttl=100))
+    executor.configure("fake-model", fake)
+    yield executor
+    fake.release.set()
+    executor.shutdown()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_submit_returns_immediately_and_poll_gets_the_result(executor, fake):
+    task = executor.submit("Summarize March", company_id=1)
+    assert task["status"] in ("queued", "running")
+
+    fake.release.set()
+    wait_for(lambda: executor.get(task["task_id"], 1)["status"] == "done")
+    assert executor.get(task["task_id"], 1)["result"] == "narrative for Summarize March"
+    assert fake.calls[0][1] <= 5
+
+
+def test_identical_in_flight_prompts_are_coalesced(executor, fake):
+    first = executor.submit("Summarize March", company_id=1)
+    second = executor.submit("Summarize March  \n", company_id=2)
+
+    assert first["task_id"] == second["task_id"]
+    assert executor.stats()["coalesced"] == 1
+    fake.release.set()
+    wait_for(lambda: executor.get(first["task_id"], 2)["status"] == "done")
+    assert len(fake.calls) == 1
+
+
+def test_concurrency_and_pending_caps(executor, fake):
+    for prompt in ("a", "b", "c"):
+        executor.submit(prompt, company_id=1)
+    wait_for(lambda: fake.running == 2)
+
+    with pytest.raises(NarrativeQueueFull):
+        executor.submit("d", company_id=1)
+
+    fake.release.set()
+    wait_for(lambda: executor.stats()["pending"] == 0)
+    assert fake.max_running == 2
+    executor.submit("d", company_id=1)
+
+
+def test_deadline_marks_task_timed_out_and_frees_its_slot(fake, tmp_path):
+    clock = Clock()
+    executor = NarrativeExecutor(workers=1, max_pending=1, deadline=30, timer=clock,
+                                 cache=ResponseCache(path=str(tmp_path / "ai.sqlite3"), ttl=100))
+    executor.configure("fake-model", fake)
+    try:
+        task = executor.submit("slow", company_id=1, deadline=10)
+        clock.now += 11
+
+        view = executor.get(task["task_id"], 1)
+        assert view["status"] == "timed_out"
+        assert view["error"] == "Narrative generation timed out"
+        assert executor.stats()["timed_out"] == 1
+        executor.submit("next", company_id=1)
+    finally:
+        fake.release.set()
+        executor.shutdown()
+
+
+def test_tasks_are_scoped_to_the_submitting_company(executor):
+    task = executor.submit("Summarize March", company_id=1)
+    assert executor.get(task["task_id"], 2) is None
+    assert executor.get("missing", 1) is None
+
+
+def test_invalid_prompts_are_rejected(executor):
+    with pytest.raises(ValueError):
+        executor.submit("   ", company_id=1)
+    with pytest.raises(ValueError):
+        executor.submit("x" * (executor.max_prompt + 1), company_id=1)
+    with pytest.raises(ValueError):
+        NarrativeExecutor(workers=1).submit("Summarize", company_id=1)
+
+
+@patch('reporting_module.api.get_user_context')
+def test_narrative_routes(mock_user_context, executor, fake, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+
+    with patch('reporting_module.api.narratives', executor):
+        response = client.post("/api/reports/narratives", json={"prompt": "Summarize March"})
+        assert response.status_code == 202
+        task = response.get_json()
+        assert task["status_url"] == f"/api/reports/narratives/{task['task_id']}"
+
+        fake.release.set()
+        wait_for(lambda: client.get(task["status_url"]).get_json()["status"] == "done")
+        assert client.get(task["status_url"]).get_json()["result"] == "narrative for Summarize March"
+
+        assert client.post("/api/reports/narratives", json={}).status_code == 400
+
+        mock_user_context.return_value = {"role": "Finance", "company_id": "2"}
+        assert client.get(task["status_url"]).status_code == 404
+
+        mock_user_context.return_value = {"role": "Employee", "company_id": "1"}
+        assert client.post("/api/reports/narratives", json={"prompt": "x"}).status_code == 403
+
+
+@patch('reporting_module.api.get_user_context')
+def test_full_queue_returns_429(mock_user_context, executor, client):
+    mock_user_context.return_value = {"role": "Admin", "company_id": "1"}
+
+    with patch('reporting_module.api.narratives', executor):
+        for prompt in ("a", "b", "c"):
+            assert client.post("/api/reports/narratives", json={"prompt": prompt}).status_code == 202
+        response = client.post("/api/reports/narratives", json={"prompt": "d"})
+        assert response.status_code == 429
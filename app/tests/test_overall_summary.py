@@ -11,19 +11,6 @@ def get_db_postgres_connection():
     """Mocks the function to get a database connection."""
     pass
 
-def assert_query_called(mock_cursor, expected_substr, expected_params):
-    """
-    Verifies that mock_cursor.execute was called with a SQL containing
-    expected_substr and exactly expected_params.
-    """
-    for call_args in mock_cursor.execute.call_args_list:
-        sql, params = call_args[0]
-        if expected_substr in sql and params == expected_params:
-            return
-    pytest.fail(f"Expected SQL containing:\n  {expected_substr}\nwith params {expected_params!r}\n\nActual calls:\n" +
-               "\n".join(f"  {c[0][0]!r}, {c[0][1]!r}" for c in mock_cursor.execute.call_args_list))
-
-
 # --- Pytest Test Suite ---
 
 @pytest.fixture
@@ -50,19 +37,16 @@ def mock_get_user_context_helper(role, company_id):
 def setup_mock_db(mock_cursor, income_data, gen_exp_data, pay_exp_data, tender_counts_data, project_count_data):
     """
     A crucial helper that centralizes the setup of the mock database connection and cursor.
-    It configures side effects for fetchone and fetchall based on expected query order.
+    The report is computed by a single statement returning one row; tender counts
+    arrive as the decoded JSON array.
     """
-
-    fetchone_returns = [
-        {"total_income": income_data},
-        {"total_general_expenses": gen_exp_data},
-        {"total_payroll_expenses": pay_exp_data},
-        {"project_count": project_count_data}
-    ]
-    
-    mock_cursor.fetchone.side_effect = fetchone_returns
-    mock_cursor.fetchall.side_effect = [tender_counts_data]
-    pass
+    mock_cursor.fetchone.return_value = {
+        "total_income": income_data,
+        "total_general_expenses": gen_exp_data,
+        "total_payroll_expenses": pay_exp_data,
+        "tender_counts": tender_counts_data,
+        "project_count": project_count_data
+    }
 
 
 # --- Test Cases ---
@@ -104,28 +88,15 @@ def test_overall_summary_report_success_no_filters(
     assert data["tender_counts"] == tender_counts_data
     assert data["project_count"] == project_count_data
 
-    expected_params = [test_company_id]
-    
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount),0) AS total_income FROM income_entries WHERE company_id = %s",
-        expected_params
-    )
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount),0) AS total_general_expenses FROM general_expenses WHERE company_id = %s",
-        expected_params
-    )
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount),0) AS total_payroll_expenses FROM payroll_entries WHERE company_id = %s",
-        expected_params
-    )
-    mock_cursor.execute.assert_any_call(
-        """SELECT t.status, COUNT(*) AS count FROM tenders t WHERE t.company_id = %s GROUP BY t.status ORDER BY t.status""" ,
-        expected_params
-    )
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COUNT(*) AS project_count FROM projects WHERE company_id = %s",
-        expected_params
-    )
+    # One round trip with every sub-select scoped to the company
+    mock_cursor.execute.assert_called_once()
+    sql, params = mock_cursor.execute.call_args[0]
+    assert "(SELECT COALESCE(SUM(amount),0) FROM income_entries WHERE company_id = %s) AS total_income" in sql
+    assert "(SELECT COALESCE(SUM(amount),0) FROM general_expenses WHERE company_id = %s) AS total_general_expenses" in sql
+    assert "(SELECT COALESCE(SUM(amount),0) FROM payroll_entries WHERE company_id = %s) AS total_payroll_expenses" in sql
+    assert "SELECT t.status, COUNT(*) AS count FROM tenders t WHERE t.company_id = %s GROUP BY t.status" in sql
+    assert "(SELECT COUNT(*) FROM projects WHERE company_id = %s) AS project_count" in sql
+    assert params == [test_company_id] * 5
 
     # Ensure connection and cursor are closed
     mock_cursor.close.assert_called()
@@ -186,27 +157,16 @@ def test_overall_summary_report_success_with_all_filters(
     assert data["tender_counts"] == tender_counts_data
     assert data["project_count"] == project_count_data
 
-    # Now verify the three filtered sum queries:
+    mock_cursor.execute.assert_called_once()
+    sql, params = mock_cursor.execute.call_args[0]
+
+    # The three filtered ledger sums
     date_filter_sql_part = "company_id = %s AND project_id = %s AND date >= %s AND date <= %s"
     date_params = [test_company_id, test_project_id, test_start_date, test_end_date]
+    for table in ("income_entries", "general_expenses", "payroll_entries"):
+        assert f"FROM {table} WHERE {date_filter_sql_part})" in sql
 
-    assert_query_called(
-        mock_cursor,
-        "FROM income_entries WHERE " + date_filter_sql_part,
-        date_params
-    )
-    assert_query_called(
-        mock_cursor,
-        "FROM general_expenses WHERE " + date_filter_sql_part,
-        date_params
-    )
-    assert_query_called(
-        mock_cursor,
-        "FROM payroll_entries WHERE " + date_filter_sql_part,
-        date_params
-    )
-
-    # Verify the filtered tender‐count query
+    # The filtered tender counts
     tender_filter_sql_part = (
         "t.company_id = %s AND t.project_id = %s AND t.status = %s "
         "AND t.start_date >= %s AND t.end_date <= %s"
@@ -215,20 +175,14 @@ def test_overall_summary_report_success_with_all_filters(
         test_company_id, test_project_id,
         test_status, test_start_date, test_end_date
     ]
-    assert_query_called(
-        mock_cursor,
-        "SELECT t.status, COUNT(*) AS count FROM tenders t WHERE " + tender_filter_sql_part,
-        tender_params
-    )
+    assert "SELECT t.status, COUNT(*) AS count FROM tenders t WHERE " + tender_filter_sql_part in sql
 
-    # Verify the filtered project count query
+    # The filtered project count
     proj_filter_sql_part = "company_id = %s AND id = %s"
     proj_params          = [test_company_id, test_project_id]
-    assert_query_called(
-        mock_cursor,
-        "SELECT COUNT(*) AS project_count FROM projects WHERE " + proj_filter_sql_part,
-        proj_params
-    )
+    assert "FROM projects WHERE " + proj_filter_sql_part + ")" in sql
+
+    assert params == date_params * 3 + tender_params + proj_params
 
     # Cleanup
     mock_cursor.close.assert_called()
@@ -0,0 +1,231 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+import psycopg2
+from app import app
+from reporting_module.parallel import run_queries, SubQuery, QueryDeadlineExceeded, _run_one, _cancel_all
+
+
+class SleepyCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.tracker.enter()
+        try:
+            delay, rows = self.conn.responder(sql, params)
+            if self.conn.cancelled.wait(delay):
+                raise psycopg2.extensions.QueryCanceledError("canceling statement due to user request")
+            self.rows = rows
+        finally:
+            self.conn.tracker.leave()
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class SleepyConnection:
+    def __init__(self, responder, tracker):
+        self.responder = responder
+        self.tracker = tracker
+        self.cancelled = threading.Event()
+        self.closed = 0
+
+    def cursor(self, cursor_factory=None):
+        return SleepyCursor(self)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        self.closed = 1
+
+
+class Tracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+
+class Connector:
+    def __init__(self, responder):
+        self.responder = responder
+        self.tracker = Tracker()
+        self.opened = []
+
+    def __call__(self):
+        conn = SleepyConnection(self.responder, self.tracker)
+        self.opened.append(conn)
+        return conn
+
+
+def delays(mapping):
+    """Responder sleeping mapping[sql] seconds and returning [{"sql": sql}]."""
+    return lambda sql, params: (mapping[sql], [{"sql": sql}])
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_run_queries_latency_tracks_slowest_query():
+    connector = Connector(delays({"a": 0.2, "b": 0.2, "c": 0.2}))
+    started = time.monotonic()
+    results = run_queries(connector, [SubQuery(n, n, [], "one") for n in "abc"], max_concurrency=3, deadline=5)
+    elapsed = time.monotonic() - started
+
+    assert results == {n: {"sql": n} for n in "abc"}
+    assert elapsed < 0.5  # sequential would be 0.6s
+    assert connector.tracker.peak == 3
+    assert all(conn.closed for conn in connector.opened)
+
+
+def test_run_queries_respects_per_request_cap():
+    connector = Connector(delays({n: 0.05 for n in "abcde"}))
+    results = run_queries(connector, [SubQuery(n, n, []) for n in "abcde"], max_concurrency=2, deadline=5)
+
+    assert set(results) == set("abcde")
+    assert results["a"] == [{"sql": "a"}]
+    assert connector.tracker.peak <= 2
+
+
+def test_run_queries_deadline_cancels_in_flight_queries():
+    connector = Connector(delays({"fast": 0.0, "slow": 5}))
+    started = time.monotonic()
+    with pytest.raises(QueryDeadlineExceeded, match="slow"):
+        run_queries(connector, [SubQuery("fast", "fast", []), SubQuery("slow", "slow", [])],
+                    max_concurrency=2, deadline=0.1)
+
+    assert time.monotonic() - started < 1
+    slow_conn = next(c for c in connector.opened if c.cancelled.is_set())
+    for _ in range(100):  # worker observes the cancel and returns its connection
+        if slow_conn.closed:
+            break
+        time.sleep(0.01)
+    assert slow_conn.closed
+
+
+def test_returned_connections_are_never_cancelled():
+    connector = Connector(delays({"a": 0}))
+    holder, lock = [], threading.Lock()
+
+    _run_one(connector, SubQuery("a", "a", [], "one"), holder, lock)
+    # The connection is back in the pool and may be running another request's query
+    _cancel_all([holder], lock)
+
+    conn = connector.opened[0]
+    assert conn.closed and not conn.cancelled.is_set()
+    assert holder == []
+
+
+def test_run_queries_reraises_sub_query_failure():
+    def responder(sql, params):
+        if sql == "bad":
+            raise psycopg2.ProgrammingError("relation does not exist")
+        return 0, [{"ok": 1}]
+
+    with pytest.raises(psycopg2.ProgrammingError):
+        run_queries(Connector(responder), [SubQuery("good", "good", []), SubQuery("bad", "bad", [])], deadline=5)
+
+
+def test_run_queries_surfaces_connection_error_message():
+    with pytest.raises(psycopg2.OperationalError, match="Database connection error"):
+        run_queries(lambda: "Database connection error: refused", [SubQuery("a", "a", [])], deadline=5)
+
+
+def mock_connection_factory(rows_for):
+    """get_db_postgres_connection replacement giving every call its own mock connection."""
+    opened = []
+
+    def connect():
+        conn = MagicMock()
+        cur = MagicMock()
+        conn.cursor.return_value = cur
+
+        def execute(sql, params):
+            rows = rows_for(sql)
+            cur.fetchone.return_value = rows[0] if rows else None
+            cur.fetchall.return_value = rows
+
+        cur.execute.side_effect = execute
+        opened.append(conn)
+        return conn
+
+    return connect, opened
+
+
+@patch.dict('os.environ', {"REPORT_PARALLEL_QUERIES": "1"})
+@patch('reporting_module.api.get_user_context', return_value={"role": "Finance", "company_id": "1"})
+def test_income_summary_parallel_mode(mock_user_context, client):
+    def rows_for(sql):
+        if "TO_CHAR" in sql:
+            return [{"month": "2025-01", "amount": 40}, {"month": "2025-02", "amount": 60}]
+        return [{"total_income": 100}]
+
+    connect, opened = mock_connection_factory(rows_for)
+    with patch('reporting_module.api.get_db_postgres_connection', side_effect=connect):
+        response = client.get("/api/reports/income-summary?start_date=2025-01-01")
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "total_income": 100.0,
+        "monthly_trend": [{"month": "2025-01", "amount": 40.0}, {"month": "2025-02", "amount": 60.0}],
+    }
+    assert len(opened) == 2  # total and trend on their own connections
+    for conn in opened:
+        conn.close.assert_called_once()
+
+
+@patch.dict('os.environ', {"REPORT_PARALLEL_QUERIES": "1"})
+@patch('reporting_module.api.get_user_context', return_value={"role": "Admin", "company_id": "1"})
+def test_overall_summary_parallel_mode(mock_user_context, client):
+    values = {
+        "total_income": 1000, "total_general_expenses": 200, "total_payroll_expenses": 300,
+        "tender_counts": [{"status": "Open", "count": 5}], "project_count": 8,
+    }
+
+    def rows_for(sql):
+        column = sql.rsplit(" AS ", 1)[1]
+        return [{column: values[column]}]
+
+    connect, opened = mock_connection_factory(rows_for)
+    with patch('reporting_module.api.get_db_postgres_connection', side_effect=connect):
+        response = client.get("/api/reports/overall-summary?status=Open")
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "total_income": 1000.0, "total_general_expenses": 200.0, "total_payroll_expenses": 300.0,
+        "tender_counts": [{"status": "Open", "count": 5}], "project_count": 8,
+    }
+    assert len(opened) == 5
+
+
+@patch.dict('os.environ', {"REPORT_PARALLEL_QUERIES": "1"})
+@patch('reporting_module.api.get_user_context', return_value={"role": "Finance", "company_id": "1"})
+def test_parallel_deadline_returns_504(mock_user_context, client):
+    with patch('reporting_module.api.run_queries', side_effect=QueryDeadlineExceeded("too slow")):
+        response = client.get("/api/reports/expense-summary")
+
+    assert response.status_code == 504
+    assert response.get_json() == {"error": "Report timed out"}
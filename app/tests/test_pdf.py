@@ -0,0 +1,116 @@
+import re
+from unittest.mock import patch
+
+import pytest
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Spacer
+from reportlab.platypus.doctemplate import LayoutError
+
+from reporting_module import pdf as pdf_module
+from reporting_module.pdf import PdfReport, render_pdf
+from reporting_module.utils import export_report_data
+
+HEADERS = ["tender_id", "status", "project_name", "amount"]
+
+
+def make_rows(count):
+    return [{"tender_id": i, "status": "Open", "project_name": f"Project {i}", "amount": i * 1.5}
+            for i in range(count)]
+
+
+def page_count(pdf):
+    return len(re.findall(rb"/Type /Page\b", pdf))
+
+
+class StepTimer:
+    """Advances one second per call."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def test_rows_are_laid_out_one_chunk_per_page():
+    report = PdfReport(HEADERS, "Tender Status")
+    pdf = report.render(make_rows(500))
+
+    assert pdf.startswith(b"%PDF-")
+    assert report.pages["compact"] == 0
+    assert report.pages["table"] > 1
+    assert page_count(pdf) == report.pages["table"]  # chunks never spill onto an extra page
+
+
+def test_large_known_row_count_starts_compact():
+    rows = make_rows(600)
+    table = PdfReport(HEADERS, "T", compact_rows=10_000)
+    compact = PdfReport(HEADERS, "T", compact_rows=100)
+    table_pdf = table.render(rows, len(rows))
+    compact_pdf = compact.render(rows, len(rows))
+
+    assert compact.pages == {"table": 0, "compact": page_count(compact_pdf)}
+    assert page_count(compact_pdf) < page_count(table_pdf)
+
+
+def test_exceeding_time_budget_switches_remaining_pages_to_compact():
+    report = PdfReport(HEADERS, "T", time_budget=2.5, timer=StepTimer())
+    pdf = report.render(iter(make_rows(400)))
+
+    assert report.pages["table"] == 2
+    assert report.pages["compact"] >= 1
+    assert page_count(pdf) == report.pages["table"] + report.pages["compact"]
+
+
+def test_render_pdf_consumes_a_generator():
+    consumed = []
+
+    def rows():
+        for row in make_rows(200):
+            consumed.append(row)
+            yield row
+
+    assert render_pdf(rows(), HEADERS, "Streamed").startswith(b"%PDF-")
+    assert len(consumed) == 200
+
+
+def test_rows_are_read_one_page_at_a_time():
+    consumed = []
+    consumed_per_page = []
+    draw_page = pdf_module._draw_page
+
+    def rows():
+        for row in make_rows(500):
+            consumed.append(row)
+            yield row
+
+    def record(canv, flowables):
+        consumed_per_page.append(len(consumed))
+        draw_page(canv, flowables)
+
+    report = PdfReport(HEADERS, "T")
+    with patch.object(pdf_module, "_draw_page", side_effect=record):
+        report.render(rows())
+
+    assert len(consumed_per_page) == report.pages["table"] > 2
+    # Each page is drawn as soon as its rows are read, not after the whole report
+    assert consumed_per_page[0] < consumed_per_page[1] < consumed_per_page[-1] <= 500
+
+
+def test_flowable_too_large_for_a_page_is_an_error():
+    canv = canvas.Canvas(None)
+    with pytest.raises(LayoutError):
+        pdf_module._draw_page(canv, [Spacer(1, 10_000)])
+
+
+def test_pdf_export_does_not_print_rows(capsys):
+    resp = export_report_data(make_rows(50), export_format="pdf", filename="quiet")
+    assert resp.get_data().startswith(b"%PDF-")
+    assert capsys.readouterr().out == ""
+
+
+def test_pdf_export_of_empty_data():
+    resp = export_report_data([], export_format="pdf", filename="empty")
+    assert resp.mimetype == "application/pdf"
+    assert resp.get_data().startswith(b"%PDF-")
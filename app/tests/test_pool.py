@@ -0,0 +1,248 @@
+import threading
+import pytest
+from unittest.mock import patch
+import psycopg2
+from app import app
+from reporting_module import pool as pool_module
+from reporting_module.pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.executed.append(sql)
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+        self.rollbacks = 0
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.OperationalError("connection lost")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeConnector:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_pool_opens_min_size_eagerly():
+    connector = FakeConnector()
+    pool = ConnectionPool(connector, min_size=2, max_size=4)
+
+    assert len(connector.opened) == 2
+    stats = pool.stats()
+    assert stats["idle"] == 2
+    assert stats["in_use"] == 0
+
+
+def test_pool_reuses_released_connection():
+    connector = FakeConnector()
+    pool = ConnectionPool(connector, min_size=0, max_size=2)
+
+    conn = pool.getconn()
+    raw = conn._entry.raw
+    conn.close()
+    conn.close()  # second close is a no-op
+
+    again = pool.getconn()
+    assert again._entry.raw is raw
+    assert len(connector.opened) == 1
+    assert raw.closed == 0
+    again.close()
+
+
+def test_pool_proxy_forwards_attributes_and_rejects_use_after_close():
+    pool = ConnectionPool(FakeConnector(), min_size=0, max_size=1)
+    conn = pool.getconn()
+    assert isinstance(conn.cursor(), FakeCursor)
+    conn.close()
+
+    with pytest.raises(psycopg2.InterfaceError):
+        conn.cursor()
+
+
+def test_pool_proxy_forwards_session_settings():
+    pool = ConnectionPool(FakeConnector(), min_size=0, max_size=1)
+    conn = pool.getconn()
+    conn.autocommit = True
+
+    assert conn._entry.raw.autocommit is True
+    conn.close()
+    with pytest.raises(psycopg2.InterfaceError):
+        conn.autocommit = False
+
+
+def test_pool_checkout_times_out_when_exhausted():
+    pool = ConnectionPool(FakeConnector(), min_size=0, max_size=1, timeout=0.05)
+    held = pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+    stats = pool.stats()
+    assert stats["checkout_failures"] == 1
+    assert stats["in_use"] == 1
+    held.close()
+
+
+def test_pool_waiter_gets_connection_when_released():
+    pool = ConnectionPool(FakeConnector(), min_size=0, max_size=1, timeout=2)
+    held = pool.getconn()
+    got = []
+
+    def waiter():
+        got.append(pool.getconn())
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    held.close()
+    t.join(timeout=2)
+
+    assert len(got) == 1
+    assert pool.stats()["wait_time_max"] > 0
+    got[0].close()
+
+
+def test_pool_replaces_connection_failing_health_check():
+    connector = FakeConnector()
+    pool = ConnectionPool(connector, min_size=1, max_size=1)
+    connector.opened[0].broken = True
+
+    conn = pool.getconn()
+    assert conn._entry.raw is connector.opened[1]
+    assert connector.opened[0].closed == 1
+    assert "SELECT 1" not in connector.opened[1].executed  # fresh connections are not probed
+    conn.close()
+
+
+def test_pool_recycles_after_max_uses():
+    connector = FakeConnector()
+    pool = ConnectionPool(connector, min_size=0, max_size=1, max_uses=2)
+
+    for _ in range(2):
+        pool.getconn().close()
+    assert connector.opened[0].closed == 1
+
+    pool.getconn().close()
+    assert len(connector.opened) == 2
+
+
+def test_pool_recycles_after_max_age():
+    connector = FakeConnector()
+    pool = ConnectionPool(connector, min_size=1, max_size=1, max_age=60)
+
+    with patch('reporting_module.pool.time.monotonic', return_value=10**9):
+        conn = pool.getconn()
+    assert conn._entry.raw is connector.opened[1]
+    conn.close()
+
+
+def test_pool_failed_connect_frees_slot():
+    calls = {"n": 0}
+
+    def flaky():
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise psycopg2.OperationalError("could not connect")
+        return FakeConnection()
+
+    pool = ConnectionPool(flaky, min_size=0, max_size=1, timeout=0.05)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+
+    conn = pool.getconn()
+    stats = pool.stats()
+    assert stats["checkout_failures"] == 1
+    assert stats["size"] == 1
+    conn.close()
+
+
+def test_pool_reclaims_connection_dropped_without_close():
+    pool = ConnectionPool(FakeConnector(), min_size=0, max_size=1, timeout=0.05)
+    conn = pool.getconn()
+    del conn
+
+    assert pool.stats()["in_use"] == 0
+    pool.getconn().close()
+
+
+def test_pool_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        ConnectionPool(FakeConnector(), min_size=3, max_size=2)
+
+
+def test_get_db_postgres_connection_uses_shared_pool():
+    from reporting_module import api
+
+    connector = FakeConnector()
+    pool_module.reset_pool()
+    try:
+        with patch('reporting_module.api._connect_postgres', connector):
+            first = api.get_db_postgres_connection()
+            first.close()
+            second = api.get_db_postgres_connection()
+            second.close()
+        assert len(connector.opened) == 1
+        assert pool_module.current_pool_stats()["checkouts"] == 2
+    finally:
+        pool_module.reset_pool()
+
+
+@patch('reporting_module.api.get_user_context', return_value={"role": "Admin", "company_id": "1"})
+def test_pool_stats_route(mock_user_context, client):
+    pool_module.reset_pool()
+    try:
+        response = client.get('/api/reports/pool-stats')
+        assert response.status_code == 404
+
+        with patch('reporting_module.api._connect_postgres', FakeConnector()):
+            from reporting_module import api
+            api.get_db_postgres_connection().close()
+
+        response = client.get('/api/reports/pool-stats')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["checkouts"] == 1
+        assert data["idle"] == data["size"]
+    finally:
+        pool_module.reset_pool()
+
+
+@patch('reporting_module.api.get_user_context', return_value={"role": "Finance", "company_id": "1"})
+def test_pool_stats_route_admin_only(mock_user_context, client):
+    response = client.get('/api/reports/pool-stats')
+    assert response.status_code == 403
@@ -15,7 +15,7 @@ def mock_get_user_context(role='Admin', company_id='1'):
     """Helper to create a mock user context."""
     return {"role": role, "company_id": company_id}
 
-def setup_mock_db(mock_db_conn_func, fetchone_side_effect=None, fetchall_side_effect=None):
+def setup_mock_db(mock_db_conn_func, fetchone_side_effect=None, fetchall_side_effect=None, fetchmany_side_effect=None):
     """Helper to set up mock database connection and cursor."""
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -29,8 +29,22 @@ def setup_mock_db(mock_db_conn_func, fetchone_side_effect=None, fetchall_side_ef
     if fetchall_side_effect is not None:
         mock_cursor.fetchall.side_effect = fetchall_side_effect
 
+    # Server-side cursors read rows in batches until an empty batch
+    mock_cursor.fetchmany.return_value = []
+    if fetchmany_side_effect is not None:
+        mock_cursor.fetchmany.side_effect = fetchmany_side_effect
+
     return mock_conn, mock_cursor
 
+def assert_totals_query_called(mock_cursor, where_sql, params):
+    """Checks the grouped per-project totals query ran with the given filter."""
+    for table in ("income_entries", "general_expenses", "payroll_entries"):
+        fragment = f"FROM {table} WHERE {where_sql} GROUP BY project_id"
+        assert any(
+            fragment in call_args[0][0] and call_args[0][1] == params * 3
+            for call_args in mock_cursor.execute.call_args_list
+        ), f"no totals query containing {fragment!r} with params {params * 3!r}"
+
 # --- Test Cases ---
 @patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Admin', company_id='1'))
 @patch('reporting_module.api.get_db_postgres_connection')
@@ -41,21 +55,19 @@ def test_project_finance_summary_success_no_filters(mock_db_conn, mock_user_cont
         {'id': 2, 'name': 'Project Beta'}
     ]
 
-    mock_fetchone_data = [
-        # Project 1 data
-        {'total_income': 10000},
-        {'general_expense': 2000},
-        {'payroll_expense': 1000},
-        # Project 2 data
-        {'total_income': 5000},
-        {'general_expense': 1000},
-        {'payroll_expense': 500},
+    mock_totals_data = [
+        {'source': 'income', 'project_id': 1, 'total': 10000},
+        {'source': 'income', 'project_id': 2, 'total': 5000},
+        {'source': 'general', 'project_id': 1, 'total': 2000},
+        {'source': 'general', 'project_id': 2, 'total': 1000},
+        {'source': 'payroll', 'project_id': 1, 'total': 1000},
+        {'source': 'payroll', 'project_id': 2, 'total': 500},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_projects_data]
+        fetchall_side_effect=[mock_totals_data],
+        fetchmany_side_effect=[mock_projects_data, []]
     )
 
     response = client.get('/api/reports/project-finance')
@@ -87,31 +99,22 @@ def test_project_finance_summary_success_no_filters(mock_db_conn, mock_user_cont
         ('1',)
     )
     mock_cursor.execute.assert_any_call(
-        "SELECT COALESCE(SUM(amount), 0) AS total_income FROM income_entries WHERE company_id = %s AND project_id = %s",
-        ['1', 1]
-    )
-    mock_cursor.execute.assert_any_call(
-        "SELECT COALESCE(SUM(amount), 0) AS general_expense FROM general_expenses WHERE company_id = %s AND project_id = %s",
-        ['1', 1]
-    )
-    mock_cursor.execute.assert_any_call(
-        "SELECT COALESCE(SUM(amount), 0) AS payroll_expense FROM payroll_entries WHERE company_id = %s AND project_id = %s",
-        ['1', 1]
-    )
-    mock_cursor.execute.assert_any_call(
-        "SELECT COALESCE(SUM(amount), 0) AS total_income FROM income_entries WHERE company_id = %s AND project_id = %s",
-        ['1', 2]
-    )
-    mock_cursor.execute.assert_any_call(
-        "SELECT COALESCE(SUM(amount), 0) AS general_expense FROM general_expenses WHERE company_id = %s AND project_id = %s",
-        ['1', 2]
-    )
-    mock_cursor.execute.assert_any_call(
-        "SELECT COALESCE(SUM(amount), 0) AS payroll_expense FROM payroll_entries WHERE company_id = %s AND project_id = %s",
-        ['1', 2]
+        "SELECT 'income' AS source, project_id, COALESCE(SUM(amount), 0) AS total "
+        "FROM income_entries WHERE company_id = %s GROUP BY project_id"
+        " UNION ALL "
+        "SELECT 'general' AS source, project_id, COALESCE(SUM(amount), 0) AS total "
+        "FROM general_expenses WHERE company_id = %s GROUP BY project_id"
+        " UNION ALL "
+        "SELECT 'payroll' AS source, project_id, COALESCE(SUM(amount), 0) AS total "
+        "FROM payroll_entries WHERE company_id = %s GROUP BY project_id",
+        ['1', '1', '1']
     )
+    # One query for the projects and one for all of their totals
+    assert mock_cursor.execute.call_count == 2
+    assert mock_cursor.fetchone.call_count == 0
 
-    mock_cursor.close.assert_called_once()
+    # The server-side project cursor and the regular cursor share this mock
+    assert mock_cursor.close.call_count == 2
     mock_conn.close.assert_called_once()
 
 @patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Finance', company_id='2'))
@@ -119,16 +122,16 @@ def test_project_finance_summary_success_no_filters(mock_db_conn, mock_user_cont
 def test_project_finance_summary_success_with_all_filters(mock_db_conn, mock_user_context, client):
     """Tests successful retrieval with start_date, end_date, and project_id filters."""
     mock_project_data = [{'id': 5, 'name': 'Filtered Project'}]
-    mock_fetchone_data = [
-        {'total_income': 15000},
-        {'general_expense': 3000},
-        {'payroll_expense': 2500},
+    mock_totals_data = [
+        {'source': 'income', 'project_id': 5, 'total': 15000},
+        {'source': 'general', 'project_id': 5, 'total': 3000},
+        {'source': 'payroll', 'project_id': 5, 'total': 2500},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_project_data]
+        fetchall_side_effect=[mock_totals_data],
+        fetchmany_side_effect=[mock_project_data, []]
     )
 
     response = client.get('/api/reports/project-finance?start_date=2024-01-01&end_date=2024-12-31&project_id=5')
@@ -148,30 +151,14 @@ def test_project_finance_summary_success_with_all_filters(mock_db_conn, mock_use
         "SELECT id, name FROM projects WHERE id = %s AND company_id = %s",
         ('5', '2')
     )
-    expected_filter_sql = (
-        "company_id = %s "
-        "AND project_id = %s "
-        "AND date >= %s "
-        "AND date <= %s "
-        "AND project_id = %s"
-    )
-
-    expected_params = ['2', '5', '2024-01-01', '2024-12-31', 5]
-
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount), 0) AS total_income FROM income_entries WHERE {expected_filter_sql}",
-        expected_params
-    )
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount), 0) AS general_expense FROM general_expenses WHERE {expected_filter_sql}",
-        expected_params
-    )
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount), 0) AS payroll_expense FROM payroll_entries WHERE {expected_filter_sql}",
-        expected_params
+    assert_totals_query_called(
+        mock_cursor,
+        "company_id = %s AND project_id = %s AND date >= %s AND date <= %s",
+        ['2', '5', '2024-01-01', '2024-12-31']
     )
 
-    mock_cursor.close.assert_called_once()
+    # The server-side project cursor and the regular cursor share this mock
+    assert mock_cursor.close.call_count == 2
     mock_conn.close.assert_called_once()
 
 @patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='HR', company_id='3'))
@@ -179,16 +166,16 @@ def test_project_finance_summary_success_with_all_filters(mock_db_conn, mock_use
 def test_project_finance_summary_success_date_filters_only(mock_db_conn, mock_user_context, client):
     """Tests successful retrieval with only start_date and end_date filters."""
     mock_projects_data = [{'id': 10, 'name': 'Project Gamma'}]
-    mock_fetchone_data = [
-        {'total_income': 8000},
-        {'general_expense': 1500},
-        {'payroll_expense': 500},
+    mock_totals_data = [
+        {'source': 'income', 'project_id': 10, 'total': 8000},
+        {'source': 'general', 'project_id': 10, 'total': 1500},
+        {'source': 'payroll', 'project_id': 10, 'total': 500},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_projects_data]
+        fetchall_side_effect=[mock_totals_data],
+        fetchmany_side_effect=[mock_projects_data, []]
     )
 
     response = client.get('/api/reports/project-finance?start_date=2023-07-01&end_date=2023-12-31')
@@ -208,28 +195,14 @@ def test_project_finance_summary_success_date_filters_only(mock_db_conn, mock_us
         "SELECT id, name FROM projects WHERE company_id = %s",
         ('3',)
     )
-    expected_filter_sql = (
-        "company_id = %s "
-        "AND date >= %s "
-        "AND date <= %s "
-        "AND project_id = %s"
-    )
-    expected_params = ['3', '2023-07-01', '2023-12-31', 10]
-
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount), 0) AS total_income FROM income_entries WHERE {expected_filter_sql}",
-        expected_params
-    )
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount), 0) AS general_expense FROM general_expenses WHERE {expected_filter_sql}",
-        expected_params
-    )
-    mock_cursor.execute.assert_any_call(
-        f"SELECT COALESCE(SUM(amount), 0) AS payroll_expense FROM payroll_entries WHERE {expected_filter_sql}",
-        expected_params
+    assert_totals_query_called(
+        mock_cursor,
+        "company_id = %s AND date >= %s AND date <= %s",
+        ['3', '2023-07-01', '2023-12-31']
     )
 
-    mock_cursor.close.assert_called_once()
+    # The server-side project cursor and the regular cursor share this mock
+    assert mock_cursor.close.call_count == 2
     mock_conn.close.assert_called_once()
 
 
@@ -239,7 +212,7 @@ def test_project_finance_summary_no_projects_found(mock_db_conn, mock_user_conte
     """Tests the case where no projects are found for the given company/filters."""
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchall_side_effect=[[]]
+        fetchmany_side_effect=[[]]
     )
 
     response = client.get('/api/reports/project-finance')
@@ -254,7 +227,8 @@ def test_project_finance_summary_no_projects_found(mock_db_conn, mock_user_conte
     )
     assert mock_cursor.fetchone.call_count == 0
     
-    mock_cursor.close.assert_called_once()
+    # The server-side project cursor and the regular cursor share this mock
+    assert mock_cursor.close.call_count == 2
     mock_conn.close.assert_called_once()
 
 @patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Finance', company_id='5'))
@@ -262,16 +236,12 @@ def test_project_finance_summary_no_projects_found(mock_db_conn, mock_user_conte
 def test_project_finance_summary_project_no_financial_data(mock_db_conn, mock_user_context, client):
     """Tests the case where a project is found but has no associated financial data."""
     mock_projects_data = [{'id': 15, 'name': 'Project Delta'}]
-    mock_fetchone_data = [
-        {'total_income': 0},
-        {'general_expense': 0},
-        {'payroll_expense': 0},
-    ]
 
+    # The grouped query returns no rows for a project without ledger entries
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_projects_data]
+        fetchall_side_effect=[[]],
+        fetchmany_side_effect=[mock_projects_data, []]
     )
     response = client.get('/api/reports/project-finance')
 
@@ -290,12 +260,10 @@ def test_project_finance_summary_project_no_financial_data(mock_db_conn, mock_us
         "SELECT id, name FROM projects WHERE company_id = %s",
         ('5',)
     )
-    mock_cursor.execute.assert_any_call(
-        "SELECT COALESCE(SUM(amount), 0) AS total_income FROM income_entries WHERE company_id = %s AND project_id = %s",
-        ['5', 15]
-    )
+    assert_totals_query_called(mock_cursor, "company_id = %s", ['5'])
 
-    mock_cursor.close.assert_called_once()
+    # The server-side project cursor and the regular cursor share this mock
+    assert mock_cursor.close.call_count == 2
     mock_conn.close.assert_called_once()
 
 
@@ -372,3 +340,4 @@ def test_project_finance_summary_db_query_error(mock_db_conn, mock_user_context,
 
     mock_db_conn.assert_called_once()
     mock_cursor.execute.assert_called_once()
+    mock_conn.close.assert_called_once()
@@ -0,0 +1,246 @@
+import json
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+from urllib.parse import urlparse
+
+import pytest
+from app import app
+from reporting_module.rate_history import HistoricalRates
+
+TODAY = date(2025, 3, 15)
+
+
+def quotes_on(day):
+    """PLN is worth 0.25 EUR in January 2025 and 0.2 EUR from February; USD is quoted from March."""
+    quotes = {"EUR": 0.25 if day.month == 1 else 0.2}
+    if day >= date(2025, 3, 1):
+        quotes["USD"] = 0.25
+    return quotes
+
+
+class StubHistoryServer:
+    """Local stand-in for the Frankfurter time series endpoint (business days only)."""
+
+    def __init__(self):
+        self.ranges = []
+        self.published_through = None  # later days are not published yet
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                first, last = (date.fromisoformat(d) for d in urlparse(self.path).path.strip("/").split(".."))
+                stub.ranges.append((first, last))
+                day = first
+                while day.weekday() >= 5:  # like the API, answer from the previous business day
+                    day -= timedelta(days=1)
+                rates = {}
+                while day <= last:
+                    if day.weekday() < 5 and (stub.published_through is None or day <= stub.published_through):
+                        rates[day.isoformat()] = quotes_on(day)
+                    day += timedelta(days=1)
+                body = json.dumps({"base": "PLN", "rates": rates}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubHistoryServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def history(stub, directory="", today=TODAY):
+    return HistoricalRates(url=stub.url, directory=directory, today=lambda: today)
+
+
+def test_range_is_fetched_once_and_weekends_use_previous_business_day(stub):
+    rates = history(stub)
+    assert rates.ensure_range("2025-01-01", "2025-02-28")
+    assert len(stub.ranges) == 1
+
+    assert rates.rate("EUR", "2025-01-31") == pytest.approx(4.0)   # Friday
+    assert rates.rate("EUR", "2025-02-01") == pytest.approx(4.0)   # Saturday, from Friday
+    assert rates.rate("EUR", "2025-02-03") == pytest.approx(5.0)   # Monday
+    assert rates.rate("EUR", "2025-02-03", "EUR") == 1.0
+    assert rates.rate("PLN", "2025-02-03", "EUR") == pytest.approx(0.2)
+    # 2 weekend days at January's rate, 26 days at February's
+    assert rates.month_rate("EUR", "2025-02") == pytest.approx((2 * 4.0 + 26 * 5.0) / 28)
+    assert rates.month_rate("EUR", "2025-01") == pytest.approx(4.0)
+
+    rates.ensure_range("2025-01-10", "2025-02-10")
+    assert len(stub.ranges) == 1
+
+
+def test_only_missing_segments_are_fetched(stub):
+    rates = history(stub)
+    rates.ensure_range("2025-02-01", "2025-02-10")
+    rates.ensure_range("2025-01-01", "2025-02-20")
+
+    assert stub.ranges[1:] == [
+        (date(2024, 12, 25), date(2025, 1, 23)),
+        (date(2025, 2, 11), date(2025, 2, 20)),
+    ]
+    assert rates.rate("EUR", "2025-01-02") == pytest.approx(4.0)
+    assert rates.rate("EUR", "2025-02-20") == pytest.approx(5.0)
+
+
+def test_lookups_read_one_snapshot_while_the_range_widens(stub):
+    rates = history(stub)
+    rates.ensure_range("2025-02-01", "2025-02-28")
+    quotes = rates._quotes
+
+    def widen_between_reads(held, currency, first, last):
+        # Another request extends the held range backwards mid-lookup
+        if currency == "EUR" and rates._held.start == held.start:
+            rates.ensure_range("2025-01-01", "2025-01-31")
+        return quotes(held, currency, first, last)
+
+    with patch.object(rates, "_quotes", side_effect=widen_between_reads):
+        assert rates.rate("EUR", "2025-02-14") == pytest.approx(5.0)
+    assert rates._held.start < date(2025, 1, 1)
+    assert rates.rate("EUR", "2025-02-14") == pytest.approx(5.0)
+    assert rates.rate("EUR", "2025-01-14") == pytest.approx(4.0)
+
+
+def test_failed_load_is_retried(stub, tmp_path):
+    history(stub, str(tmp_path)).ensure_range("2025-02-01", "2025-02-10")
+
+    rates = history(stub, str(tmp_path))
+    with patch("reporting_module.rate_history.np.load", side_effect=MemoryError):
+        with pytest.raises(MemoryError):
+            rates.rate("EUR", "2025-02-03")
+    assert rates.rate("EUR", "2025-02-03") == pytest.approx(5.0)
+    assert len(stub.ranges) == 1
+
+
+def test_days_not_yet_published_use_the_latest_rate(stub):
+    rates = history(stub)
+    rates.ensure_range("2025-03-01", "2025-03-31")
+
+    assert stub.ranges[0][1] == date(2025, 3, 14)
+    assert rates.rate("USD", "2025-03-20") == pytest.approx(4.0)
+    assert rates.rate("USD", "2025-02-10") is None
+    assert rates.month_rate("USD", "2025-02") is None
+    assert rates.rate("GBP", "2025-03-03") is None
+
+
+def test_unpublished_days_stay_provisional(stub, tmp_path, monkeypatch):
+    # Wednesday: Tuesday's rates are not out yet
+    rates = history(stub, str(tmp_path), today=date(2025, 3, 12))
+    stub.published_through = date(2025, 3, 10)
+    rates.ensure_range("2025-03-01", "2025-03-11")
+
+    assert rates.stats()["covered_through"] == "2025-03-10"
+    assert json.loads((tmp_path / "PLN" / "meta.json").read_text())["covered_through"] == "2025-03-10"
+    assert rates.rate("USD", "2025-03-11") == pytest.approx(4.0)
+    rates.ensure_range("2025-03-01", "2025-03-11")
+    assert len(stub.ranges) == 1
+
+    stub.published_through = None
+    monkeypatch.setattr("reporting_module.rate_history.RECHECK_AFTER", 0)
+    rates.ensure_range("2025-03-01", "2025-03-11")
+    assert stub.ranges[-1] == (date(2025, 3, 11), date(2025, 3, 11))
+    assert rates.stats()["covered_through"] == "2025-03-11"
+
+
+def test_old_days_without_quotes_are_final(stub):
+    # Tuesday: the weekend before Monday has no quotes and never will
+    rates = history(stub, today=date(2025, 3, 18))
+    rates.ensure_range("2025-03-01", "2025-03-16")
+
+    assert rates.stats()["covered_through"] == "2025-03-16"
+    rates.ensure_range("2025-03-01", "2025-03-16")
+    assert len(stub.ranges) == 1
+
+
+def test_fetches_run_without_the_lock(stub):
+    rates = history(stub)
+    fetch = rates._fetch
+    held_during_fetch = []
+
+    def fetch_and_check(first, last):
+        held_during_fetch.append(rates._lock.locked())
+        return fetch(first, last)
+
+    with patch.object(rates, "_fetch", side_effect=fetch_and_check):
+        rates.ensure_range("2025-02-01", "2025-02-28")
+    assert held_during_fetch == [False]
+    assert rates.rate("EUR", "2025-02-14") == pytest.approx(5.0)
+
+
+def test_history_persists_per_currency(stub, tmp_path):
+    history(stub, str(tmp_path)).ensure_range("2025-01-01", "2025-02-28")
+    assert (tmp_path / "PLN" / "EUR.npy").exists()
+
+    restarted = history(stub, str(tmp_path))
+    restarted.ensure_range("2025-01-01", "2025-02-28")
+    assert len(stub.ranges) == 1
+    assert restarted.month_rate("EUR", "2025-01") == pytest.approx(4.0)
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_income_summary_with_historical_rates(mock_db_conn, mock_user_context, stub, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+    mock_cursor.fetchall.return_value = [
+        {"month": "2025-01", "currency": "EUR", "amount": 100},
+        {"month": "2025-01", "currency": "PLN", "amount": 50},
+        {"month": "2025-03", "currency": "EUR", "amount": 10},
+    ]
+
+    with patch('reporting_module.rate_history.rate_history', history(stub)):
+        response = client.get("/api/reports/income-summary?currency=PLN&rates=historical")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["monthly_trend"] == [{"month": "2025-01", "amount": 450.0}, {"month": "2025-03", "amount": 50.0}]
+    assert data["total_income"] == 500.0
+    assert data["rates"] == "historical"
+    assert data["by_currency"] == [
+        {"currency": "EUR", "amount": 110.0, "converted": 450.0},
+        {"currency": "PLN", "amount": 50.0, "converted": 50.0},
+    ]
+    assert len(stub.ranges) == 1
+
+    sql, params = mock_cursor.execute.call_args.args
+    assert "GROUP BY 1, 2" in sql
+    assert params == ["PLN", "1"]
+
+
+@patch('reporting_module.api.get_user_context')
+def test_historical_rates_need_a_currency(mock_user_context, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+
+    response = client.get("/api/reports/income-summary?rates=historical")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "currency is required for historical rates"
+
+    response = client.get("/api/reports/income-summary?currency=EUR&rates=yesterday")
+    assert response.status_code == 400
@@ -0,0 +1,192 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from reporting_module.rates import RateStore
+
+# Rates quoted per unit of the base currency, as the rates API returns them.
+TABLES = {
+    "PLN": {"EUR": 0.25, "USD": 0.2, "GBP": 0.2},
+    "EUR": {"PLN": 4.0, "USD": 1.1},
+}
+
+
+class StubRatesServer:
+    """Local stand-in for the Frankfurter `latest` endpoint."""
+
+    def __init__(self):
+        self.requests = []
+        self.fail = False
+        self.delay = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                base = parse_qs(url.query)["from"][0]
+                stub.requests.append(base)
+                time.sleep(stub.delay)
+                if stub.fail or url.path != "/latest" or base not in TABLES:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                body = json.dumps({"base": base, "date": "2025-06-02", "rates": TABLES[base]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubRatesServer()
+    yield server
+    server.close()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_one_request_covers_every_currency(stub, tmp_path):
+    store = RateStore(url=stub.url, path=str(tmp_path / "rates.json"), ttl=3600)
+
+    assert store.get_rate("EUR") == pytest.approx(4.0)
+    assert store.get_rate("USD", "PLN") == pytest.approx(5.0)
+    assert store.get_rate("GBP") == pytest.approx(5.0)
+    assert store.get_rate("PLN", "PLN") == 1.0
+    assert stub.requests == ["PLN"]
+
+
+def test_direct_table_is_used_for_its_base(stub):
+    store = RateStore(url=stub.url, path="", ttl=3600)
+    store.refresh("EUR")
+
+    assert store.get_rate("EUR", "USD") == pytest.approx(1.1)
+    assert stub.requests == ["EUR"]
+
+
+def test_ttl_expiry_refetches(stub):
+    clock = Clock()
+    store = RateStore(url=stub.url, path="", ttl=100, refresh_ahead=1.0, timer=clock)
+
+    store.get_rate("EUR")
+    clock.now += 99
+    store.get_rate("EUR")
+    assert stub.requests == ["PLN"]
+
+    clock.now += 2
+    store.get_rate("EUR")
+    assert stub.requests == ["PLN", "PLN"]
+
+
+def test_refresh_ahead_runs_in_background(stub):
+    clock = Clock()
+    store = RateStore(url=stub.url, path="", ttl=100, refresh_ahead=0.5, timer=clock)
+    store.get_rate("EUR")
+
+    clock.now += 60
+    stub.delay = 0.2
+    started = time.monotonic()
+    assert store.get_rate("EUR") == pytest.approx(4.0)  # served from the current table
+    assert time.monotonic() - started < 0.2
+
+    deadline = time.monotonic() + 5
+    while store.fetches < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stub.requests == ["PLN", "PLN"]
+    assert store.stats()["bases"]["PLN"]["age"] == 0
+
+
+def test_concurrent_cold_lookups_share_one_request(stub):
+    store = RateStore(url=stub.url, path="", ttl=3600)
+    stub.delay = 0.2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_rate("USD"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [pytest.approx(5.0)] * 8
+    assert stub.requests == ["PLN"]
+
+
+def test_persisted_tables_make_restarts_warm(stub, tmp_path):
+    path = str(tmp_path / "rates.json")
+    RateStore(url=stub.url, path=path, ttl=3600).get_rate("EUR")
+
+    restarted = RateStore(url=stub.url, path=path, ttl=3600)
+    assert restarted.get_rate("EUR") == pytest.approx(4.0)
+    assert stub.requests == ["PLN"]
+
+
+def test_background_refresh_waits_for_persisted_tables_to_age(stub, tmp_path):
+    path = str(tmp_path / "rates.json")
+    RateStore(url=stub.url, path=path, ttl=3600).refresh("PLN")
+
+    warm = RateStore(url=stub.url, path=path, ttl=3600, refresh_ahead=0.8)
+    warm.start_background_refresh()
+    try:
+        time.sleep(0.2)
+        assert stub.requests == ["PLN"]
+        assert 0 < warm._refresh_due_in("PLN", 3600 * 0.8) <= 3600 * 0.8
+    finally:
+        warm.stop_background_refresh()
+
+    cold = RateStore(url=stub.url, path="", ttl=3600)
+    cold.start_background_refresh()
+    try:
+        deadline = time.monotonic() + 5
+        while cold.fetches < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert stub.requests == ["PLN", "PLN"]
+    finally:
+        cold.stop_background_refresh()
+
+
+def test_failures_serve_stale_then_fall_back(stub):
+    clock = Clock()
+    store = RateStore(url=stub.url, path="", ttl=100, timer=clock)
+    store.get_rate("EUR")
+
+    stub.fail = True
+    clock.now += 200
+    assert store.get_rate("EUR") == pytest.approx(4.0)
+    # A failed base is not requested again on every lookup
+    assert store.get_rate("EUR") == pytest.approx(4.0)
+    assert stub.requests == ["PLN", "PLN"]
+    assert store.fetch_errors == 1
+
+    cold = RateStore(url=stub.url, path="", ttl=100)
+    assert cold.get_rate("EUR") == 1.0
+
+
+def test_convert_to_pln_uses_the_store(stub, monkeypatch):
+    import app as app_module
+
+    store = RateStore(url=stub.url, path="", ttl=3600)
+    monkeypatch.setattr(app_module, "rate_store", store)
+
+    assert app_module.convert_to_pln("10", "EUR") == pytest.approx(40.0)
+    assert app_module.convert_to_pln(10, "USD") == pytest.approx(50.0)
+    assert stub.requests == ["PLN"]
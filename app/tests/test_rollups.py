@@ -0,0 +1,208 @@
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch, MagicMock
+from app import app
+from reporting_module.rollups import (month_range, build_rollup_summary_queries, refresh_rollup,
+                                      ensure_rollup_schema, ROLLUP_TABLE, DIRTY_TABLE, REFRESH_TABLE,
+                                      DIRTY_FUNCTION)
+from reporting_module.versions import VERSION_TABLE
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.mark.parametrize("start_date, end_date, expected", [
+    (None, None, (None, None)),
+    ("2025-01-01", "2025-03-31", (date(2025, 1, 1), date(2025, 3, 1))),
+    ("2024-02-01", "2024-02-29", (date(2024, 2, 1), date(2024, 2, 1))),
+    ("2025-01-01", None, (date(2025, 1, 1), None)),
+    ("2025-01-02", "2025-03-31", None),
+    ("2025-01-01", "2025-03-30", None),
+    ("2023-02-01", "2023-02-29", None),
+    ("not-a-date", None, None),
+])
+def test_month_range(start_date, end_date, expected):
+    assert month_range(start_date, end_date) == expected
+
+
+def test_build_rollup_summary_queries():
+    total_sql, trend_sql, params = build_rollup_summary_queries(
+        "income_entries", "total_income", "1", "2025-01-01", "2025-06-30", "7"
+    )
+    where = "source_table = %s AND company_id = %s AND project_id = %s AND month >= %s AND month <= %s"
+    assert f"AS total_income\n        FROM {ROLLUP_TABLE}\n        WHERE {where}" in total_sql
+    assert "GROUP BY r.month" in trend_sql
+    assert params == ["income_entries", "1", "7", date(2025, 1, 1), date(2025, 6, 1)]
+
+    assert build_rollup_summary_queries("income_entries", "total_income", "1", "2025-01-15", None) is None
+    assert build_rollup_summary_queries("tenders", "total", "1") is None
+
+
+def make_refresh_cursor(refreshed_before=True):
+    cur = MagicMock()
+    cur.fetchone.side_effect = [
+        {"refreshed_at": datetime(2025, 5, 1, 12, 0)} if refreshed_before else None,
+        (True,),  # the data-version table is installed
+    ]
+    cur.rowcount = 4
+    conn = MagicMock()
+    conn.cursor.return_value = cur
+    return conn, cur
+
+
+def test_refresh_rollup_incremental_recomputes_dirty_buckets():
+    conn, cur = make_refresh_cursor()
+
+    summary = refresh_rollup(conn, "general_expenses")
+
+    statements = [c[0][0] for c in cur.execute.call_args_list]
+    assert statements[0] == "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"
+    delete_sql, delete_params = cur.execute.call_args_list[2][0]
+    assert delete_sql.startswith(f"DELETE FROM {ROLLUP_TABLE} r WHERE r.source_table = %s AND (r.company_id, r.month) IN")
+    assert f"FROM {DIRTY_TABLE} WHERE source_table = %s" in delete_sql
+    assert delete_params == ["general_expenses", "general_expenses"]
+
+    insert_sql, insert_params = cur.execute.call_args_list[3][0]
+    assert f"INSERT INTO {ROLLUP_TABLE}" in insert_sql
+    assert "FROM general_expenses e" in insert_sql and f"FROM {DIRTY_TABLE}" in insert_sql
+    assert insert_params == ["general_expenses", "general_expenses"]
+
+    # The recomputed companies' data versions move on, so cached and
+    # ETag-tagged summaries read from the old buckets are not served again
+    bump_sql, bump_params = cur.execute.call_args_list[5][0]
+    assert f"INSERT INTO {VERSION_TABLE}" in bump_sql
+    assert f"FROM (SELECT company_id FROM {DIRTY_TABLE} WHERE source_table = %s) c" in bump_sql
+    assert bump_params == ["general_expenses"]
+
+    # The dirty marks are cleared in the same transaction
+    assert cur.execute.call_args_list[6][0] == (f"DELETE FROM {DIRTY_TABLE} WHERE source_table = %s",
+                                                ["general_expenses"])
+    assert f"INSERT INTO {REFRESH_TABLE}" in statements[7]
+
+    conn.commit.assert_called_once()
+    assert summary == {"table": "general_expenses", "buckets": 4, "full": False}
+
+
+def test_refresh_rollup_rebuilds_table_never_refreshed():
+    conn, cur = make_refresh_cursor(refreshed_before=False)
+
+    summary = refresh_rollup(conn, "income_entries")
+
+    cur.execute.assert_any_call(f"DELETE FROM {ROLLUP_TABLE} WHERE source_table = %s", ["income_entries"])
+    insert_sql, insert_params = cur.execute.call_args_list[3][0]
+    assert DIRTY_TABLE not in insert_sql
+    assert "WHERE e.company_id IS NOT NULL AND e.date IS NOT NULL\n" in insert_sql
+    assert insert_params == ["income_entries"]
+    cur.execute.assert_any_call(f"DELETE FROM {DIRTY_TABLE} WHERE source_table = %s", ["income_entries"])
+    cur.execute.assert_any_call(f"UPDATE {VERSION_TABLE} SET version = version + 1, changed_at = now()")
+    assert summary["full"] is True
+
+
+def test_refresh_rollup_without_version_table_bumps_nothing():
+    conn, cur = make_refresh_cursor()
+    cur.fetchone.side_effect = [{"refreshed_at": datetime(2025, 5, 1)}, (False,)]
+
+    refresh_rollup(conn, "income_entries")
+
+    assert not any(VERSION_TABLE in c[0][0] and "to_regclass" not in c[0][0] for c in cur.execute.call_args_list)
+    conn.commit.assert_called_once()
+
+
+def test_dirty_triggers_mark_old_and_new_buckets():
+    conn, cur = make_refresh_cursor()
+
+    ensure_rollup_schema(conn)
+
+    statements = [c[0][0] for c in cur.execute.call_args_list]
+    function = next(s for s in statements if DIRTY_FUNCTION in s and "FUNCTION" in s)
+    assert "FROM old_rows UNION ALL SELECT company_id, date FROM new_rows" in function
+    assert f"FROM {ROLLUP_TABLE} WHERE source_table = TG_TABLE_NAME" in function
+    for table in ("income_entries", "general_expenses", "payroll_entries"):
+        for event in ("INSERT", "UPDATE", "DELETE", "TRUNCATE"):
+            assert any(s.startswith(f"CREATE TRIGGER {table}_report_rollup_") and f"AFTER {event} ON {table}" in s
+                       and s.endswith(f"EXECUTE FUNCTION {DIRTY_FUNCTION}()") for s in statements)
+    conn.commit.assert_called_once()
+
+
+def test_refresh_rollup_rolls_back_on_error():
+    conn, cur = make_refresh_cursor(refreshed_before=False)
+    cur.execute.side_effect = [None, None, None, Exception("boom")]
+
+    with pytest.raises(Exception):
+        refresh_rollup(conn, "income_entries")
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+
+
+def test_refresh_rollup_rejects_unknown_table():
+    with pytest.raises(ValueError):
+        refresh_rollup(MagicMock(), "tenders")
+
+
+@patch.dict('os.environ', {"REPORT_USE_ROLLUPS": "1"})
+@patch('reporting_module.api.get_user_context', return_value={"role": "Finance", "company_id": "1"})
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_income_summary_reads_rollup_for_whole_months(mock_db_conn, mock_user_context, client):
+    mock_cursor = MagicMock()
+    mock_db_conn.return_value.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.side_effect = [{"dirty": False}, {"total_income": 300}]
+    mock_cursor.fetchall.return_value = [{"month": "2025-01", "amount": 300}]
+
+    response = client.get("/api/reports/income-summary?start_date=2025-01-01&end_date=2025-01-31")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"total_income": 300.0, "monthly_trend": [{"month": "2025-01", "amount": 300.0}]}
+    dirty_check, *summary = mock_cursor.execute.call_args_list
+    assert dirty_check[0] == (
+        f"SELECT EXISTS (SELECT 1 FROM {DIRTY_TABLE} WHERE source_table = %s AND company_id = %s"
+        " AND month >= %s AND month <= %s) AS dirty",
+        ["income_entries", "1", date(2025, 1, 1), date(2025, 1, 1)],
+    )
+    for call_args in summary:
+        sql, params = call_args[0]
+        assert f"FROM {ROLLUP_TABLE}" in sql
+        assert params == ["income_entries", "1", date(2025, 1, 1), date(2025, 1, 1)]
+    # The dirty check and the summary share one pooled connection
+    mock_db_conn.assert_called_once()
+    mock_db_conn.return_value.close.assert_called()
+
+
+@patch.dict('os.environ', {"REPORT_USE_ROLLUPS": "1"})
+@patch('reporting_module.api.get_user_context', return_value={"role": "Finance", "company_id": "1"})
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_income_summary_reads_raw_rows_while_buckets_are_dirty(mock_db_conn, mock_user_context, client):
+    mock_cursor = MagicMock()
+    mock_db_conn.return_value.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.side_effect = [{"dirty": True}, {"total_income": 350}]
+    mock_cursor.fetchall.return_value = [{"month": "2025-01", "amount": 350}]
+
+    response = client.get("/api/reports/income-summary?start_date=2025-01-01&end_date=2025-01-31")
+
+    assert response.status_code == 200
+    assert response.get_json()["total_income"] == 350.0
+    for call_args in mock_cursor.execute.call_args_list[1:]:
+        sql, params = call_args[0]
+        assert "FROM income_entries" in sql and ROLLUP_TABLE not in sql
+        assert params == ["1", "2025-01-01", "2025-01-31"]
+
+
+@patch.dict('os.environ', {"REPORT_USE_ROLLUPS": "1"})
+@patch('reporting_module.api.get_user_context', return_value={"role": "Finance", "company_id": "1"})
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_expense_summary_falls_back_to_raw_rows_for_partial_months(mock_db_conn, mock_user_context, client):
+    mock_cursor = MagicMock()
+    mock_db_conn.return_value.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = {"total_expense": 50}
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/api/reports/expense-summary?start_date=2025-01-10&end_date=2025-01-31")
+
+    assert response.status_code == 200
+    for call_args in mock_cursor.execute.call_args_list:
+        sql, params = call_args[0]
+        assert "FROM general_expenses" in sql
+        assert params == ["1", "2025-01-10", "2025-01-31"]
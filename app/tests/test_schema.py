@@ -0,0 +1,181 @@
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+import psycopg2
+import app as app_module
+from reporting_module import schema
+from reporting_module.schema import IndexSpec, REPORT_INDEXES, create_index_sql, check_schema, format_report
+
+TEST_DSN = os.getenv("REPORTING_TEST_DSN")
+
+
+def test_create_index_sql():
+    spec = IndexSpec("ix_income_entries_company_project_date", "income_entries",
+                     ("company_id", "project_id", "date"), ("amount",))
+    assert create_index_sql(spec) == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_income_entries_company_project_date "
+        "ON income_entries (company_id, project_id, date) INCLUDE (amount)"
+    )
+    assert create_index_sql(IndexSpec("ix_p", "projects", ("company_id",)), concurrently=False) == \
+        "CREATE INDEX IF NOT EXISTS ix_p ON projects (company_id)"
+
+
+def test_report_indexes_cover_every_ledger_table():
+    for table in ("income_entries", "general_expenses", "payroll_entries"):
+        specs = [s for s in REPORT_INDEXES if s.table == table]
+        assert ("company_id", "project_id", "date") in [s.columns for s in specs]
+        assert all(s.include == ("amount",) for s in specs)
+    assert len({s.name for s in REPORT_INDEXES}) == len(REPORT_INDEXES)
+
+
+def mock_catalog(rows):
+    conn = MagicMock()
+    conn.autocommit = False
+    cur = MagicMock()
+    conn.cursor.return_value = cur
+    cur.fetchall.return_value = rows
+    return conn, cur
+
+
+def test_check_schema_reports_without_creating():
+    specs = REPORT_INDEXES[:3]
+    conn, cur = mock_catalog([
+        {"name": specs[0].name, "valid": True, "scans": 12},
+        {"name": specs[1].name, "valid": True, "scans": 0},
+    ])
+
+    report = check_schema(conn, specs=specs)
+
+    assert report == {"missing": [specs[2].name], "invalid": [], "created": [], "unused": [specs[1].name]}
+    assert not any("CREATE INDEX" in c[0][0] for c in cur.execute.call_args_list)
+    assert conn.autocommit is False  # restored
+
+
+def test_check_schema_creates_missing_and_rebuilds_invalid():
+    specs = REPORT_INDEXES[:3]
+    conn, cur = mock_catalog([
+        {"name": specs[0].name, "valid": True, "scans": 3},
+        {"name": specs[1].name, "valid": False, "scans": 0},
+    ])
+    autocommit_during = []
+    cur.execute.side_effect = lambda *a: autocommit_during.append(conn.autocommit)
+
+    report = check_schema(conn, create=True, specs=specs)
+
+    statements = [c[0][0] for c in cur.execute.call_args_list[1:]]
+    assert statements == [
+        f"DROP INDEX CONCURRENTLY IF EXISTS {specs[1].name}",
+        create_index_sql(specs[1]),
+        create_index_sql(specs[2]),
+    ]
+    assert all(autocommit_during)
+    assert report["created"] == [specs[1].name, specs[2].name]
+    assert report["unused"] == []
+    assert format_report(report) == [
+        f"created index: {specs[1].name}",
+        f"created index: {specs[2].name}",
+        f"invalid index: {specs[1].name}",
+    ]
+
+
+def test_check_and_update_schema_never_raises(capsys):
+    with patch('reporting_module.api.get_db_postgres_connection', return_value="Database connection error: refused"):
+        app_module.check_and_update_schema()
+    assert "Skipping schema check" in capsys.readouterr().out
+
+    conn = MagicMock()
+    with patch('reporting_module.api.get_db_postgres_connection', return_value=conn), \
+            patch('reporting_module.schema.check_schema', side_effect=psycopg2.ProgrammingError("permission denied")):
+        app_module.check_and_update_schema()
+    assert "Error checking schema: permission denied" in capsys.readouterr().out
+    conn.close.assert_called_once()
+
+
+def test_check_and_update_schema_only_reports_by_default(monkeypatch):
+    monkeypatch.delenv("REPORT_SCHEMA_CREATE_INDEXES", raising=False)
+    conn = MagicMock()
+    report = {"missing": ["ix_projects_company"], "invalid": [], "created": [], "unused": []}
+    with patch('reporting_module.api.get_db_postgres_connection', return_value=conn), \
+            patch('reporting_module.schema.check_schema', return_value=report) as check:
+        app_module.check_and_update_schema()
+        assert check.call_args.kwargs["create"] is False
+
+        monkeypatch.setenv("REPORT_SCHEMA_CREATE_INDEXES", "1")
+        app_module.check_and_update_schema()
+        assert check.call_args.kwargs["create"] is True
+
+
+# --- EXPLAIN checks against a real server (set REPORTING_TEST_DSN to run) ---
+
+@pytest.fixture(scope="module")
+def explain_db():
+    if not TEST_DSN:
+        pytest.skip("REPORTING_TEST_DSN not set")
+    conn = psycopg2.connect(TEST_DSN)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("CREATE SCHEMA IF NOT EXISTS report_explain_test")
+    cur.execute("SET search_path TO report_explain_test")
+    for table in ("income_entries", "general_expenses", "payroll_entries"):
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.execute(f"CREATE TABLE {table} (id serial PRIMARY KEY, company_id text, project_id text, "
+                    f"date date, amount numeric, description text)")
+        cur.execute(
+            f"INSERT INTO {table} (company_id, project_id, date, amount, description) "
+            f"SELECT (g % 50)::text, (g % 400)::text, DATE '2023-01-01' + (g % 730), g % 1000, repeat('x', 40) "
+            f"FROM generate_series(1, 100000) g"
+        )
+    cur.execute("DROP TABLE IF EXISTS tenders")
+    cur.execute("CREATE TABLE tenders (id serial PRIMARY KEY, company_id text, project_id text, status text, "
+                "start_date date, end_date date, notes text)")
+    cur.execute(
+        "INSERT INTO tenders (company_id, project_id, status, start_date, end_date, notes) "
+        "SELECT (g % 50)::text, (g % 400)::text, (ARRAY['Open','Closed','Awarded'])[1 + g % 3], "
+        "DATE '2023-01-01' + (g % 730), DATE '2023-02-01' + (g % 730), repeat('x', 40) "
+        "FROM generate_series(1, 50000) g"
+    )
+    cur.execute("DROP TABLE IF EXISTS projects")
+    cur.execute("CREATE TABLE projects (id text PRIMARY KEY, company_id text, name text, description text)")
+    cur.execute("INSERT INTO projects SELECT g::text, (g % 50)::text, 'P' || g, repeat('x', 40) "
+                "FROM generate_series(0, 399) g")
+
+    check_schema(conn, create=True)
+    for table in ("income_entries", "general_expenses", "payroll_entries", "tenders", "projects"):
+        cur.execute(f"VACUUM ANALYZE {table}")  # sets the visibility map index-only scans rely on
+    try:
+        yield cur
+    finally:
+        cur.execute("DROP SCHEMA report_explain_test CASCADE")
+        conn.close()
+
+
+def explain(cur, sql, params):
+    cur.execute("EXPLAIN (FORMAT TEXT) " + sql, params)
+    return "\n".join(row[0] for row in cur.fetchall())
+
+
+@pytest.mark.parametrize("table", ["income_entries", "general_expenses", "payroll_entries"])
+def test_ledger_sum_uses_index_only_scan(explain_db, table):
+    plan = explain(explain_db,
+                   f"SELECT COALESCE(SUM(amount), 0) FROM {table} "
+                   f"WHERE company_id = %s AND project_id = %s AND date >= %s AND date <= %s",
+                   ["7", "7", "2023-03-01", "2023-09-30"])
+    assert f"Index Only Scan using ix_{table}_company_project_date" in plan
+
+    plan = explain(explain_db,
+                   f"SELECT COALESCE(SUM(amount), 0) FROM {table} WHERE company_id = %s AND date >= %s",
+                   ["7", "2024-06-01"])
+    assert f"Index Only Scan using ix_{table}_company" in plan
+
+
+def test_tender_counts_use_index_only_scan(explain_db):
+    plan = explain(explain_db,
+                   "SELECT t.status, COUNT(*) FROM tenders t WHERE t.company_id = %s AND t.project_id = %s "
+                   "AND t.status = %s AND t.start_date >= %s GROUP BY t.status",
+                   ["7", "7", "Open", "2023-06-01"])
+    assert "Index Only Scan using ix_tenders_company_project_status_start" in plan
+
+
+def test_report_indexes_present_after_provisioning(explain_db):
+    report = check_schema(explain_db.connection)
+    assert report["missing"] == [] and report["invalid"] == []
@@ -0,0 +1,62 @@
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import psycopg2.extras
+import pytest
+from reporting_module import serialization
+from reporting_module.serialization import ENCODERS, get_encoder, register_encoder, json_response
+
+
+def dict_row(**values):
+    cursor = SimpleNamespace(index={name: i for i, name in enumerate(values)}, description=list(values))
+    row = psycopg2.extras.DictRow(cursor)
+    row[:] = list(values.values())
+    return row
+
+
+ROWS = [
+    dict_row(tender_id=1, start_date=date(2024, 1, 31), amount=Decimal("1250.50")),
+    dict_row(tender_id=2, start_date=date(2024, 2, 1), amount=Decimal("0")),
+]
+EXPECTED = [
+    {"tender_id": 1, "start_date": "2024-01-31", "amount": 1250.5},
+    {"tender_id": 2, "start_date": "2024-02-01", "amount": 0.0},
+]
+
+
+@pytest.mark.parametrize("name", ["orjson", "json"])
+def test_encoders_handle_report_values_natively(name):
+    dumps = ENCODERS[name]
+    assert json.loads(dumps(ROWS)) == EXPECTED
+    nested = {"rows": ROWS, "generated_at": datetime(2024, 3, 1, 12, 30), "totals": (Decimal("1.5"),)}
+    assert json.loads(dumps(nested)) == {"rows": EXPECTED, "generated_at": "2024-03-01T12:30:00",
+                                         "totals": [1.5]}
+
+
+def test_encoder_selection(monkeypatch):
+    monkeypatch.delenv("REPORT_JSON_ENCODER", raising=False)
+    assert get_encoder() is ENCODERS["orjson"]
+
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    assert get_encoder() is ENCODERS["json"]
+
+    monkeypatch.setitem(ENCODERS, "upper", lambda data: json.dumps(data).upper().encode())
+    monkeypatch.setenv("REPORT_JSON_ENCODER", "upper")
+    assert json_response({"a": "b"}).get_data() == b'{"A": "B"}'
+
+    monkeypatch.setenv("REPORT_JSON_ENCODER", "yaml")
+    with pytest.raises(ValueError):
+        get_encoder()
+
+
+def test_register_encoder(monkeypatch):
+    monkeypatch.setattr(serialization, "ENCODERS", dict(ENCODERS))
+    register_encoder("plain", lambda data: b"[]")
+    monkeypatch.setenv("REPORT_JSON_ENCODER", "plain")
+    response = json_response([1, 2], status=201)
+    assert response.status_code == 201
+    assert response.mimetype == "application/json"
+    assert response.get_data() == b"[]"
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+import app as app_module
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("google.generativeai", "flask_sqlalchemy", "reportlab", "numpy")
+
+
+def loaded_after_import(lazy_init):
+    code = f"import sys, app; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    env = dict(os.environ, REPORT_LAZY_INIT=lazy_init, PYTHONWARNINGS="ignore", REPORT_RATES_PATH="")
+    result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return set(filter(None, result.stdout.strip().split(",")))
+
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    assert loaded_after_import("1") == set()
+
+
+def test_eager_mode_warms_up_at_import():
+    assert {"google.generativeai", "flask_sqlalchemy", "reportlab"} <= loaded_after_import("0")
+
+
+def test_model_is_created_on_first_use(monkeypatch):
+    created = []
+
+    class StubGenAI:
+        @staticmethod
+        def configure(api_key):
+            pass
+
+        @staticmethod
+        def GenerativeModel(name):
+            created.append(name)
+            return object()
+
+    monkeypatch.setitem(sys.modules, "google.generativeai", StubGenAI)
+    monkeypatch.setattr(app_module, "model", None)
+
+    first = app_module.get_model()
+    assert app_module.get_model() is first
+    assert created == ["gemini-pro"]
+
+
+def test_services_start_once_without_blocking_the_first_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, "_services_started", False)
+    for name in ("sync_exchange_rates", "check_and_update_schema"):
+        monkeypatch.setattr(app_module, name, lambda *args, name=name, **kwargs: calls.append(name))
+    monkeypatch.setattr(app_module.currency, "install_rate_sync", lambda connect, store: calls.append("listener"))
+    monkeypatch.setattr(app_module.rate_store, "start_background_refresh", lambda: calls.append("refresh"))
+    monkeypatch.setenv("REPORT_START_SERVICES", "1")
+
+    client = app_module.app.test_client()
+    for _ in range(3):
+        client.get("/api/reports/income-summary")
+
+    # The rates table DDL, its first sync and the index build are init-reports' job
+    assert calls == ["listener", "refresh"]
+
+
+def test_init_reports_command(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, "sync_exchange_rates", lambda: calls.append("sync"))
+    monkeypatch.setattr(app_module, "check_and_update_schema", lambda create=None: calls.append(("schema", create)))
+    runner = app_module.app.test_cli_runner()
+
+    assert runner.invoke(args=["init-reports"]).exit_code == 0
+    assert calls == [("schema", True), "sync"]
+
+    calls.clear()
+    assert runner.invoke(args=["init-reports", "--report-only"]).exit_code == 0
+    assert calls == [("schema", False), "sync"]
@@ -0,0 +1,127 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from reporting_module.pool import ConnectionPool
+from reporting_module.statements import (compile_where, to_positional, StatementCache, execute,
+                                         LEDGER_FILTERS, TENDER_STATUS_FILTERS)
+from reporting_module.utils import build_project_totals_query
+
+
+class RecordingCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.executed = []
+        self.closed = 0
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def test_compile_where_includes_present_filters_in_declared_order():
+    where_sql, params = compile_where(LEDGER_FILTERS, company_id="1", end_date="2025-01-31",
+                                      project_id="", start_date=None)
+    assert where_sql == "company_id = %s AND date <= %s"
+    assert params == ["1", "2025-01-31"]
+
+    where_sql, params = compile_where(TENDER_STATUS_FILTERS, company_id="1", status="Open", project_id="7")
+    assert where_sql == "t.company_id = %s AND t.project_id = %s AND t.status = %s"
+    assert params == ["1", "7", "Open"]
+
+
+def test_compile_where_reuses_cached_shape():
+    first, _ = compile_where(LEDGER_FILTERS, company_id="1", start_date="2025-01-01")
+    second, params = compile_where(LEDGER_FILTERS, company_id="2", start_date="2024-06-01")
+    assert first is second
+    assert params == ["2", "2024-06-01"]
+
+
+def test_query_builders_return_cached_text_per_shape():
+    sql_a, params_a = build_project_totals_query("1", start_date="2025-01-01")
+    sql_b, params_b = build_project_totals_query("2", start_date="2024-01-01")
+    assert sql_a is sql_b
+    assert params_b == ["2", "2024-01-01"] * 3
+
+    sql_c, params_c = build_project_totals_query("1", project_ids=[])
+    assert "project_id = ANY(%s)" in sql_c
+    assert params_c == ["1", []] * 3
+
+
+def test_to_positional():
+    assert to_positional("SELECT %s, '100%%' WHERE a = %s AND b = ANY(%s)") == \
+        ("SELECT $1, '100%' WHERE a = $2 AND b = ANY($3)", 3)
+    assert to_positional("SELECT 1") == ("SELECT 1", 0)
+
+
+def test_statement_cache_prepares_once_and_evicts_lru():
+    conn = RecordingConnection()
+    cur = conn.cursor()
+    cache = StatementCache(maxsize=2)
+
+    name_a, count = cache.prepare(cur, "SELECT * FROM a WHERE x = %s")
+    assert count == 1
+    assert cache.prepare(cur, "SELECT * FROM a WHERE x = %s") == (name_a, 1)
+    name_b, _ = cache.prepare(cur, "SELECT * FROM b")
+    cache.prepare(cur, "SELECT * FROM a WHERE x = %s")  # b is now least recently used
+    cache.prepare(cur, "SELECT * FROM c")
+
+    assert [sql for sql, _ in conn.executed] == [
+        f"PREPARE {name_a} AS SELECT * FROM a WHERE x = $1",
+        f"PREPARE {name_b} AS SELECT * FROM b",
+        conn.executed[2][0],
+        f"DEALLOCATE {name_b}",
+    ]
+    assert conn.executed[2][0].endswith("AS SELECT * FROM c")
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 3, "evictions": 1}
+
+
+def test_execute_is_plain_when_disabled():
+    cur = MagicMock()
+    execute(MagicMock(), cur, "SELECT %s", ["1"])
+    cur.execute.assert_called_once_with("SELECT %s", ["1"])
+
+
+@patch.dict('os.environ', {"REPORT_PREPARED_STATEMENTS": "1"})
+def test_execute_prepares_once_per_pooled_connection():
+    raw = RecordingConnection()
+    pool = ConnectionPool(lambda: raw, min_size=0, max_size=1, health_check=False)
+    sql = "SELECT COALESCE(SUM(amount), 0) FROM income_entries WHERE company_id = %s AND date >= %s"
+
+    for company_id in ("1", "2"):
+        conn = pool.getconn()
+        execute(conn, conn.cursor(), sql, [company_id, "2025-01-01"])
+        conn.close()
+
+    statements = [sql for sql, _ in raw.executed]
+    assert len(statements) == 3
+    assert statements[0].startswith("PREPARE report_")
+    assert statements[0].endswith("WHERE company_id = $1 AND date >= $2")
+    name = statements[0].split()[1]
+    assert raw.executed[1] == (f"EXECUTE {name} (%s, %s)", ["1", "2025-01-01"])
+    assert raw.executed[2] == (f"EXECUTE {name} (%s, %s)", ["2", "2025-01-01"])
+
+
+@patch.dict('os.environ', {"REPORT_PREPARED_STATEMENTS": "1"})
+def test_execute_rejects_parameter_mismatch():
+    pool = ConnectionPool(RecordingConnection, min_size=0, max_size=1, health_check=False)
+    conn = pool.getconn()
+    with pytest.raises(ValueError):
+        execute(conn, conn.cursor(), "SELECT %s", [])
+    conn.close()
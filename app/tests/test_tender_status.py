@@ -3,8 +3,9 @@ from unittest.mock import patch, MagicMock
 from app import app
 import psycopg2.extras
 import psycopg2
-from datetime import date
+from datetime import date, datetime
 from reporting_module.utils import build_tender_status_query
+from reporting_module.statements import execute
 
 @pytest.fixture
 def client():
@@ -17,7 +18,7 @@ def mock_get_user_context(role='Admin', company_id='1'):
     """Helper to create a mock user context."""
     return {"role": role, "company_id": company_id}
 
-def setup_mock_db(mock_db_conn_func, fetchone_side_effect=None, fetchall_side_effect=None):
+def setup_mock_db(mock_db_conn_func, fetchone_side_effect=None, fetchall_side_effect=None, fetchmany_side_effect=None):
     """Helper to set up mock database connection and cursor."""
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -33,8 +34,17 @@ def setup_mock_db(mock_db_conn_func, fetchone_side_effect=None, fetchall_side_ef
         # fetchall is called once for the main tender query
         mock_cursor.fetchall.side_effect = fetchall_side_effect
 
+    # Server-side cursors read rows in batches until an empty batch
+    mock_cursor.fetchmany.return_value = []
+    if fetchmany_side_effect is not None:
+        mock_cursor.fetchmany.side_effect = fetchmany_side_effect
+
     return mock_conn, mock_cursor
 
+def project_rows(tenders):
+    """Distinct-project rows the route reads before streaming the tenders."""
+    return [{'project_id': pid} for pid in dict.fromkeys(t['project_id'] for t in tenders)]
+
 # --- Test Cases ---
 @pytest.mark.parametrize("inputs, expected", [
     # no filters
@@ -130,21 +140,19 @@ def test_tender_status_report_success_no_filters(mock_db_conn, mock_user_context
          'project_id': 102, 'project_name': 'Project Y', 'project_description': 'Desc Y'}
     ]
 
-    mock_fetchone_data = [
-        # Data for Tender 1 (Project 101)
-        (1000.0,),
-        (500.0,),
-        (15000.0,),
-        # Data for Tender 2 (Project 102)
-        (2000.0,),
-        (1000.0,),
-        (8000.0,),
+    mock_totals_data = [
+        {'source': 'general', 'project_id': 101, 'total': 1000.0},
+        {'source': 'payroll', 'project_id': 101, 'total': 500.0},
+        {'source': 'income', 'project_id': 101, 'total': 15000.0},
+        {'source': 'general', 'project_id': 102, 'total': 2000.0},
+        {'source': 'payroll', 'project_id': 102, 'total': 1000.0},
+        {'source': 'income', 'project_id': 102, 'total': 8000.0},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_tenders_data]
+        fetchall_side_effect=[project_rows(mock_tenders_data), mock_totals_data],
+        fetchmany_side_effect=[mock_tenders_data, []]
     )
 
     response = client.get('/api/reports/tender-status')
@@ -191,16 +199,16 @@ def test_tender_status_report_success_with_all_filters(mock_db_conn, mock_user_c
          'project_id': 201, 'project_name': 'Project Z', 'project_description': 'Desc Z'}
     ]
 
-    mock_fetchone_data = [
-        (500.0,),
-        (200.0,),
-        (10000.0,),
+    mock_totals_data = [
+        {'source': 'general', 'project_id': 201, 'total': 500.0},
+        {'source': 'payroll', 'project_id': 201, 'total': 200.0},
+        {'source': 'income', 'project_id': 201, 'total': 10000.0},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_tenders_data]
+        fetchall_side_effect=[project_rows(mock_tenders_data), mock_totals_data],
+        fetchmany_side_effect=[mock_tenders_data, []]
     )
 
     response = client.get('/api/reports/tender-status?start_date=2024-04-01&end_date=2024-06-30&project_id=201&status=Pending')
@@ -232,21 +240,19 @@ def test_tender_status_report_success_date_filters_only(mock_db_conn, mock_user_
          'project_id': 302, 'project_name': 'Project B', 'project_description': 'Desc B'}
     ]
 
-    mock_fetchone_data = [
-        # Data for Tender 4 (Project 301)
-        (100.0,),
-        (50.0,),
-        (5000.0,),
-        # Data for Tender 5 (Project 302)
-        (200.0,),
-        (100.0,),
-        (6000.0,),
+    mock_totals_data = [
+        {'source': 'general', 'project_id': 301, 'total': 100.0},
+        {'source': 'payroll', 'project_id': 301, 'total': 50.0},
+        {'source': 'income', 'project_id': 301, 'total': 5000.0},
+        {'source': 'general', 'project_id': 302, 'total': 200.0},
+        {'source': 'payroll', 'project_id': 302, 'total': 100.0},
+        {'source': 'income', 'project_id': 302, 'total': 6000.0},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_tenders_data]
+        fetchall_side_effect=[project_rows(mock_tenders_data), mock_totals_data],
+        fetchmany_side_effect=[mock_tenders_data, []]
     )
 
     response = client.get('/api/reports/tender-status?start_date=2023-07-01&end_date=2023-12-31')
@@ -267,16 +273,16 @@ def test_tender_status_report_success_project_id_filter_only(mock_db_conn, mock_
          'project_id': 401, 'project_name': 'Project C', 'project_description': 'Desc C'}
     ]
 
-    mock_fetchone_data = [
-        (3000.0,),
-        (1500.0,),
-        (25000.0,),
+    mock_totals_data = [
+        {'source': 'general', 'project_id': 401, 'total': 3000.0},
+        {'source': 'payroll', 'project_id': 401, 'total': 1500.0},
+        {'source': 'income', 'project_id': 401, 'total': 25000.0},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_tenders_data]
+        fetchall_side_effect=[project_rows(mock_tenders_data), mock_totals_data],
+        fetchmany_side_effect=[mock_tenders_data, []]
     )
 
     response = client.get('/api/reports/tender-status?project_id=401')
@@ -301,21 +307,19 @@ def test_tender_status_report_success_status_filter_only(mock_db_conn, mock_user
          'project_id': 502, 'project_name': 'Project E', 'project_description': 'Desc E'}
     ]
 
-    mock_fetchone_data = [
-        # Data for Tender 7 (Project 501)
-        (500.0,),
-        (200.0,),
-        (10000.0,),
-        # Data for Tender 8 (Project 502)
-        (600.0,),
-        (300.0,),
-        (12000.0,),
+    mock_totals_data = [
+        {'source': 'general', 'project_id': 501, 'total': 500.0},
+        {'source': 'payroll', 'project_id': 501, 'total': 200.0},
+        {'source': 'income', 'project_id': 501, 'total': 10000.0},
+        {'source': 'general', 'project_id': 502, 'total': 600.0},
+        {'source': 'payroll', 'project_id': 502, 'total': 300.0},
+        {'source': 'income', 'project_id': 502, 'total': 12000.0},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_tenders_data]
+        fetchall_side_effect=[project_rows(mock_tenders_data), mock_totals_data],
+        fetchmany_side_effect=[mock_tenders_data, []]
     )
 
     response = client.get('/api/reports/tender-status?status=Completed')
@@ -355,16 +359,16 @@ def test_tender_status_report_tender_no_financial_data(mock_db_conn, mock_user_c
          'project_id': 701, 'project_name': 'Project F', 'project_description': 'Desc F'}
     ]
 
-    mock_fetchone_data = [
-        (0.0,),
-        (0.0,),
-        (0.0,),
+    mock_totals_data = [
+        {'source': 'general', 'project_id': 701, 'total': 0.0},
+        {'source': 'payroll', 'project_id': 701, 'total': 0.0},
+        {'source': 'income', 'project_id': 701, 'total': 0.0},
     ]
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchone_side_effect=mock_fetchone_data,
-        fetchall_side_effect=[mock_tenders_data]
+        fetchall_side_effect=[project_rows(mock_tenders_data), mock_totals_data],
+        fetchmany_side_effect=[mock_tenders_data, []]
     )
 
     response = client.get('/api/reports/tender-status')
@@ -382,6 +386,56 @@ def test_tender_status_report_tender_no_financial_data(mock_db_conn, mock_user_c
 
 
 
+@pytest.mark.parametrize("encoder", ["orjson", "json"])
+@patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Finance', company_id='7'))
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_tender_status_report_date_wire_format(mock_db_conn, mock_user_context, encoder, monkeypatch, client):
+    """Pins the JSON date format: ISO 8601 dates and timestamps, null for a missing end date."""
+    monkeypatch.setenv("REPORT_JSON_ENCODER", encoder)
+    mock_tenders_data = [
+        {'tender_id': 1, 'status': 'Open', 'start_date': date(2024, 5, 1), 'end_date': None,
+         'project_id': 701, 'project_name': 'Project F', 'project_description': 'Desc F'},
+        {'tender_id': 2, 'status': 'Open', 'start_date': datetime(2024, 5, 1, 8, 30), 'end_date': date(2024, 8, 31),
+         'project_id': 701, 'project_name': 'Project F', 'project_description': 'Desc F'},
+    ]
+    setup_mock_db(
+        mock_db_conn,
+        fetchall_side_effect=[project_rows(mock_tenders_data), []],
+        fetchmany_side_effect=[mock_tenders_data, []]
+    )
+
+    response = client.get('/api/reports/tender-status')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert (data[0]['start_date'], data[0]['end_date']) == ("2024-05-01", None)
+    assert (data[1]['start_date'], data[1]['end_date']) == ("2024-05-01T08:30:00", "2024-08-31")
+    assert b'"end_date":null' in response.data
+
+
+@patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Admin', company_id='1'))
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_tender_status_report_csv_date_format(mock_db_conn, mock_user_context, client):
+    """Pins the CSV date format, unchanged by the JSON encoder: str() values, "None" for a missing end date."""
+    mock_tenders_data = [
+        {'tender_id': 1, 'status': 'Open', 'start_date': date(2024, 5, 1), 'end_date': None,
+         'project_id': 701, 'project_name': 'Project F', 'project_description': 'Desc F'},
+        {'tender_id': 2, 'status': 'Open', 'start_date': datetime(2024, 5, 1, 8, 30), 'end_date': date(2024, 8, 31),
+         'project_id': 701, 'project_name': 'Project F', 'project_description': 'Desc F'},
+    ]
+    setup_mock_db(
+        mock_db_conn,
+        fetchall_side_effect=[project_rows(mock_tenders_data), []],
+        fetchmany_side_effect=[mock_tenders_data, []]
+    )
+
+    response = client.get('/api/reports/tender-status?export=csv')
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[1].startswith('1,Open,2024-05-01,None,701,')
+    assert lines[2].startswith('2,Open,2024-05-01 08:30:00,2024-08-31,701,')
+
+
 @patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Staff', company_id='1'))
 def test_tender_status_report_unauthorized(mock_user_context, client):
     """Tests that a user with an unauthorized role receives a 403."""
@@ -465,6 +519,8 @@ def test_tender_status_report_db_query_error_tenders(mock_db_conn, mock_user_con
 
     mock_db_conn.assert_called_once()
     mock_cursor.execute.assert_called_once()
+    mock_cursor.close.assert_called_once()
+    mock_conn.close.assert_called_once()
 
 
 @patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Admin', company_id='1'))
@@ -478,15 +534,13 @@ def test_tender_status_report_db_query_error_financial(mock_db_conn, mock_user_c
 
     mock_conn, mock_cursor = setup_mock_db(
         mock_db_conn,
-        fetchall_side_effect=[mock_tenders_data]
+        fetchall_side_effect=[project_rows(mock_tenders_data)]
     )
-    # Make the second execute call (e.g., payroll_entries) raise an error
+    # Make the grouped per-project totals query raise an error
     mock_cursor.execute.side_effect = [
-        None,
         None,
         psycopg2.ProgrammingError("Invalid query syntax for payroll"), # Error here
     ]
-    mock_cursor.fetchone.return_value = (0.0,)
 
 
     response = client.get('/api/reports/tender-status')
@@ -495,4 +549,133 @@ def test_tender_status_report_db_query_error_financial(mock_db_conn, mock_user_c
     assert response.get_json() == {"error": "Internal server error"}
 
     mock_db_conn.assert_called_once()
-    assert mock_cursor.execute.call_count >= 3
+    assert mock_cursor.execute.call_count == 2
+    mock_conn.close.assert_called_once()
+
+
+@patch('reporting_module.api.execute', wraps=execute)
+@patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Admin', company_id='8'))
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_tender_status_report_totals_resolved_once_per_project(mock_db_conn, mock_user_context, mock_execute, client):
+    """Tests that tenders sharing a project reuse one batched totals lookup."""
+    mock_tenders_data = [
+        {'tender_id': tid, 'status': 'Open', 'start_date': date(2024, 1, tid), 'end_date': date(2024, 2, tid),
+         'project_id': 801 if tid % 2 else 802, 'project_name': 'Shared', 'project_description': 'Desc'}
+        for tid in range(1, 11)
+    ]
+    mock_totals_data = [
+        {'source': 'general', 'project_id': 801, 'total': 100.0},
+        {'source': 'payroll', 'project_id': 801, 'total': 50.0},
+        {'source': 'income', 'project_id': 801, 'total': 900.0},
+        {'source': 'income', 'project_id': 802, 'total': 300.0},
+    ]
+
+    mock_conn, mock_cursor = setup_mock_db(
+        mock_db_conn,
+        fetchall_side_effect=[project_rows(mock_tenders_data), mock_totals_data],
+        fetchmany_side_effect=[mock_tenders_data, []]
+    )
+
+    response = client.get('/api/reports/tender-status')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data) == 10
+
+    # Distinct projects, one batched totals query, then the tenders
+    assert mock_cursor.execute.call_count == 3
+    # Both small queries go through statements.execute (PREPAREd when enabled)
+    assert [c[0][2] for c in mock_execute.call_args_list] == [
+        mock_cursor.execute.call_args_list[0][0][0], mock_cursor.execute.call_args_list[1][0][0]]
+    totals_sql, totals_params = mock_cursor.execute.call_args_list[1][0]
+    assert "project_id = ANY(%s)" in totals_sql
+    assert totals_params == ['8', [801, 802]] * 3
+
+    for item in data:
+        if item['project_id'] == 801:
+            assert item['general_expenses_incurred']['amount'] == 100.0
+            assert item['payroll_expenses_incurred']['amount'] == 50.0
+            assert item['total_income']['amount'] == 900.0
+        else:
+            # Sources without rows default to zero
+            assert item['general_expenses_incurred']['amount'] == 0.0
+            assert item['payroll_expenses_incurred']['amount'] == 0.0
+            assert item['total_income']['amount'] == 300.0
+
+
+@patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Admin', company_id='9'))
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_tender_status_report_csv_export_is_streamed(mock_db_conn, mock_user_context, client):
+    """Tests that CSV exports stream tenders from a server-side cursor."""
+    mock_tenders_data = [
+        {'tender_id': 11, 'status': 'Open', 'start_date': date(2024, 1, 1), 'end_date': date(2024, 3, 31),
+         'project_id': 901, 'project_name': 'Project S', 'project_description': 'Desc S'},
+        {'tender_id': 12, 'status': 'Closed', 'start_date': date(2023, 1, 1), 'end_date': date(2023, 3, 31),
+         'project_id': 901, 'project_name': 'Project S', 'project_description': 'Desc S'},
+    ]
+    mock_totals_data = [
+        {'source': 'general', 'project_id': 901, 'total': 10.0},
+        {'source': 'payroll', 'project_id': 901, 'total': 20.0},
+        {'source': 'income', 'project_id': 901, 'total': 30.0},
+    ]
+    mock_conn, mock_cursor = setup_mock_db(
+        mock_db_conn,
+        fetchall_side_effect=[[{'project_id': 901}], mock_totals_data]
+    )
+    mock_cursor.fetchmany.side_effect = [mock_tenders_data, []]
+
+    response = client.get('/api/reports/tender-status?export=csv&status=Open')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=tender_status.csv'
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith('tender_id,status,start_date,end_date,project_id')
+    assert lines[1].startswith('11,Open,2024-01-01,2024-03-31,901,Project S,Desc S')
+    assert "{'amount': 30.0}" in lines[1]
+    assert len(lines) == 3
+
+    # Distinct projects, their totals, then the tenders on a named cursor
+    assert "SELECT DISTINCT p.id AS project_id" in mock_cursor.execute.call_args_list[0][0][0]
+    assert mock_cursor.execute.call_args_list[1][0][1] == ['9', [901]] * 3
+    assert any('name' in c.kwargs for c in mock_conn.cursor.call_args_list)
+    mock_conn.close.assert_called_once()
+
+
+@patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Admin', company_id='9'))
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_tender_status_report_csv_export_no_tenders(mock_db_conn, mock_user_context, client):
+    """Tests that a CSV export without matching tenders returns an empty list."""
+    mock_conn, mock_cursor = setup_mock_db(mock_db_conn, fetchall_side_effect=[[]])
+
+    response = client.get('/api/reports/tender-status?export=csv')
+
+    assert response.status_code == 200
+    assert response.get_json() == []
+    mock_conn.close.assert_called_once()
+
+
+@patch('reporting_module.api.get_user_context', side_effect=lambda: mock_get_user_context(role='Admin', company_id='9'))
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_tender_status_report_pdf_export_reads_rows_lazily(mock_db_conn, mock_user_context, client):
+    """Tests that PDF exports render tenders straight from the server-side cursor."""
+    mock_tenders_data = [
+        {'tender_id': i, 'status': 'Open', 'start_date': date(2024, 1, 1), 'end_date': date(2024, 3, 31),
+         'project_id': 901, 'project_name': 'Project S', 'project_description': 'Desc S'}
+        for i in range(120)
+    ]
+    mock_conn, mock_cursor = setup_mock_db(
+        mock_db_conn,
+        fetchall_side_effect=[[{'project_id': 901}], []]
+    )
+    mock_cursor.fetchmany.side_effect = [mock_tenders_data, []]
+
+    response = client.get('/api/reports/tender-status?export=pdf')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert response.headers['Content-Disposition'] == 'attachment;filename=tender_status.pdf'
+    assert response.get_data().startswith(b'%PDF-')
+    mock_conn.close.assert_called_once()
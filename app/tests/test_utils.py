@@ -5,9 +5,9 @@ from datetime import datetime
 from app import app as app1
 from flask import Response
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate
+from reportlab.platypus import Frame
 
-from reporting_module.utils import export_report_data, validate_dates
+from reporting_module.utils import export_report_data, validate_dates, iter_csv, stream_csv_response
 
 @pytest.fixture(autouse=True)
 def app_context():
@@ -62,10 +62,11 @@ def test_export_pdf_generates_pdf_header():
     assert b.startswith(b"%PDF-")
 
 def test_export_pdf_invalid_story_raises_500(monkeypatch):
+    # Pages are laid out through Frame.addFromList (reporting_module/pdf.py)
     monkeypatch.setattr(
-        SimpleDocTemplate, 
-        "build", 
-        lambda self, story: (_ for _ in ()).throw(RuntimeError("boom"))
+        Frame,
+        "addFromList",
+        lambda self, flowables, canv: (_ for _ in ()).throw(RuntimeError("boom"))
     )
 
     data = [{"h": 1}]
@@ -87,6 +88,38 @@ def test_export_unsupported_format_returns_json():
     assert resp.mimetype == "application/json"
     assert resp.get_json() == data
 
+def test_iter_csv_yields_header_then_row_chunks():
+    rows = ({"a": i, "b": i * 2} for i in range(5))
+    chunks = list(iter_csv(rows, ["a", "b"], chunk_rows=2))
+
+    assert chunks[0] == "a,b\r\n"
+    # 5 rows in chunks of 2 -> 2 full chunks and a remainder
+    assert len(chunks) == 4
+    assert chunks[-1] == "4,8\r\n"
+    parsed = list(csv.reader(io.StringIO("".join(chunks))))
+    assert parsed[1:] == [[str(i), str(i * 2)] for i in range(5)]
+
+def test_iter_csv_is_lazy():
+    consumed = []
+
+    def rows():
+        for i in range(3):
+            consumed.append(i)
+            yield {"a": i}
+
+    chunks = iter_csv(rows(), ["a"], chunk_rows=1)
+    assert next(chunks) == "a\r\n"
+    assert consumed == []
+    assert next(chunks) == "0\r\n"
+    assert consumed == [0]
+
+def test_stream_csv_response_is_streamed():
+    resp = stream_csv_response(iter([{"x": 1}]), ["x"], filename="s")
+    assert resp.is_streamed
+    assert resp.mimetype == "text/csv"
+    assert resp.headers["Content-Disposition"] == "attachment; filename=s.csv"
+    assert resp.get_data(as_text=True) == "x\r\n1\r\n"
+
 # --- Tests for validate_dates ---
 
 @pytest.mark.parametrize("start, end, want_valid, want_msg", [
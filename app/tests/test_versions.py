@@ -0,0 +1,189 @@
+import pytest
+import psycopg2
+from unittest.mock import patch, MagicMock
+from app import app
+from reporting_module.versions import (ensure_version_schema, data_version, report_etag, trigger_ddl,
+                                       VERSIONED_TABLES)
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def etags(monkeypatch):
+    monkeypatch.setenv("REPORT_ETAGS", "1")
+
+
+def mock_db(mock_db_conn, versions):
+    """A connection whose cursor answers the version lookup from `versions` and the summary queries."""
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_db_conn.return_value = mock_conn
+
+    def fetchone():
+        sql = mock_cursor.execute.call_args.args[0]
+        if "report_data_versions" in sql:
+            return (versions[0],)
+        return {"total_income": 15000}
+
+    mock_cursor.fetchone.side_effect = fetchone
+    mock_cursor.fetchall.return_value = [{"month": "2025-01", "amount": 15000}]
+    return mock_cursor
+
+
+def report_queries(mock_cursor):
+    return [c for c in mock_cursor.execute.call_args_list if "report_data_versions" not in c.args[0]]
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_matching_etag_returns_304_without_running_the_report(mock_db_conn, mock_user_context, etags, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    versions = [7]
+    mock_cursor = mock_db(mock_db_conn, versions)
+
+    first = client.get("/api/reports/income-summary?start_date=2025-01-01")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    ran = len(report_queries(mock_cursor))
+
+    unchanged = client.get("/api/reports/income-summary?start_date=2025-01-01%20",
+                           headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+    assert unchanged.data == b""
+    assert len(report_queries(mock_cursor)) == ran
+
+    versions[0] = 8
+    changed = client.get("/api/reports/income-summary?start_date=2025-01-01", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    # The new version misses the report cache instead of serving the old entry
+    assert len(report_queries(mock_cursor)) == 2 * ran
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_etag_depends_on_filters_and_representation(mock_db_conn, mock_user_context, etags, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    mock_db(mock_db_conn, [3])
+
+    plain = client.get("/api/reports/income-summary").headers["ETag"]
+    filtered = client.get("/api/reports/income-summary?project_id=5").headers["ETag"]
+    csv = client.get("/api/reports/income-summary?export=csv").headers["ETag"]
+    assert len({plain, filtered, csv}) == 3
+
+    mock_user_context.return_value = {"role": "Finance", "company_id": "2"}
+    assert client.get("/api/reports/income-summary").headers["ETag"] != plain
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_no_etag_when_disabled_or_version_unreadable(mock_db_conn, mock_user_context, monkeypatch, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    mock_cursor = mock_db(mock_db_conn, [1])
+
+    response = client.get("/api/reports/income-summary")
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+    monkeypatch.setenv("REPORT_ETAGS", "1")
+
+    def failing_version_lookup(sql, params=None):
+        if "report_data_versions" in sql:
+            raise psycopg2.errors.UndefinedTable("relation does not exist")
+
+    mock_cursor.execute.side_effect = failing_version_lookup
+    response = client.get("/api/reports/income-summary?project_id=1")
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+@patch('reporting_module.api.get_user_context')
+@patch('reporting_module.api.get_db_postgres_connection')
+def test_version_is_read_on_the_report_connection(mock_db_conn, mock_user_context, etags, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    mock_db(mock_db_conn, [4])
+    mock_conn = mock_db_conn.return_value
+
+    first = client.get("/api/reports/income-summary")
+    assert first.status_code == 200
+    # One checkout serves the version lookup and the report queries
+    assert mock_db_conn.call_count == 1
+    mock_conn.close.assert_called_once()
+
+    # A 304 (and a cached report) still hands the connection back
+    response = client.get("/api/reports/income-summary", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert mock_db_conn.call_count == 2
+    assert mock_conn.close.call_count == 2
+
+
+@patch.dict('os.environ', {"REPORT_PARALLEL_QUERIES": "1"})
+@patch('reporting_module.api.get_user_context')
+def test_version_connection_is_returned_before_parallel_sub_queries(mock_user_context, etags, client):
+    mock_user_context.return_value = {"role": "Finance", "company_id": "1"}
+    events = []
+
+    def connect():
+        n = len([e for e in events if e[0] == "open"])
+        mock_db_conn = MagicMock()
+        mock_db(mock_db_conn, [4])
+        conn = mock_db_conn.return_value
+        conn.close.side_effect = lambda: events.append(("close", n))
+        events.append(("open", n))
+        return conn
+
+    with patch('reporting_module.api.get_db_postgres_connection', side_effect=connect):
+        response = client.get("/api/reports/income-summary")
+
+    assert response.status_code == 200
+    # The version lookup's connection goes back before total and trend check theirs out,
+    # so a parallel report never holds an idle one on top of its sub-queries
+    assert events[:3] == [("open", 0), ("close", 0), ("open", 1)]
+    assert sorted(events) == [("close", 0), ("close", 1), ("close", 2), ("open", 0), ("open", 1), ("open", 2)]
+
+
+@patch('reporting_module.api.get_user_context')
+def test_forbidden_requests_are_not_tagged(mock_user_context, etags, client):
+    mock_user_context.return_value = {"role": "Intern", "company_id": "1"}
+    response = client.get("/api/reports/overall-summary", headers={"If-None-Match": "*"})
+    assert response.status_code == 403
+    assert "ETag" not in response.headers
+
+
+def test_data_version_lookup():
+    mock_conn = MagicMock()
+    mock_cursor = mock_conn.cursor.return_value
+    mock_cursor.fetchone.return_value = None
+    assert data_version(mock_conn, 1) == 0
+    assert mock_cursor.execute.call_args.args[1] == ("1",)
+
+    mock_cursor.fetchone.return_value = (42,)
+    assert data_version(mock_conn, 1) == 42
+
+
+def test_version_schema_installs_statement_triggers():
+    mock_conn = MagicMock()
+    ensure_version_schema(mock_conn)
+
+    statements = [c.args[0] for c in mock_conn.cursor.return_value.execute.call_args_list]
+    for table in VERSIONED_TABLES:
+        assert any(f"AFTER INSERT ON {table} REFERENCING NEW TABLE" in s for s in statements)
+        assert any(f"AFTER TRUNCATE ON {table}" in s for s in statements)
+    assert all("FOR EACH STATEMENT" in s for s in trigger_ddl("tenders") if s.startswith("CREATE"))
+    mock_conn.commit.assert_called_once()
+
+
+def test_report_etag_is_stable():
+    key = ("1", "income_summary", (("start_date", "2025-01-01"),))
+    assert report_etag(key, 1, {}) == report_etag(key, 1, {"export": ""})
+    assert report_etag(key, 1, {}) != report_etag(key, 2, {})
+    assert report_etag(key, 1, {}) != report_etag(key, 1, {}, extra=[["PLN", "2025-06-02"]])